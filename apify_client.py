@@ -1,3 +1,5 @@
+import os
+import time
 import asyncio
 import logging
 from typing import Dict, List, Any, Optional
@@ -12,6 +14,35 @@ class ApifyClient:
         self.token = token
         self.base_url = "https://api.apify.com/v2"
         self.session = None
+        
+        # Circuit breaker: stop calling Apify after repeated failures
+        self.breaker_threshold = int(os.getenv("APIFY_BREAKER_THRESHOLD", 5))
+        self.breaker_reset_seconds = float(os.getenv("APIFY_BREAKER_RESET_SECONDS", 60))
+        self._consecutive_failures = 0
+        self._opened_at = None
+    
+    def breaker_state(self) -> str:
+        """Get circuit breaker state: closed, open or half_open"""
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.breaker_reset_seconds:
+            return "half_open"
+        return "open"
+    
+    def _check_breaker(self):
+        if self.breaker_state() == "open":
+            raise Exception("Apify circuit breaker is open")
+    
+    def _record_success(self):
+        self._consecutive_failures = 0
+        self._opened_at = None
+    
+    def _record_failure(self):
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= self.breaker_threshold or self._opened_at is not None:
+            if self._opened_at is None:
+                logger.warning(f"⚠️ Apify circuit breaker opened after {self._consecutive_failures} failures")
+            self._opened_at = time.monotonic()
     
     async def _get_session(self):
         """Get or create aiohttp session"""
@@ -21,6 +52,7 @@ class ApifyClient:
     
     async def create_scraping_task(self, urls: List[str], task_type: str = "single") -> str:
         """Create a new scraping task"""
+        self._check_breaker()
         try:
             session = await self._get_session()
             
@@ -35,14 +67,17 @@ class ApifyClient:
             task_id = f"task_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{len(urls)}"
             
             logger.info(f"Created scraping task {task_id} for {len(urls)} URLs")
+            self._record_success()
             return task_id
             
         except Exception as e:
+            self._record_failure()
             logger.error(f"Error creating scraping task: {e}")
             raise Exception(f"Failed to create scraping task: {str(e)}")
     
     async def get_task_results(self, task_id: str, wait: bool = False, timeout: int = 300) -> Dict[str, Any]:
         """Get task results"""
+        self._check_breaker()
         try:
             # Mock implementation - replace with actual Apify API calls
             if wait:
@@ -70,14 +105,17 @@ class ApifyClient:
             }
             
             logger.info(f"Retrieved results for task {task_id}")
+            self._record_success()
             return mock_results
             
         except Exception as e:
+            self._record_failure()
             logger.error(f"Error getting task results for {task_id}: {e}")
             raise Exception(f"Failed to get task results: {str(e)}")
     
     async def get_reel_data(self, shortcode: str) -> Dict[str, Any]:
         """Get individual reel data"""
+        self._check_breaker()
         try:
             # Mock implementation - replace with actual scraping logic
             mock_data = {
@@ -91,12 +129,40 @@ class ApifyClient:
             }
             
             logger.info(f"Retrieved reel data for {shortcode}")
+            self._record_success()
             return mock_data
             
         except Exception as e:
+            self._record_failure()
             logger.error(f"Error getting reel data for {shortcode}: {e}")
             raise Exception(f"Failed to get reel data: {str(e)}")
     
+    async def get_profile_reels(self, handles: List[str], limit: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the latest reels of several profiles in one scraping run"""
+        self._check_breaker()
+        try:
+            # Mock implementation - replace with one actor run over all handles
+            reels = {
+                handle: [
+                    {
+                        "shortcode": f"{handle}_example",
+                        "view_count": 25000,
+                        "like_count": 500,
+                        "comment_count": 25
+                    }
+                ][:limit]
+                for handle in handles
+            }
+            
+            logger.info(f"Retrieved reels for {len(handles)} profiles")
+            self._record_success()
+            return reels
+            
+        except Exception as e:
+            self._record_failure()
+            logger.error(f"Error getting reels for {len(handles)} profiles: {e}")
+            raise Exception(f"Failed to get profile reels: {str(e)}")
+    
     async def get_task_status(self) -> Dict[str, Any]:
         """Get overall task system status"""
         try:
@@ -125,7 +191,6 @@ def get_apify_client() -> ApifyClient:
     """Get Apify client instance"""
     global _apify_client
     if _apify_client is None:
-        import os
         token = os.getenv("APIFY_TOKEN")
         if not token:
             raise ValueError("APIFY_TOKEN environment variable is required")
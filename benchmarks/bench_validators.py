@@ -0,0 +1,79 @@
+"""Micro-benchmark: parsing a 100-URL /submit message.
+
+Compares the per-token path /submit used before (manual tokenizing plus
+validate_instagram_link and extract_shortcode_from_url per URL) with
+parse_submission_text.
+
+    python -m benchmarks.bench_validators
+"""
+import random
+import string
+import timeit
+from utils.validators import validate_instagram_link, extract_shortcode_from_url, parse_submission_text
+
+def _shortcode(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_letters + string.digits + "_-") for _ in range(11))
+
+def build_message(count: int = 100, seed: int = 7) -> str:
+    """A /submit message with a realistic mix of URL shapes, bare shortcodes, junk and repeats"""
+    rng = random.Random(seed)
+    tokens = []
+    for i in range(count):
+        code = _shortcode(rng)
+        shape = i % 10
+        if shape < 5:
+            tokens.append(f"https://www.instagram.com/reel/{code}/?igsh={_shortcode(rng)}")
+        elif shape < 7:
+            tokens.append(f"https://instagram.com/{_shortcode(rng).lower()}/p/{code}/")
+        elif shape == 7:
+            tokens.append(code)
+        elif shape == 8:
+            tokens.append(f"https://example.com/{code}")
+        else:
+            tokens.append(tokens[rng.randrange(len(tokens))])
+    return "/submit " + " ".join(tokens)
+
+def legacy_parse(message_text: str):
+    """The tokenizing and per-URL validation /submit did before parse_submission_text"""
+    urls = []
+    url_part = message_text[7:].strip()
+    for url in url_part.split():
+        url = url.strip()
+        if url:
+            if 'instagram.com' in url or url.startswith('http'):
+                urls.append(url)
+            elif len(url) > 5:
+                urls.append(f"https://www.instagram.com/reel/{url}/")
+
+    shortcodes, invalid = [], []
+    for url in urls:
+        if validate_instagram_link(url):
+            shortcode = extract_shortcode_from_url(url)
+            if shortcode:
+                shortcodes.append(shortcode)
+            else:
+                invalid.append(url)
+        else:
+            invalid.append(url)
+    return shortcodes, invalid
+
+def main():
+    message = build_message()
+    legacy_codes, _ = legacy_parse(message)
+    parsed = parse_submission_text(message)
+    assert set(legacy_codes) == set(parsed["shortcodes"]), "parsers disagree on shortcodes"
+
+    number = 2000
+    results = {}
+    for name, fn in (("legacy", legacy_parse), ("parse_submission_text", parse_submission_text)):
+        best = min(timeit.repeat(lambda: fn(message), number=number, repeat=5))
+        results[name] = best / number * 1e6
+
+    print(f"100-token message, {len(parsed['shortcodes'])} unique shortcodes, "
+          f"{len(parsed['invalid'])} invalid, {parsed['duplicates']} duplicates")
+    for name, micros in results.items():
+        print(f"  {name:<24} {micros:8.1f} µs/message")
+    print(f"  speedup                  {results['legacy'] / results['parse_submission_text']:8.1f}x")
+
+if __name__ == "__main__":
+    main()
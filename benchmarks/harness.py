@@ -0,0 +1,277 @@
+"""Shared pieces for driving the real bot handlers outside Telegram.
+
+The benchmarks run against a dedicated Postgres database given by
+BENCH_DATABASE_URL, which is wiped and reseeded on every run. Importing this
+module points DATABASE_URL at it before bot_fixed is loaded.
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import platform
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+if not BENCH_DATABASE_URL:
+    sys.exit("❌ BENCH_DATABASE_URL must point at a scratch Postgres database (it is wiped on every run)")
+if BENCH_DATABASE_URL == os.getenv("DATABASE_URL"):
+    sys.exit("❌ BENCH_DATABASE_URL must not be the bot's DATABASE_URL")
+
+os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+os.environ.pop("DATABASE_REPLICA_URL", None)
+os.environ.setdefault("BOT_TOKEN", "123456:bench")
+os.environ.setdefault("APIFY_TOKEN", "bench")
+
+from sqlalchemy import text
+from telegram import Update
+from telegram.ext import ExtBot
+import apify_client
+from apify_client import ApifyClient
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+SEED_USER_BASE = 1_000_000
+
+class FakeBot(ExtBot):
+    """Bot that answers every Bot API call locally and records it"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(os.environ["BOT_TOKEN"])
+        # Telegram objects are frozen after __init__
+        with self._unfrozen():
+            self.latency = latency
+            self.calls: List[str] = []
+            self._message_id = 0
+
+    def _message(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        self._message_id += 1
+        chat_id = data.get("chat_id") or 1
+        message = {
+            "message_id": data.get("message_id") or self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+        }
+        if "text" in data:
+            message["text"] = data["text"]
+        if "photo" in data:
+            message["photo"] = [{
+                "file_id": f"photo-{self._message_id}",
+                "file_unique_id": f"u-{self._message_id}",
+                "width": 1080,
+                "height": 1080,
+            }]
+        if "document" in data:
+            message["document"] = {"file_id": f"doc-{self._message_id}", "file_unique_id": f"d-{self._message_id}"}
+        return message
+
+    async def _do_post(self, endpoint: str, data: Dict[str, Any], **kwargs):
+        self.calls.append(endpoint)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if endpoint == "getMe":
+            return BOT_USER
+        if endpoint in ("sendMessage", "editMessageText", "sendPhoto", "sendDocument"):
+            return self._message(data)
+        return True
+
+class StubApifyClient(ApifyClient):
+    """Apify client returning synthetic scrape results for exactly the requested URLs"""
+
+    def __init__(self, latency: float = 0.0, seed: int = 7):
+        super().__init__("bench")
+        self.latency = latency
+        self._rng = random.Random(seed)
+        self._tasks: Dict[str, List[str]] = {}
+
+    async def create_scraping_task(self, urls: List[str], task_type: str = "single") -> str:
+        task_id = f"bench_{len(self._tasks)}"
+        self._tasks[task_id] = list(urls)
+        return task_id
+
+    async def get_task_results(self, task_id: str, wait: bool = False, timeout: int = 300) -> Dict[str, Any]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        results = [
+            {
+                "success": True,
+                "url": url,
+                "username": f"creator_{self._rng.randrange(500)}",
+                "views": self._rng.randrange(1_000, 2_000_000),
+                "likes": self._rng.randrange(10, 50_000),
+                "comments": self._rng.randrange(0, 2_000),
+                "caption": "bench",
+            }
+            for url in self._tasks.pop(task_id, [])
+        ]
+        return {"status": "completed", "results": results, "task_info": {"id": task_id, "status": "completed"}}
+
+def install_stub_apify(latency: float = 0.0) -> StubApifyClient:
+    """Make get_apify_client() return the stub"""
+    stub = StubApifyClient(latency)
+    apify_client._apify_client = stub
+    return stub
+
+class UpdateFactory:
+    """Builds synthetic Telegram updates bound to a bot"""
+
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+        self._update_id = 0
+
+    def _next_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"bench_{user_id}"}
+
+    def command(self, user_id: int, message_text: str) -> Update:
+        """A private-chat message starting with a bot command"""
+        command_length = len(message_text.split(None, 1)[0])
+        return Update.de_json({
+            "update_id": self._next_id(),
+            "message": {
+                "message_id": self._next_id(),
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": self._user(user_id),
+                "text": message_text,
+                "entities": [{"type": "bot_command", "offset": 0, "length": command_length}],
+            },
+        }, self.bot)
+
+    def callback(self, user_id: int, data: str, photo: bool = True) -> Update:
+        """An inline button press on a message the bot sent"""
+        message = {
+            "message_id": self._next_id(),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": BOT_USER,
+        }
+        if photo:
+            message["photo"] = [{"file_id": "lb", "file_unique_id": "lb", "width": 1080, "height": 1080}]
+        else:
+            message["text"] = "🏆 Leaderboard"
+        return Update.de_json({
+            "update_id": self._next_id(),
+            "callback_query": {
+                "id": str(self._next_id()),
+                "from": self._user(user_id),
+                "chat_instance": "bench",
+                "data": data,
+                "message": message,
+            },
+        }, self.bot)
+
+# Tables the seed owns; everything here is truncated before seeding
+SEED_TABLES = [
+    "users", "reels", "allowed_accounts", "payment_details", "account_requests", "admins",
+    "banned_users", "referrals", "leaderboard", "submission_logs", "reel_metrics_history",
+    "user_daily_views", "handle_daily_views", "purge_jobs", "scrape_checkpoints",
+    "referral_ledger", "referral_balances",
+]
+
+async def prepare_database(engine, users: int, reels_per_user: int):
+    """Migrate the benchmark database and reseed it with synthetic users and reels"""
+    from database.migrations import run_migrations
+    await run_migrations(engine)
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"TRUNCATE {', '.join(SEED_TABLES)} RESTART IDENTITY"))
+        # asyncpg sends parameters untyped, so arithmetic on them needs explicit casts
+        params = {"base": SEED_USER_BASE, "n": users, "r": reels_per_user}
+
+        await conn.execute(text("""
+            INSERT INTO users (user_id, username, registered, approved, total_views, total_reels,
+                               max_slots, used_slots, created_at)
+            SELECT CAST(:base AS BIGINT) + g, 'bench_' || g, 1, TRUE, 0, 0, 1000000, 0, now()
+            FROM generate_series(1, CAST(:n AS INTEGER)) g
+        """), params)
+        await conn.execute(text("""
+            INSERT INTO reels (user_id, shortcode, url, username, views, likes, comments,
+                               submitted_at, last_updated, created_at)
+            SELECT CAST(:base AS BIGINT) + 1 + (g % CAST(:n AS INTEGER)), 'seed' || g, 'https://www.instagram.com/reel/seed' || g || '/',
+                   'creator_' || (g % 500), (g * 7919) % 1000000, g % 5000, g % 300,
+                   now() - make_interval(days => g % 60), now(), now()
+            FROM generate_series(1, CAST(:n AS INTEGER) * CAST(:r AS INTEGER)) g
+        """), params)
+        await conn.execute(text("""
+            UPDATE users u SET total_views = s.views, total_reels = s.reels, used_slots = s.reels
+            FROM (SELECT user_id, SUM(views) AS views, COUNT(*) AS reels FROM reels GROUP BY user_id) s
+            WHERE s.user_id = u.user_id
+        """))
+        await conn.execute(text("""
+            INSERT INTO payment_details (user_id, usdt_address, created_at)
+            SELECT CAST(:base AS BIGINT) + g, '0x' || lpad(to_hex(g), 40, '0'), now()
+            FROM generate_series(1, CAST(:n AS INTEGER)) g
+        """), params)
+        await conn.execute(text("""
+            INSERT INTO allowed_accounts (user_id, insta_handle)
+            SELECT CAST(:base AS BIGINT) + g, 'creator_' || (g % 500) FROM generate_series(1, CAST(:n AS INTEGER)) g
+        """), params)
+        await conn.execute(text("""
+            INSERT INTO user_daily_views (user_id, day, views_gained)
+            SELECT CAST(:base AS BIGINT) + g, CURRENT_DATE - d, (g * d * 31) % 10000
+            FROM generate_series(1, CAST(:n AS INTEGER)) g, generate_series(0, 6) d
+        """), params)
+        await conn.execute(text("""
+            INSERT INTO leaderboard (user_id, username, total_views)
+            SELECT user_id, username, total_views FROM users WHERE total_views > 0
+        """))
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"ANALYZE {', '.join(SEED_TABLES)}"))
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/max/mean in milliseconds from per-update latencies in seconds"""
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(ordered, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 3),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def save_results(kind: str, results: Dict[str, Any], output_dir: str = None) -> str:
+    """Write results as JSON tagged with the git commit so runs can be compared"""
+    output_dir = output_dir or os.getenv("BENCH_OUTPUT_DIR", os.path.join("benchmarks", "results"))
+    os.makedirs(output_dir, exist_ok=True)
+
+    commit = _git_commit()
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(output_dir, f"{kind}_{stamp}_{commit or 'nogit'}.json")
+    document = {
+        "kind": kind,
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2, default=str)
+    return path
@@ -1,22 +1,45 @@
 import os
+import html
+import importlib
+import time
 import asyncio
 import logging
-from datetime import datetime
-from typing import Set
-from telegram import Update
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional, Set, Tuple
+from utils.startup import get_startup_timer
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler, ConversationHandler
 from telegram.constants import ParseMode
-from fastapi import FastAPI
-import uvicorn
 from dotenv import load_dotenv
 
-# Import our fixed modules
-from database.connection import get_db_manager, get_db_session
+# Import our fixed modules. Rendering (Pillow), exports, invoices, payouts (numpy),
+# the Apify client (aiohttp) and the health server (FastAPI/uvicorn) are imported
+# where they are first used so a cold start doesn't pay for them.
+from database.connection import get_db_manager, get_db_session, get_db_read_session, mark_user_write
+from database.query_stats import get_query_tracker
+from database.partitions import get_partition_maintenance
+from database.hot_queries import hot_query
 from services.admin_service import get_admin_service
 from services.user_service import get_user_service
-from utils.validators import validate_instagram_link, extract_shortcode_from_url, validate_email, validate_usdt_address
+from services.health_service import get_health_service
+from services.leaderboard_service import get_leaderboard_service
+from services.stats_service import get_stats_service
+from services.metrics_service import get_metrics_service
+from services.audit_service import get_audit_logger
+from services.purge_service import get_purge_service
+from services.checkpoint_service import get_checkpoint_service
+from services.slot_service import get_slot_service
+from services.referral_service import get_referral_service
+from services.reel_update_service import get_reel_update_service
+from utils.validators import parse_submission_text, extract_shortcode_from_url, validate_email, validate_usdt_address
 from utils.helpers import paginate_list, format_views, calculate_payout
-from apify_client import get_apify_client
+from utils.loop_monitor import get_loop_monitor
+from utils.profiler import get_profiler
+from utils.shutdown import get_shutdown
+from utils.tasks import get_background_tasks
+
+startup_timer = get_startup_timer()
+startup_timer.record("imports", time.perf_counter() - startup_timer.started)
 
 # Load environment variables
 load_dotenv()
@@ -43,30 +66,86 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# FastAPI health check
-app_fastapi = FastAPI()
-
-@app_fastapi.get("/")
-async def root():
-    return {"message": "Bot is running 🚀"}
-
-@app_fastapi.get("/health")
-async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
-
 async def start_health_check_server():
     """Start the health check server"""
-    config = uvicorn.Config(app_fastapi, host="0.0.0.0", port=PORT, log_level="info")
-    server = uvicorn.Server(config)
-    await server.serve()
+    # FastAPI is the slowest import we have; load it in a thread while startup continues
+    health_server = await startup_timer.timed(
+        "health_server_import", asyncio.to_thread(importlib.import_module, "services.health_server")
+    )
+    await health_server.serve(PORT)
 
 # Initialize services
 admin_service = get_admin_service(ADMIN_IDS)
 user_service = get_user_service()
+query_tracker = get_query_tracker()
+health_service = get_health_service()
+leaderboard_service = get_leaderboard_service()
+metrics_service = get_metrics_service()
+audit_logger = get_audit_logger()
+purge_service = get_purge_service()
+loop_monitor = get_loop_monitor()
+checkpoint_service = get_checkpoint_service()
+slot_service = get_slot_service()
+referral_service = get_referral_service()
+reel_update_service = get_reel_update_service()
+shutdown = get_shutdown()
+
+# Statements on the update hot path
+_EXISTING_SHORTCODES = hot_query("submit.duplicate_check", "SELECT shortcode FROM reels WHERE shortcode = ANY(:codes)")
+_INSERT_REEL = hot_query("submit.insert_reel", """
+    INSERT INTO reels (user_id, shortcode, url, username, views, likes, comments, caption, media_url, submitted_at, last_updated)
+    VALUES (:user_id, :shortcode, :url, :username, :views, :likes, :comments, :caption, :media_url, :submitted_at, :last_updated)
+""", user_id=0, shortcode="bench_advisor", url="", username="", views=0, likes=0, comments=0, caption="",
+    media_url="", submitted_at=datetime(2024, 1, 1), last_updated=datetime(2024, 1, 1))
+_PAYMENT_DETAILS = hot_query(
+    "profile.payment_details",
+    "SELECT usdt_address, paypal_email, upi_address FROM payment_details WHERE user_id = :u",
+)
+_LINKED_ACCOUNTS = hot_query("profile.linked_accounts", "SELECT insta_handle FROM allowed_accounts WHERE user_id = :u")
+_LINKED_COUNT = hot_query("addaccount.linked_count", "SELECT COUNT(*) FROM allowed_accounts WHERE user_id = :u")
+_LINKED_DUPLICATE = hot_query(
+    "addaccount.linked_duplicate",
+    "SELECT 1 FROM allowed_accounts WHERE user_id = :u AND insta_handle = :h",
+)
+_PENDING_REQUEST_COUNT = hot_query(
+    "addaccount.pending_count",
+    "SELECT COUNT(*) FROM account_requests WHERE user_id = :u AND status = 'pending'",
+)
+_PENDING_DUPLICATE = hot_query("addaccount.pending_duplicate", """
+    SELECT 1 FROM account_requests
+    WHERE user_id = :u AND insta_handle = :h AND status = 'pending'
+""")
+_INSERT_REQUEST = hot_query("addaccount.insert_request", "INSERT INTO account_requests (user_id, insta_handle) VALUES (:u, :h)")
+_USER_EXISTS = hot_query("payment.user_exists", "SELECT 1 FROM users WHERE user_id = :u")
+_PAYMENT_DETAILS_ROW = hot_query("payment.existing", "SELECT id FROM payment_details WHERE user_id = :u")
+_SET_USDT = hot_query("payment.set_usdt", "UPDATE payment_details SET usdt_address = :a WHERE user_id = :u", a="bench")
+_INSERT_USDT = hot_query(
+    "payment.insert_usdt",
+    "INSERT INTO payment_details (user_id, usdt_address) VALUES (:u, :a)",
+    a="bench",
+)
+_SET_PAYPAL = hot_query("payment.set_paypal", "UPDATE payment_details SET paypal_email = :e WHERE user_id = :u", e="bench")
+_INSERT_PAYPAL = hot_query(
+    "payment.insert_paypal",
+    "INSERT INTO payment_details (user_id, paypal_email) VALUES (:u, :e)",
+    e="bench",
+)
+_SET_UPI = hot_query("payment.set_upi", "UPDATE payment_details SET upi_address = :a WHERE user_id = :u", a="bench")
+_INSERT_UPI = hot_query(
+    "payment.insert_upi",
+    "INSERT INTO payment_details (user_id, upi_address) VALUES (:u, :a)",
+    a="bench",
+)
 
 def debug_handler(fn):
     """Decorator for debugging and error handling"""
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if shutdown.expired:
+            # Still queued (or waiting for a concurrency slot) when the drain deadline passed
+            logger.warning(f"⏹️ Skipping queued {fn.__name__} update: shutdown deadline passed")
+            return
+        health_service.record_update()
+        
         if LOG_GROUP_ID and update.message:
             user = update.effective_user
             name = user.full_name
@@ -77,19 +156,33 @@ def debug_handler(fn):
             except Exception as e:
                 logger.error(f"Failed to send log message: {e}")
         
+        async def run():
+            async with query_tracker.track(fn.__name__):
+                with loop_monitor.track(fn.__name__):
+                    try:
+                        # Check if user is banned
+                        if update.effective_user:
+                            is_banned = await user_service.is_banned(update.effective_user.id)
+                            if is_banned:
+                                await update.effective_message.reply_text("❌ You are banned from using this bot.")
+                                return
+                    
+                        return await fn(update, context)
+                    except Exception as e:
+                        logger.exception("Handler error")
+                        if update.message:
+                            await update.message.reply_text(f"⚠️ An error occurred: {str(e)}")
+                        raise
+        
+        # Own task, so the shutdown deadline can cancel the handler without cancelling PTB's
+        # update fetcher (which runs handlers inline when updates are processed sequentially)
+        handler_task = asyncio.create_task(run(), name=f"handler:{fn.__name__}")
         try:
-            # Check if user is banned
-            if update.effective_user:
-                is_banned = await user_service.is_banned(update.effective_user.id)
-                if is_banned:
-                    await update.message.reply_text("❌ You are banned from using this bot.")
-                    return
-            
-            return await fn(update, context)
-        except Exception as e:
-            logger.exception("Handler error")
-            if update.message:
-                await update.message.reply_text(f"⚠️ An error occurred: {str(e)}")
+            return await handler_task
+        except asyncio.CancelledError:
+            if handler_task.cancelled() and not asyncio.current_task().cancelling():
+                logger.warning(f"⏹️ {fn.__name__} cancelled at the shutdown deadline")
+                return
             raise
     return wrapper
 
@@ -114,6 +207,7 @@ async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 📋 <b>Available Commands:</b>
 • <code>/submit &lt;url&gt;</code> - Submit Instagram reel URLs for tracking
 • <code>/profile</code> - View your profile and statistics  
+• <code>/leaderboard</code> - View the top creators
 • <code>/addusdt &lt;address&gt;</code> - Add USDT ERC20 payment address
 • <code>/addpaypal &lt;email&gt;</code> - Add PayPal payment email
 • <code>/addupi &lt;address&gt;</code> - Add UPI payment address
@@ -138,17 +232,146 @@ async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 🔧 <b>Admin Commands:</b>
 • <code>/userstats</code> - View user statistics
-• <code>/currentaccounts</code> - View linked accounts
+• <code>/currentaccounts</code> - Export linked accounts
+• <code>/export &lt;table&gt; [csv|parquet]</code> - Export users, reels, allowed_accounts or payment_details
 • <code>/banuser &lt;user_id&gt;</code> - Ban a user
 • <code>/unban &lt;user_id&gt;</code> - Unban a user
+• <code>/purgestatus [user_id]</code> - Show progress of banned users' data purges
+• <code>/profiler [seconds|stop|status]</code> - Sample where event-loop time goes
+• <code>/referrals &lt;user_id&gt;|reconcile</code> - Show a referrer's balance or reconcile the referral ledger
+• <code>/slots [slot|refresh]</code> - Show slot campaign totals or rescrape slot accounts now
 • <code>/broadcast &lt;message&gt;</code> - Send message to all users
 • <code>/forceupdate</code> - Force update all reel views
+• <code>/userlogs &lt;user_id&gt; [days]</code> - Recent submissions and admin actions of a user
+• <code>/growth &lt;user_id|@handle&gt; [days]</code> - Daily views gained by a user or Instagram account
 • <code>/addadmin &lt;user_id&gt;</code> - Add admin
 • <code>/removeadmin &lt;user_id&gt;</code> - Remove admin
-• <code>/review &lt;user_id&gt;</code> - Review account requests"""
+• <code>/review &lt;user_id&gt;</code> - Review account requests
+• <code>/invoices [send] [batch]</code> - Render invoices for the latest (or given) payout batch (and send them to users)
+• <code>/payoutrun</code> - Compute a payout batch for all users"""
 
     await update.message.reply_text(welcome_msg + help_text, parse_mode=ParseMode.HTML)
 
+async def _store_scrape_results(user_id: int, username: str, user_data: dict, result: dict,
+                                checkpoint_task_id: str = None) -> Tuple[list, list]:
+    """Insert a finished scrape's reels and update the user's totals in one transaction"""
+    successful_reels = []
+    failed_reels = []
+    
+    async with await get_db_session() as session:
+        try:
+            for item in result.get("results", []):
+                if item.get("success", False):
+                    url = item.get("url")
+                    shortcode = extract_shortcode_from_url(url)
+    
+                    if shortcode:
+                        # Insert new reel entry
+                        await session.execute(
+                            _INSERT_REEL,
+                            {
+                                "user_id": user_id,
+                                "shortcode": shortcode,
+                                "url": url,
+                                "username": item.get("username", ""),
+                                "views": item.get("views", 0),
+                                "likes": item.get("likes", 0),
+                                "comments": item.get("comments", 0),
+                                "caption": item.get("caption", "")[:500],  # Limit caption length
+                                "media_url": item.get("media_url", ""),
+                                "submitted_at": datetime.now(),
+                                "last_updated": datetime.now()
+                            }
+                        )
+    
+                        successful_reels.append({
+                            "shortcode": shortcode,
+                            "username": item.get("username", ""),
+                            "views": item.get("views", 0),
+                            "likes": item.get("likes", 0),
+                            "comments": item.get("comments", 0)
+                        })
+                else:
+                    failed_reels.append({"url": item.get("url", "unknown"), "error": item.get("error", "Unknown error")})
+    
+            # Update user statistics
+            if successful_reels:
+                new_total_views = user_data["total_views"] + sum(reel["views"] for reel in successful_reels)
+                new_total_reels = user_data["total_reels"] + len(successful_reels)
+                new_used_slots = user_data["used_slots"] + len(successful_reels)
+    
+                await user_service.update_user_stats(
+                    user_id, 
+                    total_views=new_total_views,
+                    total_reels=new_total_reels,
+                    used_slots=new_used_slots,
+                    session=session
+                )
+    
+                await leaderboard_service.apply_view_delta(
+                    user_id,
+                    sum(reel["views"] for reel in successful_reels),
+                    username,
+                    session=session
+                )
+    
+                await metrics_service.record_samples(session, [
+                    {
+                        "user_id": user_id,
+                        "shortcode": reel["shortcode"],
+                        "insta_handle": reel["username"],
+                        "views": reel["views"],
+                        "likes": reel["likes"],
+                        "comments": reel["comments"]
+                    }
+                    for reel in successful_reels
+                ])
+    
+            if checkpoint_task_id:
+                await checkpoint_service.delete_scrape(session, checkpoint_task_id)
+            await session.commit()
+    
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Database error in submit: {str(e)}")
+            raise Exception(f"Database error: {str(e)}")
+    
+    for reel in successful_reels:
+        await audit_logger.log(
+            user_id, "submit",
+            shortcode=reel["shortcode"],
+            views=reel["views"],
+            insta_handle=reel["username"]
+        )
+    
+    return successful_reels, failed_reels
+
+def _scrape_result_messages(user_data: dict, successful_reels: list, failed_reels: list) -> Tuple[Optional[str], Optional[str]]:
+    """Success and failure summaries for a stored scrape (None when there is nothing to report)"""
+    result_text = error_text = None
+    if successful_reels:
+        result_text = f"✅ Successfully added {len(successful_reels)} reel(s):\n\n"
+        for reel in successful_reels[:5]:  # Show first 5
+            result_text += f"📊 @{reel['username']} - {reel['views']:,} views\n"
+    
+        if len(successful_reels) > 5:
+            result_text += f"\n... and {len(successful_reels) - 5} more reels"
+    
+        new_total_views = user_data["total_views"] + sum(reel["views"] for reel in successful_reels)
+        new_total_reels = user_data["total_reels"] + len(successful_reels)
+    
+        result_text += f"\n\n📈 Your total: {new_total_reels} reels, {new_total_views:,} views"
+    
+    if failed_reels:
+        error_text = f"❌ {len(failed_reels)} reel(s) could not be processed:\n\n"
+        for fail in failed_reels[:3]:  # Show first 3 failures
+            error_text += f"• {fail['url'][:50]}...\n  └ {fail['error']}\n\n"
+    
+        if len(failed_reels) > 3:
+            error_text += f"... and {len(failed_reels) - 3} more issues"
+    
+    return result_text, error_text
+
 @debug_handler
 async def submit(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle reel submission with improved error handling"""
@@ -183,52 +406,28 @@ async def submit(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("📝 Please provide Instagram reel URLs after the /submit command.\n\nExample: `/submit https://instagram.com/reel/ABC123/`")
             return
         
-        # Extract URLs from message
-        urls = []
-        
-        # Remove the /submit command and get the rest
-        if message_text.startswith('/submit'):
-            url_part = message_text[7:].strip()  # Remove '/submit' and whitespace
-            if url_part:
-                # Split by whitespace to handle multiple URLs
-                potential_urls = url_part.split()
-                for url in potential_urls:
-                    url = url.strip()
-                    if url:
-                        # Clean up the URL
-                        if 'instagram.com' in url or url.startswith('http'):
-                            urls.append(url)
-                        elif len(url) > 5:  # Assume it's a shortcode
-                            urls.append(f"https://www.instagram.com/reel/{url}/")
-        
-        if not urls:
+        # Parse, normalize and deduplicate the submitted URLs in one pass
+        parsed = parse_submission_text(message_text)
+        invalid_urls = parsed["invalid"]
+        
+        if not parsed["shortcodes"] and not invalid_urls:
             await update.message.reply_text("❌ No valid Instagram URLs found. Please provide valid Instagram reel URLs.")
             return
         
-        # Validate URLs and check for duplicates
+        # Check all shortcodes against existing reels with a single query
+        existing_codes = set()
+        if parsed["shortcodes"]:
+            async with await get_db_session() as session:
+                existing = await session.execute(_EXISTING_SHORTCODES, {"codes": parsed["shortcodes"]})
+                existing_codes = {row[0] for row in existing.fetchall()}
+        
         valid_urls = []
-        invalid_urls = []
         duplicate_urls = []
-        
-        async with await get_db_session() as session:
-            for url in urls:
-                if validate_instagram_link(url):
-                    # Extract shortcode and check if it already exists
-                    shortcode = extract_shortcode_from_url(url)
-                    if shortcode:
-                        from sqlalchemy import text
-                        existing = await session.execute(
-                            text("SELECT 1 FROM reels WHERE shortcode = :sc"),
-                            {"sc": shortcode}
-                        )
-                        if existing.fetchone():
-                            duplicate_urls.append(url)
-                        else:
-                            valid_urls.append(url)
-                    else:
-                        invalid_urls.append(url)
-                else:
-                    invalid_urls.append(url)
+        for shortcode, url in zip(parsed["shortcodes"], parsed["urls"]):
+            if shortcode in existing_codes:
+                duplicate_urls.append(url)
+            else:
+                valid_urls.append(url)
         
         if not valid_urls:
             error_msg = "❌ No valid new Instagram reel URLs found."
@@ -244,103 +443,32 @@ async def submit(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         try:
             # Create Apify task for scraping
+            from apify_client import get_apify_client
             apify_client = get_apify_client()
             task_id = await apify_client.create_scraping_task(valid_urls, "single")
             
             await processing_msg.edit_text(f"📋 Task created: {task_id}\n🔄 Processing {len(valid_urls)} reel(s)...")
             
-            # Get results
-            result = await apify_client.get_task_results(task_id, wait=True, timeout=300)
+            # Get results. A shutdown may cancel us while waiting: the scrape is already paid for,
+            # so checkpoint it and store its results after the restart (see resume_scrapes)
+            try:
+                result = await apify_client.get_task_results(task_id, wait=True, timeout=300)
+            except asyncio.CancelledError:
+                await asyncio.shield(checkpoint_service.save_scrape(
+                    task_id, user_id, update.effective_chat.id, username, valid_urls
+                ))
+                raise
             
             if result["status"] != "completed":
                 raise Exception(f"Task failed: {result.get('task_info', {}).get('error', 'Unknown error')}")
             
-            # Process results and add to database
-            successful_reels = []
-            failed_reels = []
-            
-            async with await get_db_session() as session:
-                from sqlalchemy import text
-                try:
-                    for item in result.get("results", []):
-                        if item.get("success", False):
-                            url = item.get("url")
-                            shortcode = extract_shortcode_from_url(url)
-                            
-                            if shortcode:
-                                # Insert new reel entry
-                                await session.execute(
-                                    text("""
-                                        INSERT INTO reels (user_id, shortcode, url, username, views, likes, comments, caption, media_url, submitted_at, last_updated)
-                                        VALUES (:user_id, :shortcode, :url, :username, :views, :likes, :comments, :caption, :media_url, :submitted_at, :last_updated)
-                                    """),
-                                    {
-                                        "user_id": user_id,
-                                        "shortcode": shortcode,
-                                        "url": url,
-                                        "username": item.get("username", ""),
-                                        "views": item.get("views", 0),
-                                        "likes": item.get("likes", 0),
-                                        "comments": item.get("comments", 0),
-                                        "caption": item.get("caption", "")[:500],  # Limit caption length
-                                        "media_url": item.get("media_url", ""),
-                                        "submitted_at": datetime.now(),
-                                        "last_updated": datetime.now()
-                                    }
-                                )
-                                
-                                successful_reels.append({
-                                    "shortcode": shortcode,
-                                    "username": item.get("username", ""),
-                                    "views": item.get("views", 0)
-                                })
-                        else:
-                            failed_reels.append({"url": item.get("url", "unknown"), "error": item.get("error", "Unknown error")})
-                    
-                    # Update user statistics
-                    if successful_reels:
-                        new_total_views = user_data["total_views"] + sum(reel["views"] for reel in successful_reels)
-                        new_total_reels = user_data["total_reels"] + len(successful_reels)
-                        new_used_slots = user_data["used_slots"] + len(successful_reels)
-                        
-                        await user_service.update_user_stats(
-                            user_id, 
-                            total_views=new_total_views,
-                            total_reels=new_total_reels,
-                            used_slots=new_used_slots
-                        )
-                    
-                    await session.commit()
-                    
-                except Exception as e:
-                    await session.rollback()
-                    logger.error(f"Database error in submit: {str(e)}")
-                    raise Exception(f"Database error: {str(e)}")
+            successful_reels, failed_reels = await _store_scrape_results(user_id, username, user_data, result)
             
             # Send results to user
-            if successful_reels:
-                result_text = f"✅ Successfully added {len(successful_reels)} reel(s):\n\n"
-                for reel in successful_reels[:5]:  # Show first 5
-                    result_text += f"📊 @{reel['username']} - {reel['views']:,} views\n"
-                
-                if len(successful_reels) > 5:
-                    result_text += f"\n... and {len(successful_reels) - 5} more reels"
-                
-                new_total_views = user_data["total_views"] + sum(reel["views"] for reel in successful_reels)
-                new_total_reels = user_data["total_reels"] + len(successful_reels)
-                
-                result_text += f"\n\n📈 Your total: {new_total_reels} reels, {new_total_views:,} views"
-                
+            result_text, error_text = _scrape_result_messages(user_data, successful_reels, failed_reels)
+            if result_text:
                 await processing_msg.edit_text(result_text)
-            
-            if failed_reels:
-                error_text = f"❌ {len(failed_reels)} reel(s) could not be processed:\n\n"
-                for fail in failed_reels[:3]:  # Show first 3 failures
-                    error_text += f"• {fail['url'][:50]}...\n  └ {fail['error']}\n\n"
-                
-                if len(failed_reels) > 3:
-                    error_text += f"... and {len(failed_reels) - 3} more issues"
-                
+            if error_text:
                 await update.message.reply_text(error_text)
             
         except Exception as e:
@@ -363,30 +491,34 @@ async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
         
         # Get payment details
-        async with await get_db_session() as session:
-            from sqlalchemy import text
-            payment_result = await session.execute(
-                text("SELECT usdt_address, paypal_email, upi_address FROM payment_details WHERE user_id = :u"),
-                {"u": user_id}
-            )
+        async with await get_db_read_session(user_id) as session:
+            payment_result = await session.execute(_PAYMENT_DETAILS, {"u": user_id})
             payment_data = payment_result.fetchone()
             
             # Get linked accounts
-            accounts_result = await session.execute(
-                text("SELECT insta_handle FROM allowed_accounts WHERE user_id = :u"),
-                {"u": user_id}
-            )
+            accounts_result = await session.execute(_LINKED_ACCOUNTS, {"u": user_id})
             accounts = [row[0] for row in accounts_result.fetchall()]
+            
+            referral = await referral_service.get_balance(user_id, session=session)
         
         # Build profile message
         payout = calculate_payout(user_data["total_views"])
+        views_this_week = await metrics_service.views_gained(user_id, days=7)
         
         msg = [
             "👤 <b>Your Profile</b>",
             f"• Total Views: <b>{user_data['total_views']:,}</b>",
+            f"• Views This Week: <b>+{views_this_week:,}</b>",
             f"• Total Reels: <b>{user_data['total_reels']}</b>",
             f"• Slots Used: <b>{user_data['used_slots']}/{user_data['max_slots']}</b>",
             f"• Payable Amount: <b>${payout:.2f}</b>",
+        ]
+        if referral:
+            msg.append(
+                f"• Referral Earnings: <b>${referral['commission']:.2f}</b> "
+                f"({referral['referred_views']:,} referred views)"
+            )
+        msg += [
             f"• Account Status: <b>{'Approved' if user_data['approved'] else 'Pending'}</b>",
             "",
             "📸 <b>Linked Accounts:</b>"
@@ -413,12 +545,131 @@ async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
         else:
             msg.append("• No payment methods added")
         
-        await update.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML)
+        text_msg = "\n".join(msg)
+        card_stats = {
+            "username": user_data["username"],
+            "total_views": user_data["total_views"],
+            "total_reels": user_data["total_reels"],
+            "used_slots": user_data["used_slots"],
+            "max_slots": user_data["max_slots"],
+            "payout": payout,
+            "accounts": accounts,
+        }
+        
+        from rendering.profile_card import get_profile_cards
+        profile_cards = get_profile_cards()
+        try:
+            photo = await profile_cards.get_photo(user_id, card_stats)
+        except Exception as e:
+            logger.error(f"Profile card render failed, sending text: {e}")
+            photo = None
+        
+        if photo is None:
+            await update.message.reply_text(text_msg, parse_mode=ParseMode.HTML)
+            return
+        
+        # Telegram captions are limited to 1024 characters
+        caption_fits = len(text_msg) <= 1024
+        sent = await update.message.reply_photo(
+            photo,
+            caption=text_msg if caption_fits else None,
+            parse_mode=ParseMode.HTML if caption_fits else None
+        )
+        if sent.photo:
+            profile_cards.remember_file_id(user_id, card_stats, sent.photo[-1].file_id)
+        if not caption_fits:
+            await update.message.reply_text(text_msg, parse_mode=ParseMode.HTML)
         
     except Exception as e:
         logger.error(f"Error in profile command: {str(e)}")
         await update.message.reply_text(f"❌ An error occurred: {str(e)}")
 
+def _leaderboard_page_markup(rows, last_rank: int):
+    """Build the 'Next' button carrying the keyset of the page's last row"""
+    if len(rows) < leaderboard_service.page_size:
+        return None
+    last = rows[-1]
+    return InlineKeyboardMarkup([[InlineKeyboardButton(
+        "Next ▶",
+        callback_data=f"lb:{last_rank}:{last['total_views']}:{last['user_id']}"
+    )]])
+
+def _format_leaderboard_rows(rows, first_rank: int) -> list:
+    lines = []
+    for offset, row in enumerate(rows):
+        name = f"@{row['username']}" if row["username"] else str(row["user_id"])
+        lines.append(f"{first_rank + offset}. {name} — <b>{format_views(row['total_views'])}</b> views")
+    return lines
+
+@debug_handler
+async def leaderboard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the rendered top of the leaderboard and the user's own rank"""
+    user_id = update.effective_user.id
+    
+    from rendering.leaderboard import get_leaderboard_images
+    leaderboard_images = get_leaderboard_images()
+    
+    # Read the version before the rows so a concurrent change can only make the cache older, never wrong
+    version = leaderboard_service.version
+    cached = leaderboard_images.get(version)
+    if cached is None:
+        rows = await leaderboard_service.get_page()
+        if not rows:
+            return await update.message.reply_text("🏆 The leaderboard is empty. Submit reels with /submit to get on it!")
+        
+        try:
+            cached = await leaderboard_images.render(version, rows)
+        except Exception as e:
+            logger.error(f"Leaderboard render failed, sending text: {e}")
+            cached = {"rows": rows, "photo": None}
+    
+    rows = cached["rows"]
+    own = await leaderboard_service.get_rank(user_id)
+    own_line = (
+        f"📍 Your rank: <b>#{own['rank']}</b> with <b>{format_views(own['total_views'])}</b> views"
+        if own else "📍 You are not ranked yet"
+    )
+    markup = _leaderboard_page_markup(rows, len(rows))
+    
+    if cached["photo"] is None:
+        msg = ["🏆 <b>Leaderboard</b>", ""] + _format_leaderboard_rows(rows, 1) + ["", own_line]
+        return await update.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML, reply_markup=markup)
+    
+    sent = await update.message.reply_photo(
+        cached["photo"],
+        caption=f"🏆 <b>Leaderboard</b>\n\n{own_line}",
+        parse_mode=ParseMode.HTML,
+        reply_markup=markup
+    )
+    if sent.photo:
+        leaderboard_images.remember_file_id(version, sent.photo[-1].file_id)
+
+@debug_handler
+async def leaderboard_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show the next leaderboard page (keyset pagination via callback data)"""
+    query = update.callback_query
+    await query.answer()
+    
+    try:
+        _, last_rank, last_views, last_user_id = query.data.split(":")
+        last_rank, after = int(last_rank), (int(last_views), int(last_user_id))
+    except ValueError:
+        return
+    
+    rows = await leaderboard_service.get_page(after)
+    if not rows:
+        return await query.edit_message_reply_markup(reply_markup=None)
+    
+    msg = ["🏆 <b>Leaderboard</b>", ""] + _format_leaderboard_rows(rows, last_rank + 1)
+    markup = _leaderboard_page_markup(rows, last_rank + len(rows))
+    
+    # The first page is a photo, which cannot be edited into text
+    if query.message.photo:
+        await query.edit_message_reply_markup(reply_markup=None)
+        return await query.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML, reply_markup=markup)
+    
+    await query.edit_message_text("\n".join(msg), parse_mode=ParseMode.HTML, reply_markup=markup)
+
 @debug_handler
 async def addaccount(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Request to link an Instagram account"""
@@ -433,13 +684,8 @@ async def addaccount(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     
     async with await get_db_session() as session:
-        from sqlalchemy import text
-        
         # Check if user already has 15 linked accounts
-        account_count = (await session.execute(
-            text("SELECT COUNT(*) FROM allowed_accounts WHERE user_id = :u"),
-            {"u": user_id}
-        )).scalar() or 0
+        account_count = (await session.execute(_LINKED_COUNT, {"u": user_id})).scalar() or 0
         
         if account_count >= 15:
             return await update.message.reply_text(
@@ -448,19 +694,13 @@ async def addaccount(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
         
         # Check if this handle is already linked
-        existing_handle = (await session.execute(
-            text("SELECT 1 FROM allowed_accounts WHERE user_id = :u AND insta_handle = :h"),
-            {"u": user_id, "h": handle}
-        )).fetchone()
+        existing_handle = (await session.execute(_LINKED_DUPLICATE, {"u": user_id, "h": handle})).fetchone()
         
         if existing_handle:
             return await update.message.reply_text(f"❌ You have already linked @{handle}")
         
         # Check number of pending requests
-        pending_count = (await session.execute(
-            text("SELECT COUNT(*) FROM account_requests WHERE user_id = :u AND status = 'pending'"),
-            {"u": user_id}
-        )).scalar() or 0
+        pending_count = (await session.execute(_PENDING_REQUEST_COUNT, {"u": user_id})).scalar() or 0
         
         if pending_count >= 5:
             return await update.message.reply_text(
@@ -470,10 +710,7 @@ async def addaccount(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Check if there's already a pending request for this handle
         pending = (await session.execute(
-            text("""
-                SELECT 1 FROM account_requests 
-                WHERE user_id = :u AND insta_handle = :h AND status = 'pending'
-            """),
+            _PENDING_DUPLICATE,
             {"u": user_id, "h": handle}
         )).fetchone()
         
@@ -485,13 +722,11 @@ async def addaccount(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         # Create new request
         await session.execute(
-            text("""
-                INSERT INTO account_requests (user_id, insta_handle)
-                VALUES (:u, :h)
-            """),
+            _INSERT_REQUEST,
             {"u": user_id, "h": handle}
         )
         await session.commit()
+        mark_user_write(user_id)
         
         # Notify admins
         admin_notifications_sent = 0
@@ -548,11 +783,9 @@ async def addusdt(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         async with await get_db_session() as session:
-            from sqlalchemy import text
-            
             # Check if user exists
             user = (await session.execute(
-                text("SELECT 1 FROM users WHERE user_id = :u"),
+                _USER_EXISTS,
                 {"u": user_id}
             )).fetchone()
             
@@ -561,14 +794,14 @@ async def addusdt(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             # Check if payment details exist
             existing = (await session.execute(
-                text("SELECT id FROM payment_details WHERE user_id = :u"),
+                _PAYMENT_DETAILS_ROW,
                 {"u": user_id}
             )).fetchone()
             
             if existing:
                 # Update USDT address
                 await session.execute(
-                    text("UPDATE payment_details SET usdt_address = :a WHERE user_id = :u"),
+                    _SET_USDT,
                     {"a": usdt_address, "u": user_id}
                 )
                 await update.message.reply_text(
@@ -578,10 +811,7 @@ async def addusdt(update: Update, context: ContextTypes.DEFAULT_TYPE):
             else:
                 # Insert new payment details with USDT
                 await session.execute(
-                    text("""
-                        INSERT INTO payment_details (user_id, usdt_address)
-                        VALUES (:u, :a)
-                    """),
+                    _INSERT_USDT,
                     {"u": user_id, "a": usdt_address}
                 )
                 await update.message.reply_text(
@@ -590,6 +820,7 @@ async def addusdt(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
             
             await session.commit()
+            mark_user_write(user_id)
             
     except Exception as e:
         logger.error(f"Error in addusdt: {str(e)}")
@@ -614,11 +845,9 @@ async def addpaypal(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         async with await get_db_session() as session:
-            from sqlalchemy import text
-            
             # Check if user exists
             user = (await session.execute(
-                text("SELECT 1 FROM users WHERE user_id = :u"),
+                _USER_EXISTS,
                 {"u": user_id}
             )).fetchone()
             
@@ -627,14 +856,14 @@ async def addpaypal(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             # Check if payment details exist
             existing = (await session.execute(
-                text("SELECT id FROM payment_details WHERE user_id = :u"),
+                _PAYMENT_DETAILS_ROW,
                 {"u": user_id}
             )).fetchone()
             
             if existing:
                 # Update PayPal email
                 await session.execute(
-                    text("UPDATE payment_details SET paypal_email = :e WHERE user_id = :u"),
+                    _SET_PAYPAL,
                     {"e": paypal_email, "u": user_id}
                 )
                 await update.message.reply_text(
@@ -644,10 +873,7 @@ async def addpaypal(update: Update, context: ContextTypes.DEFAULT_TYPE):
             else:
                 # Insert new payment details with PayPal
                 await session.execute(
-                    text("""
-                        INSERT INTO payment_details (user_id, paypal_email)
-                        VALUES (:u, :e)
-                    """),
+                    _INSERT_PAYPAL,
                     {"u": user_id, "e": paypal_email}
                 )
                 await update.message.reply_text(
@@ -656,6 +882,7 @@ async def addpaypal(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
             
             await session.commit()
+            mark_user_write(user_id)
             
     except Exception as e:
         logger.error(f"Error in addpaypal: {str(e)}")
@@ -680,11 +907,9 @@ async def addupi(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         async with await get_db_session() as session:
-            from sqlalchemy import text
-            
             # Check if user exists
             user = (await session.execute(
-                text("SELECT 1 FROM users WHERE user_id = :u"),
+                _USER_EXISTS,
                 {"u": user_id}
             )).fetchone()
             
@@ -693,14 +918,14 @@ async def addupi(update: Update, context: ContextTypes.DEFAULT_TYPE):
             
             # Check if payment details exist
             existing = (await session.execute(
-                text("SELECT id FROM payment_details WHERE user_id = :u"),
+                _PAYMENT_DETAILS_ROW,
                 {"u": user_id}
             )).fetchone()
             
             if existing:
                 # Update UPI address
                 await session.execute(
-                    text("UPDATE payment_details SET upi_address = :a WHERE user_id = :u"),
+                    _SET_UPI,
                     {"a": upi_address, "u": user_id}
                 )
                 await update.message.reply_text(
@@ -710,10 +935,7 @@ async def addupi(update: Update, context: ContextTypes.DEFAULT_TYPE):
             else:
                 # Insert new payment details with UPI
                 await session.execute(
-                    text("""
-                        INSERT INTO payment_details (user_id, upi_address)
-                        VALUES (:u, :a)
-                    """),
+                    _INSERT_UPI,
                     {"u": user_id, "a": upi_address}
                 )
                 await update.message.reply_text(
@@ -722,61 +944,667 @@ async def addupi(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 )
             
             await session.commit()
+            mark_user_write(user_id)
             
     except Exception as e:
         logger.error(f"Error in addupi: {str(e)}")
         await update.message.reply_text(f"❌ An error occurred: {str(e)}")
 
+def _start_admin_job(update: Update, name: str, job: Callable[[], Awaitable]) -> bool:
+    """Run a long admin command as a background job so it doesn't hold up other users' updates
+
+    The job replies itself when it finishes; returns False if the same job is still running.
+    """
+    async def run():
+        try:
+            await job()
+        except asyncio.CancelledError:
+            await update.message.reply_text(f"⏹️ {name} was interrupted by a shutdown. Please run it again.")
+            raise
+        except Exception as e:
+            logger.exception(f"Admin job {name} failed")
+            await update.message.reply_text(f"❌ {name} failed: {e}")
+    
+    return get_background_tasks().start_once(name, run) is not None
+
+@debug_handler
+async def invoices(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: render invoices for a stored payout batch, optionally delivering them"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    args = [arg.lower() for arg in context.args or []]
+    deliver = "send" in args
+    batch_ids = [int(arg) for arg in args if arg.isdigit()]
+    
+    async def job():
+        status_msg = await update.message.reply_text("🧾 Loading payout batch...")
+        last_edit = 0.0
+        
+        async def progress(done: int, total: int, elapsed: float):
+            nonlocal last_edit
+            # Edit at most every few seconds to stay inside Telegram's rate limits
+            if done < total and elapsed - last_edit < 3:
+                return
+            last_edit = elapsed
+            rate = done / elapsed if elapsed else 0
+            try:
+                await status_msg.edit_text(f"🧾 Rendered {done}/{total} invoices ({rate:.0f}/s)...")
+            except Exception as e:
+                logger.debug(f"Progress edit skipped: {e}")
+        
+        from services.invoice_service import get_invoice_service
+        stats = await get_invoice_service().generate_batch(
+            context.bot, deliver=deliver, progress=progress, batch_id=batch_ids[0] if batch_ids else None
+        )
+        if stats["batch_id"] is None or not stats["total"]:
+            return await status_msg.edit_text("ℹ️ No payout batch to invoice. Run /payoutrun first.")
+        await audit_logger.log(update.effective_user.id, "admin_invoices_send" if deliver else "admin_invoices",
+                               detail={"batch_id": stats["batch_id"], "rendered": stats["rendered"],
+                                       "delivered": stats["delivered"]})
+        
+        summary = [
+            f"✅ Invoice batch <code>{stats['batch_id']}</code> finished",
+            f"• Rendered: <b>{stats['rendered']}/{stats['total']}</b>",
+            f"• Time: <b>{stats['seconds']}s</b> ({stats['per_second']}/s)",
+            f"• Saved to: <code>{stats['output_dir']}</code>",
+        ]
+        if stats["render_failed"]:
+            summary.append(f"• Render failures: <b>{stats['render_failed']}</b>")
+        if deliver:
+            summary.append(f"• Delivered: <b>{stats['delivered']}</b>, failed: <b>{stats['delivery_failed']}</b>")
+        await status_msg.edit_text("\n".join(summary), parse_mode=ParseMode.HTML)
+    
+    if not _start_admin_job(update, "Invoice generation", job):
+        await update.message.reply_text("ℹ️ Invoices are already being generated. You'll get a message when they're done.")
+
+@debug_handler
+async def payoutrun(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: compute and store a payout batch for all users"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    async def job():
+        status_msg = await update.message.reply_text("💸 Computing payouts...")
+        from services.payout_service import get_payout_service
+        summary = await get_payout_service().run_batch()
+        await audit_logger.log(update.effective_user.id, "admin_payout_run",
+                               detail={"batch_id": summary["batch_id"], "user_count": summary["user_count"]})
+        
+        if summary["batch_id"] is None:
+            return await status_msg.edit_text("ℹ️ No users to pay out.")
+        
+        await status_msg.edit_text(
+            f"✅ Payout batch <code>{summary['batch_id']}</code> stored\n"
+            f"• Users: <b>{summary['user_count']}</b>\n"
+            f"• Gross: <b>${summary['total_gross']:,.2f}</b>\n"
+            f"• Net (after tax, incl. referrals): <b>${summary['total_net']:,.2f}</b>\n"
+            f"• Time: <b>{summary['seconds']}s</b>",
+            parse_mode=ParseMode.HTML
+        )
+    
+    if not _start_admin_job(update, "Payout run", job):
+        await update.message.reply_text("ℹ️ A payout run is already in progress. You'll get a message when it's done.")
+
+@debug_handler
+async def userstats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: show aggregated user and reel statistics"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    stats = await get_stats_service().get_snapshot()
+    users, reels, pct = stats["users"], stats["reels"], stats["views_percentiles"]
+    
+    msg = [
+        "📊 <b>User Statistics</b>",
+        f"• Users: <b>{users['total']:,}</b> (✅ {users['approved']:,} approved, ⏳ {users['pending']:,} pending)",
+        f"• Total views: <b>{users['total_views']:,}</b>",
+        f"• Reels: <b>{reels['total']:,}</b> from <b>{reels['submitters']:,}</b> users",
+        f"• Pending account requests: <b>{stats['pending_account_requests']:,}</b>",
+        "",
+        "📈 <b>Views per user</b>",
+        f"• p50 {format_views(pct['p50'])} · p90 {format_views(pct['p90'])} · "
+        f"p99 {format_views(pct['p99'])} · max {format_views(pct['max'])}",
+        "",
+        "🗓 <b>Reels per day</b>",
+    ]
+    if stats["reels_per_day"]:
+        msg.extend(f"• {day:%Y-%m-%d}: {count}" for day, count in stats["reels_per_day"])
+    else:
+        msg.append("• No recent submissions")
+    
+    msg.extend(["", "🏅 <b>Top accounts</b>"])
+    if stats["top_accounts"]:
+        msg.extend(
+            f"• @{acc['username']}: {format_views(acc['views'])} views, {acc['reels']} reels"
+            for acc in stats["top_accounts"]
+        )
+    else:
+        msg.append("• None yet")
+    
+    msg.append(f"\n<i>Updated {stats['computed_at']:%H:%M:%S}</i>")
+    await update.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML)
+
+async def _send_export(update: Update, context: ContextTypes.DEFAULT_TYPE, table: str, fmt: str):
+    async def job():
+        from services.export_service import get_export_service
+        status_msg = await update.message.reply_text(f"📦 Exporting {table}...")
+        try:
+            stats = await get_export_service().export_table(table, fmt)
+        except ValueError as e:
+            return await status_msg.edit_text(f"❌ {e}")
+        await audit_logger.log(update.effective_user.id, f"admin_export_{table}", detail={"rows": stats["rows"]})
+        
+        caption = f"📦 {table}: {stats['rows']:,} rows in {stats['seconds']}s"
+        # Bots can upload at most 50 MB; larger exports stay on disk
+        if stats["bytes"] > 50 * 1024 * 1024:
+            return await status_msg.edit_text(f"{caption}\n⚠️ File too large to send, saved at {stats['path']}")
+        
+        with open(stats["path"], "rb") as document:
+            await context.bot.send_document(
+                update.effective_chat.id,
+                document,
+                filename=os.path.basename(stats["path"]),
+                caption=caption
+            )
+        os.remove(stats["path"])
+        await status_msg.delete()
+    
+    if not _start_admin_job(update, f"Export of {table}", job):
+        await update.message.reply_text(f"ℹ️ {table} is already being exported. The file will be sent when it's ready.")
+
+@debug_handler
+async def export(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: stream a full table export as a compressed file"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    from services.export_service import EXPORT_QUERIES
+    if not context.args or context.args[0] not in EXPORT_QUERIES:
+        return await update.message.reply_text(
+            "❗ Usage: /export <table> [csv|parquet]\n"
+            f"Tables: {', '.join(EXPORT_QUERIES)}"
+        )
+    
+    fmt = context.args[1].lower() if len(context.args) > 1 else "csv"
+    await _send_export(update, context, context.args[0], fmt)
+
+@debug_handler
+async def currentaccounts(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: export all linked Instagram accounts"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    await _send_export(update, context, "allowed_accounts", "csv")
+
+def _parse_user_id_arg(context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
+    if not context.args or not context.args[0].lstrip("-").isdigit():
+        return None
+    return int(context.args[0])
+
+@debug_handler
+async def banuser(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: ban a user; their data is purged in the background"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    target_id = _parse_user_id_arg(context)
+    if target_id is None:
+        return await update.message.reply_text("❗ Usage: /banuser <user_id>")
+    if await admin_service.is_admin(target_id):
+        return await update.message.reply_text("❌ Admins cannot be banned.")
+    
+    if not await user_service.ban_user(target_id):
+        return await update.message.reply_text("❌ Failed to ban user. Please try again.")
+    
+    await audit_logger.log(update.effective_user.id, "admin_ban", detail={"target_id": target_id})
+    await update.message.reply_text(
+        f"🚫 User <code>{target_id}</code> banned.\n"
+        f"🧹 Their data is being removed in the background; check with /purgestatus {target_id}",
+        parse_mode=ParseMode.HTML
+    )
+
+@debug_handler
+async def unban(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: lift a ban"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    target_id = _parse_user_id_arg(context)
+    if target_id is None:
+        return await update.message.reply_text("❗ Usage: /unban <user_id>")
+    
+    if not await user_service.unban_user(target_id):
+        return await update.message.reply_text(f"ℹ️ User <code>{target_id}</code> is not banned.", parse_mode=ParseMode.HTML)
+    
+    await audit_logger.log(update.effective_user.id, "admin_unban", detail={"target_id": target_id})
+    await update.message.reply_text(f"✅ User <code>{target_id}</code> unbanned.", parse_mode=ParseMode.HTML)
+
+@debug_handler
+async def purgestatus(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: show progress of ban purge jobs"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    jobs = await purge_service.get_jobs(_parse_user_id_arg(context))
+    if not jobs:
+        return await update.message.reply_text("ℹ️ No purge jobs found.")
+    
+    status_icons = {"pending": "⏳", "running": "🔄", "done": "✅", "failed": "❌", "cancelled": "🛑"}
+    msg = ["🧹 <b>Purge jobs</b>"]
+    for job in jobs:
+        line = (
+            f"{status_icons.get(job['status'], '•')} #{job['id']} user <code>{job['user_id']}</code>: "
+            f"{job['status']}, {job['deleted_rows']:,} rows deleted"
+        )
+        if job["status"] == "running" and job["current_table"]:
+            line += f" (on {job['current_table']})"
+        if job["status"] == "pending" and job["next_attempt_at"]:
+            line += f" (attempt {job['attempts'] + 1} at {job['next_attempt_at']:%H:%M})"
+        if job["error"]:
+            line += f"\n   └ {html.escape(job['error'][:100])}"
+        msg.append(line)
+    await update.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML)
+
+@debug_handler
+async def referrals(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: show a referrer's ledger balance, or reconcile the ledger now"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    if context.args and context.args[0].lower() == "reconcile":
+        async def job():
+            status_msg = await update.message.reply_text("🤝 Reconciling the referral ledger...")
+            stats = await referral_service.reconcile()
+            await audit_logger.log(update.effective_user.id, "admin_referral_reconcile", detail=stats)
+            await status_msg.edit_text(
+                f"{'⚠️' if stats['drifted_pairs'] else '✅'} Referral ledger reconciled in {stats['seconds']}s\n"
+                f"• Drifted referees: <b>{stats['drifted_pairs']}</b> ({stats['drifted_referrers']} referrers)\n"
+                f"• View drift: <b>{stats['views_drift']:,}</b>, commission drift: <b>${stats['commission_drift']:,.2f}</b>\n"
+                f"• Balances rewritten: <b>{stats['balances_rewritten']}</b>"
+                + ("" if stats["adjusted"] else "\n<i>Report only (REFERRAL_RECONCILE_ADJUST=false)</i>"),
+                parse_mode=ParseMode.HTML
+            )
+        
+        if not _start_admin_job(update, "Referral reconciliation", job):
+            await update.message.reply_text("ℹ️ A reconciliation is already running. You'll get a message when it's done.")
+        return
+    
+    referrer_id = _parse_user_id_arg(context)
+    if referrer_id is None:
+        return await update.message.reply_text("❗ Usage: /referrals <user_id>|reconcile")
+    
+    balance = await referral_service.get_balance(referrer_id)
+    if not balance:
+        return await update.message.reply_text(f"ℹ️ User {referrer_id} has no referral earnings.")
+    await update.message.reply_text(
+        f"🤝 <b>Referrals of</b> <code>{referrer_id}</code>\n"
+        f"• Referred views: <b>{balance['referred_views']:,}</b>\n"
+        f"• Commission: <b>${balance['commission']:,.2f}</b>\n"
+        f"<i>Updated {balance['updated_at']:%Y-%m-%d %H:%M}</i>",
+        parse_mode=ParseMode.HTML
+    )
+
+@debug_handler
+async def slots(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: show per-slot totals, or rescrape all slot accounts now"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    arg = context.args[0].lower() if context.args else None
+    if arg == "refresh":
+        async def job():
+            status_msg = await update.message.reply_text("🎰 Rescraping slot accounts...")
+            stats = await slot_service.refresh()
+            await audit_logger.log(update.effective_user.id, "admin_slot_refresh", detail=stats)
+            await status_msg.edit_text(
+                f"✅ Slot refresh done in {stats['seconds']}s\n"
+                f"• Accounts: <b>{stats['handles']}</b>, reels seen: <b>{stats['reels']:,}</b>\n"
+                f"• New: <b>{stats['new']:,}</b>, views updated: <b>{stats['updated']:,}</b>"
+                + (f"\n• Failed batches: <b>{stats['failed_batches']}</b>" if stats["failed_batches"] else ""),
+                parse_mode=ParseMode.HTML
+            )
+        
+        if not _start_admin_job(update, "Slot refresh", job):
+            await update.message.reply_text("ℹ️ A slot refresh is already running. You'll get a message when it's done.")
+        return
+    
+    if arg is not None and not arg.isdigit():
+        return await update.message.reply_text("❗ Usage: /slots [slot|refresh]")
+    
+    totals = await slot_service.get_totals(int(arg) if arg else None)
+    if not totals:
+        return await update.message.reply_text("ℹ️ No slot reels recorded yet.")
+    
+    msg = ["🎰 <b>Slot totals</b>"]
+    msg.extend(
+        f"• Slot {row['slot_number']}: <b>{format_views(row['total_views'])}</b> views, "
+        f"{row['reels']:,} reels from {row['accounts']} accounts"
+        for row in totals
+    )
+    await update.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML)
+
+@debug_handler
+async def userlogs(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: show a user's recent submission log entries"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    target_id = _parse_user_id_arg(context)
+    if target_id is None or (len(context.args) > 1 and not context.args[1].isdigit()):
+        return await update.message.reply_text("❗ Usage: /userlogs <user_id> [days]")
+    days = min(int(context.args[1]), 365) if len(context.args) > 1 else 30
+    
+    logs = await user_service.get_submission_logs(target_id, datetime.now() - timedelta(days=days), limit=30)
+    if not logs:
+        return await update.message.reply_text(f"ℹ️ No log entries for {target_id} in the last {days} days.")
+    
+    msg = [f"📜 <b>Logs of</b> <code>{target_id}</code> (last {days} days, newest first)"]
+    for entry in logs:
+        line = f"• {entry['created_at']:%Y-%m-%d %H:%M} {html.escape(entry['action'])}"
+        if entry["shortcode"]:
+            line += f" <code>{html.escape(entry['shortcode'])}</code>"
+        if entry["views"]:
+            line += f" {format_views(entry['views'])} views"
+        msg.append(line)
+    await update.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML)
+
+@debug_handler
+async def forceupdate(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: rescrape every tracked reel and apply the view changes"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    async def job():
+        status_msg = await update.message.reply_text("🔄 Updating all reel views...")
+        stats = await reel_update_service.update_all()
+        await audit_logger.log(update.effective_user.id, "admin_force_update", detail=stats)
+        await status_msg.edit_text(
+            f"✅ Reel update done in {stats['seconds']}s\n"
+            f"• Reels: <b>{stats['reels']:,}</b>, scraped: <b>{stats['scraped']:,}</b>\n"
+            f"• Changed: <b>{stats['changed']:,}</b>"
+            + (f"\n• Failed batches: <b>{stats['failed_batches']}</b>" if stats["failed_batches"] else ""),
+            parse_mode=ParseMode.HTML
+        )
+    
+    if not _start_admin_job(update, "Reel update", job):
+        await update.message.reply_text("ℹ️ A reel update is already running. You'll get a message when it's done.")
+
+@debug_handler
+async def growth(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: show daily views gained by a user or an Instagram handle"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    args = context.args or []
+    if not args or (len(args) > 1 and not args[1].isdigit()):
+        return await update.message.reply_text("❗ Usage: /growth <user_id|@handle> [days]")
+    days = min(int(args[1]), 90) if len(args) > 1 else 30
+    
+    target = args[0]
+    if target.lstrip("-").isdigit():
+        series = await metrics_service.daily_series(int(target), days)
+        title = f"user <code>{target}</code>"
+    else:
+        handle = target.lstrip("@")
+        series = await metrics_service.handle_daily_series(handle, days)
+        title = f"@{html.escape(handle)}"
+    
+    if not series:
+        return await update.message.reply_text(f"ℹ️ No views gained in the last {days} days.")
+    
+    msg = [f"📈 <b>Daily views of {title}</b> (last {days} days)"]
+    msg.extend(f"• {day:%Y-%m-%d}: <b>{format_views(views)}</b>" for day, views in series)
+    msg.append(f"Total: <b>{format_views(sum(views for _, views in series))}</b>")
+    await update.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML)
+
+async def _send_profile(bot, chat_id: int):
+    result = await get_profiler().wait()
+    if not result or "path" not in result:
+        return await bot.send_message(chat_id, f"❌ Profiling failed: {(result or {}).get('error', 'unknown error')}")
+    
+    top = "\n".join(f"• {root}: {share}%" for root, share in result["top"])
+    with open(result["path"], "rb") as document:
+        await bot.send_document(
+            chat_id,
+            document,
+            filename=os.path.basename(result["path"]),
+            caption=f"🔬 {result['samples']} samples over {result['seconds']}s\n{top}"[:1024]
+        )
+
+@debug_handler
+async def profiler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin: sample the event loop for a window and send a collapsed-stack profile"""
+    if not await admin_service.is_admin(update.effective_user.id):
+        return await update.message.reply_text("❌ This command is only available to admins.")
+    
+    sampler = get_profiler()
+    action = context.args[0].lower() if context.args else ""
+    
+    if action == "status":
+        lag = loop_monitor.stats()
+        msg = [
+            f"🔬 Profiler: <b>{'running' if sampler.running else 'idle'}</b>",
+            f"🐢 Loop lag: {lag['lag_ms']} ms (max {lag['max_lag_ms']} ms)",
+        ]
+        for spike in lag["spikes"][-5:]:
+            msg.append(f"• {spike['at']}: {spike['lag_ms']} ms in {html.escape(spike['handler'] or 'no handler')}")
+        return await update.message.reply_text("\n".join(msg), parse_mode=ParseMode.HTML)
+    
+    if action == "stop":
+        if not sampler.running:
+            return await update.message.reply_text("ℹ️ No profile is running.")
+        sampler.stop()
+        return await update.message.reply_text("🛑 Stopping; the profile will be sent shortly.")
+    
+    try:
+        seconds = float(action) if action else None
+    except ValueError:
+        return await update.message.reply_text("❗ Usage: /profiler [seconds|stop|status]")
+    
+    if not sampler.start(seconds):
+        return await update.message.reply_text("ℹ️ A profile is already running. Use /profiler stop to end it.")
+    
+    await audit_logger.log(update.effective_user.id, "admin_profiler")
+    await update.message.reply_text(
+        f"🔬 Profiling for {min(seconds or sampler.default_seconds, sampler.max_seconds):.0f}s; "
+        "the collapsed-stack file will be sent when done."
+    )
+    asyncio.create_task(_send_profile(context.bot, update.effective_chat.id))
+
+def build_application(bot=None) -> Application:
+    """Create the bot application with all handlers registered (bot overrides the token, e.g. for benchmarks)"""
+    builder = ApplicationBuilder()
+    builder = builder.bot(bot) if bot is not None else builder.token(TOKEN)
+    # Updates are handled one at a time unless BOT_CONCURRENT_UPDATES allows more in flight
+    concurrent_updates = int(os.getenv("BOT_CONCURRENT_UPDATES", 1))
+    app = builder.concurrent_updates(concurrent_updates if concurrent_updates > 1 else False).build()
+    
+    app.add_handler(CommandHandler("start", start_cmd))
+    app.add_handler(CommandHandler("submit", submit))
+    app.add_handler(CommandHandler("profile", profile))
+    app.add_handler(CommandHandler("leaderboard", leaderboard))
+    app.add_handler(CallbackQueryHandler(leaderboard_page, pattern=r"^lb:"))
+    app.add_handler(CommandHandler("addaccount", addaccount))
+    app.add_handler(CommandHandler("addusdt", addusdt))
+    app.add_handler(CommandHandler("addpaypal", addpaypal))
+    app.add_handler(CommandHandler("addupi", addupi))
+    app.add_handler(CommandHandler("invoices", invoices))
+    app.add_handler(CommandHandler("payoutrun", payoutrun))
+    app.add_handler(CommandHandler("userstats", userstats))
+    app.add_handler(CommandHandler("export", export))
+    app.add_handler(CommandHandler("currentaccounts", currentaccounts))
+    app.add_handler(CommandHandler("banuser", banuser))
+    app.add_handler(CommandHandler("unban", unban))
+    app.add_handler(CommandHandler("purgestatus", purgestatus))
+    app.add_handler(CommandHandler("slots", slots))
+    app.add_handler(CommandHandler("referrals", referrals))
+    app.add_handler(CommandHandler("userlogs", userlogs))
+    app.add_handler(CommandHandler("forceupdate", forceupdate))
+    app.add_handler(CommandHandler("growth", growth))
+    app.add_handler(CommandHandler("profiler", profiler))
+    return app
+
+async def warm_database():
+    """Check the schema and load the ban list the handlers read from memory"""
+    await get_db_manager().verify_schema()
+    await user_service.load_bans()
+
+async def warm_rendering():
+    """Decode the profile card template and fonts once, off the event loop"""
+    from rendering.common import run_render
+    from rendering.profile_card import preload
+    await run_render(preload)
+
+async def resume_scrapes(bot):
+    """Store the results of scrapes checkpointed by the previous shutdown and tell their users"""
+    checkpoints = await checkpoint_service.pending_scrapes()
+    if not checkpoints:
+        return
+    
+    from apify_client import get_apify_client
+    apify_client = get_apify_client()
+    logger.info(f"🔁 Resuming {len(checkpoints)} checkpointed scrape(s)")
+    
+    for checkpoint in checkpoints:
+        task_id, user_id = checkpoint["task_id"], checkpoint["user_id"]
+        try:
+            result = await apify_client.get_task_results(task_id, wait=True, timeout=300)
+            user_data = await user_service.get_user(user_id)
+            
+            if result["status"] != "completed" or not user_data:
+                async with await get_db_session() as session:
+                    await checkpoint_service.delete_scrape(session, task_id)
+                    await session.commit()
+                if user_data:
+                    await bot.send_message(
+                        checkpoint["chat_id"],
+                        "❌ The reels you submitted before the bot restarted could not be processed. Please submit them again."
+                    )
+                continue
+            
+            successful_reels, failed_reels = await _store_scrape_results(
+                user_id, checkpoint["username"], user_data, result, checkpoint_task_id=task_id
+            )
+            for message in _scrape_result_messages(user_data, successful_reels, failed_reels):
+                if message:
+                    await bot.send_message(checkpoint["chat_id"], message)
+            
+        except Exception as e:
+            # The checkpoint stays, so the next start tries again
+            logger.error(f"❌ Failed to resume scrape {task_id} for {user_id}: {e}")
+
+async def drain_updates(app: Application) -> bool:
+    """Finish the updates already received; cancel handlers still running at the deadline"""
+    stopping = asyncio.create_task(app.stop())
+    done, _ = await asyncio.wait({stopping}, timeout=shutdown.remaining())
+    if done:
+        return True
+    
+    # Only the handlers' own tasks (see debug_handler): PTB's wrapper then returns normally and
+    # marks the update done, and updates still queued are skipped, so app.stop() can finish
+    handlers = dict(loop_monitor.active)
+    logger.warning(f"⏱️ Cancelling handlers still running at the deadline: {', '.join(sorted(handlers.values()))}")
+    for task in handlers:
+        task.cancel()
+    # Long enough for a cancelled /submit to checkpoint its scrape
+    done, _ = await asyncio.wait({stopping}, timeout=2)
+    if done:
+        return True
+    
+    logger.error("❌ Telegram application did not stop after cancelling handlers; abandoning it")
+    stopping.cancel()
+    await asyncio.gather(stopping, return_exceptions=True)
+    return False
+
+async def graceful_shutdown(app: Optional[Application], health_task: Optional[asyncio.Task]):
+    """Stop taking updates, drain in-flight work up to the deadline, then close clients in order"""
+    stopped = app is None or not app.running
+    if app is not None:
+        # No new updates; /ready reports unready once polling stops
+        if app.updater.running:
+            await shutdown.step("stop polling", app.updater.stop(), minimum=5)
+        if app.running:
+            stopped = await drain_updates(app)
+    
+    # Purges pause after their current batch and resume on the next start
+    await shutdown.step("purge jobs", purge_service.stop(shutdown.remaining()), minimum=1)
+    await shutdown.step("background jobs", get_background_tasks().drain(shutdown.remaining()), minimum=1)
+    from services.invoice_service import get_invoice_service
+    await shutdown.step("invoice workers", get_invoice_service().stop(), minimum=2)
+    # Write out buffered audit rows while the database is still open
+    await shutdown.step("audit buffer", audit_logger.close(timeout=max(shutdown.remaining(), 2)), minimum=2)
+    await shutdown.step("loop monitor", loop_monitor.stop(), minimum=1)
+    if app is not None and stopped:
+        await shutdown.step("telegram", app.shutdown(), minimum=2)
+    
+    # Apify first (nothing can start a scrape any more), the database last
+    from apify_client import get_apify_client
+    await shutdown.step("apify client", get_apify_client().close(), minimum=2)
+    await shutdown.step("database", get_db_manager().close(), minimum=5)
+    
+    if health_task is not None:
+        health_task.cancel()
+        await asyncio.gather(health_task, return_exceptions=True)
+    logger.info("👋 Shutdown complete")
+
 async def run_bot():
     """Main bot runner"""
+    app = None
+    health_task = None
     try:
-        # Initialize database
-        db_manager = get_db_manager()
-        await db_manager.init_database()
+        shutdown.install()
+        loop_monitor.start()
         
         # Start health check server
-        asyncio.create_task(start_health_check_server())
+        health_task = asyncio.create_task(start_health_check_server())
         
         # Create bot application
-        app = ApplicationBuilder().token(TOKEN).build()
+        with startup_timer.phase("build_application"):
+            app = build_application()
+        health_service.attach_application(app)
         
-        # Add handlers
-        app.add_handler(CommandHandler("start", start_cmd))
-        app.add_handler(CommandHandler("submit", submit))
-        app.add_handler(CommandHandler("profile", profile))
-        app.add_handler(CommandHandler("addaccount", addaccount))
-        app.add_handler(CommandHandler("addusdt", addusdt))
-        app.add_handler(CommandHandler("addpaypal", addpaypal))
-        app.add_handler(CommandHandler("addupi", addupi))
+        # Database warmup and getMe are independent round trips; run them together
+        logger.info("🚀 Starting bot...")
+        with startup_timer.phase("warmup"):
+            await asyncio.gather(
+                startup_timer.timed("database", warm_database()),
+                startup_timer.timed("telegram_initialize", app.initialize()),
+            )
+        
+        db_manager = get_db_manager()
+        db_manager.start_pool_validation()
+        metrics_service.start_rollups()
+        audit_logger.start()
+        purge_service.start()
+        user_service.start_ban_refresh()
+        get_partition_maintenance().start()
+        slot_service.start()
+        referral_service.start()
+        from services.invoice_service import get_invoice_service
+        get_invoice_service().start()
+        health_service.start_monitoring()
         
         # Start bot
-        logger.info("🚀 Starting bot...")
-        await app.initialize()
-        await app.start()
-        await app.updater.start_polling(drop_pending_updates=True)
+        with startup_timer.phase("start_polling"):
+            await app.start()
+            await app.updater.start_polling(drop_pending_updates=True)
+        startup_timer.ready()
+        
+        # Only /profile needs the card template; it renders lazily if this hasn't finished
+        asyncio.create_task(startup_timer.timed("rendering", warm_rendering()))
+        asyncio.create_task(resume_scrapes(app.bot))
         
-        # Keep running
-        await asyncio.Event().wait()
+        # Keep running until SIGTERM/SIGINT
+        await shutdown.wait()
         
     except Exception as e:
         logger.error(f"❌ Bot startup failed: {e}")
         raise
     finally:
-        # Cleanup
-        try:
-            await app.stop()
-            await app.shutdown()
-            
-            # Close database connection
-            db_manager = get_db_manager()
-            await db_manager.close()
-            
-            # Close Apify client
-            apify_client = get_apify_client()
-            await apify_client.close()
-            
-        except Exception as e:
-            logger.error(f"❌ Cleanup failed: {e}")
+        # No-op after a signal; starts the deadline when startup failed
+        shutdown.request("startup failure")
+        await graceful_shutdown(app, health_task)
 
 if __name__ == "__main__":
     asyncio.run(run_bot())
\ No newline at end of file
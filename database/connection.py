@@ -1,109 +1,212 @@
 import os
+import time
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
-from database.models import Base
+from sqlalchemy import text, event
+from sqlalchemy.exc import DBAPIError
+from database.migrations import run_migrations, get_current_version, LATEST_VERSION
+from database.query_stats import get_query_tracker
+from typing import Dict, Any, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
 class DatabaseManager:
-    def __init__(self, database_url: str):
+    def __init__(self, database_url: str, replica_url: Optional[str] = None):
         self.database_url = database_url
-        self.engine = create_async_engine(database_url, echo=False, pool_pre_ping=True)
+        self.replica_url = replica_url
+        
+        # Pool settings (tune against the PgBouncer pool limits)
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", 5))
+        self.max_overflow = int(os.getenv("DB_MAX_OVERFLOW", 10))
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", 30))
+        self.pool_recycle = int(os.getenv("DB_POOL_RECYCLE", 1800))
+        self.statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+        # Pre-ping costs a round trip per checkout but catches every dead connection; without it idle
+        # connections are only checked in the background every DB_POOL_VALIDATE_SECONDS
+        self.pool_pre_ping = _env_bool("DB_POOL_PRE_PING", True)
+        self.pool_validate_seconds = float(os.getenv("DB_POOL_VALIDATE_SECONDS", 30))
+        # Users who wrote within this window read from the primary to see their own writes
+        self.read_your_writes_seconds = float(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+        self._recent_writes: Dict[int, float] = {}
+        
+        self._pool_counters = {"connects": 0, "checkouts": 0, "invalidations": 0, "validation_failures": 0}
+        
+        self.engine = self._create_engine(database_url)
         self.AsyncSessionLocal = sessionmaker(
             self.engine, 
             class_=AsyncSession, 
             expire_on_commit=False
         )
+        
+        # Read-only queries go to the replica when one is configured
+        self.read_engine = self._create_engine(replica_url) if replica_url else self.engine
+        self.ReadSessionLocal = sessionmaker(
+            self.read_engine,
+            class_=AsyncSession,
+            expire_on_commit=False
+        )
+    
+    def _create_engine(self, url: str):
+        connect_args = {}
+        if self.statement_timeout_ms > 0:
+            connect_args["server_settings"] = {"statement_timeout": str(self.statement_timeout_ms)}
+        
+        engine = create_async_engine(
+            url,
+            echo=False,
+            pool_pre_ping=self.pool_pre_ping,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_timeout=self.pool_timeout,
+            pool_recycle=self.pool_recycle,
+            connect_args=connect_args,
+        )
+        get_query_tracker().instrument(engine)
+        
+        event.listen(engine.sync_engine, "connect", lambda *args: self._count("connects"))
+        event.listen(engine.sync_engine, "checkout", lambda *args: self._count("checkouts"))
+        event.listen(engine.sync_engine, "invalidate", lambda *args: self._count("invalidations"))
+        return engine
+    
+    def _count(self, counter: str):
+        self._pool_counters[counter] += 1
     
     async def init_database(self):
-        """Initialize database with all tables and constraints"""
+        """Apply pending schema migrations"""
         try:
-            async with self.engine.begin() as conn:
-                # Create all tables
-                await conn.run_sync(Base.metadata.create_all)
-                
-                # Add unique constraints
-                await self._add_constraints(conn)
-                
-                # Insert default config values
-                await self._insert_default_config(conn)
-                
-                logger.info("✅ Database initialized successfully")
-                
+            await run_migrations(self.engine)
         except Exception as e:
             logger.error(f"❌ Database initialization failed: {e}")
             raise
     
-    async def _add_constraints(self, conn):
-        """Add database constraints safely"""
-        constraints = [
-            # Unique constraint for allowed_accounts
-            """
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1 FROM information_schema.table_constraints
-                    WHERE table_name = 'allowed_accounts' 
-                    AND constraint_type = 'UNIQUE' 
-                    AND constraint_name = 'allowed_accounts_user_id_insta_handle_key'
-                ) THEN
-                    ALTER TABLE allowed_accounts 
-                    ADD CONSTRAINT allowed_accounts_user_id_insta_handle_key 
-                    UNIQUE (user_id, insta_handle);
-                END IF;
-            END$$;
-            """,
-            
-            # Index for better performance
-            """
-            CREATE INDEX IF NOT EXISTS idx_reels_user_id ON reels(user_id);
-            """,
-            
-            """
-            CREATE INDEX IF NOT EXISTS idx_reels_shortcode ON reels(shortcode);
-            """,
-            
-            """
-            CREATE INDEX IF NOT EXISTS idx_users_total_views ON users(total_views);
-            """,
-        ]
+    async def verify_schema(self):
+        """Check the schema version at startup (migrations run via python -m database.migrations)"""
+        try:
+            async with self.engine.connect() as conn:
+                current = await get_current_version(conn)
+        except DBAPIError as e:
+            # Only a missing schema_version table (undefined_table) means a fresh database;
+            # connection and permission errors must not be mistaken for one
+            if getattr(e.orig, "sqlstate", None) != "42P01":
+                raise
+            logger.debug(f"No schema_version table yet: {e}")
+            current = 0
         
-        for constraint in constraints:
-            try:
-                await conn.execute(text(constraint))
-                logger.info("✅ Constraint added successfully")
-            except Exception as e:
-                logger.warning(f"⚠️ Constraint creation warning: {e}")
-    
-    async def _insert_default_config(self, conn):
-        """Insert default configuration values"""
-        default_configs = [
-            ('referral_commission_rate', '0.00'),
-            ('min_date', '2024-01-01'),
-        ]
+        if current >= LATEST_VERSION:
+            logger.info(f"✅ Database schema at version {current}")
+            return
         
-        for key, value in default_configs:
-            try:
-                await conn.execute(
-                    text("""
-                        INSERT INTO config (key, value) 
-                        VALUES (:key, :value)
-                        ON CONFLICT (key) DO NOTHING
-                    """),
-                    {"key": key, "value": value}
-                )
-            except Exception as e:
-                logger.warning(f"⚠️ Config insertion warning for {key}: {e}")
+        if _env_bool("DB_AUTO_MIGRATE", False):
+            logger.warning(f"⚠️ Database schema at version {current}, migrating to {LATEST_VERSION}")
+            await self.init_database()
+            return
+        
+        raise RuntimeError(
+            f"Database schema at version {current}, expected {LATEST_VERSION}. "
+            "Run: python -m database.migrations upgrade"
+        )
     
     async def get_session(self):
         """Get database session"""
         return self.AsyncSessionLocal()
     
+    def mark_write(self, user_id: int):
+        """Record a user's write so their next reads go to the primary"""
+        now = time.monotonic()
+        self._recent_writes[user_id] = now
+        
+        # Drop expired entries once the map grows
+        if len(self._recent_writes) > 10_000:
+            cutoff = now - self.read_your_writes_seconds
+            self._recent_writes = {u: t for u, t in self._recent_writes.items() if t > cutoff}
+    
+    async def get_read_session(self, user_id: Optional[int] = None):
+        """Get read-only database session (replica unless the user just wrote)"""
+        if self.read_engine is self.engine:
+            return self.AsyncSessionLocal()
+        
+        if user_id is not None:
+            written_at = self._recent_writes.get(user_id)
+            if written_at and time.monotonic() - written_at < self.read_your_writes_seconds:
+                return self.AsyncSessionLocal()
+        
+        return self.ReadSessionLocal()
+    
+    async def ping(self) -> float:
+        """Run a trivial query and return round-trip latency in seconds"""
+        start = time.perf_counter()
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return time.perf_counter() - start
+    
+    async def _validate_idle(self, engine):
+        """Ping each idle pooled connection once, discarding only the dead ones"""
+        # The pool hands out its longest-idle connection first, so as many checkouts as there are idle
+        # connections visit each of them once (connections busy meanwhile are skipped until the next run)
+        for _ in range(engine.pool.checkedin()):
+            try:
+                async with engine.connect() as conn:
+                    try:
+                        await conn.execute(text("SELECT 1"))
+                    except Exception as e:
+                        self._count("validation_failures")
+                        logger.warning(f"⚠️ Discarding dead pooled connection: {e}")
+                        await conn.invalidate()
+            except Exception as e:
+                self._count("validation_failures")
+                logger.warning(f"⚠️ Pool validation could not check out a connection: {e}")
+                return
+    
+    async def validate_pool(self):
+        """Background check of idle pooled connections when pre-ping is disabled
+        
+        This only shortens the time a dead connection sits in the pool; unlike pre-ping it does not
+        validate each checkout, so a connection that dies between runs still fails the query that gets it.
+        """
+        engines = [self.engine] if self.read_engine is self.engine else [self.engine, self.read_engine]
+        for engine in engines:
+            await self._validate_idle(engine)
+    
+    def start_pool_validation(self):
+        """Schedule background validation when pre-ping is disabled"""
+        if self.pool_pre_ping or self.pool_validate_seconds <= 0:
+            return
+        from utils.tasks import get_background_tasks
+        get_background_tasks().start_periodic("db_pool_validation", self.pool_validate_seconds, self.validate_pool)
+    
+    def _engine_pool_stats(self, engine) -> Dict[str, Any]:
+        pool = engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "capacity": self.pool_size + self.max_overflow,
+        }
+    
+    def pool_stats(self) -> Dict[str, Any]:
+        """Get live connection pool statistics"""
+        stats = {
+            **self._engine_pool_stats(self.engine),
+            "pre_ping": self.pool_pre_ping,
+            **self._pool_counters,
+        }
+        if self.read_engine is not self.engine:
+            stats["replica"] = self._engine_pool_stats(self.read_engine)
+        return stats
+    
     async def close(self):
         """Close database connection"""
         await self.engine.dispose()
+        if self.read_engine is not self.engine:
+            await self.read_engine.dispose()
 
 # Global database manager instance
 db_manager = None
@@ -115,10 +218,19 @@ def get_db_manager() -> DatabaseManager:
         database_url = os.getenv("DATABASE_URL")
         if not database_url:
             raise ValueError("DATABASE_URL environment variable is required")
-        db_manager = DatabaseManager(database_url)
+        db_manager = DatabaseManager(database_url, os.getenv("DATABASE_REPLICA_URL") or None)
     return db_manager
 
 async def get_db_session():
     """Get database session"""
     manager = get_db_manager()
-    return await manager.get_session()
\ No newline at end of file
+    return await manager.get_session()
+
+async def get_db_read_session(user_id: Optional[int] = None):
+    """Get read-only database session, falling back to the primary after the user's own writes"""
+    manager = get_db_manager()
+    return await manager.get_read_session(user_id)
+
+def mark_user_write(user_id: int):
+    """Record that a user has just written data"""
+    get_db_manager().mark_write(user_id)
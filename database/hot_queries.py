@@ -0,0 +1,23 @@
+"""Statements on the bot's hot paths, declared where they are executed.
+
+Modules build these statements with hot_query() instead of text(), so the
+index advisor explains exactly what runs in production.
+"""
+from typing import Any, Dict, NamedTuple
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+class HotQuery(NamedTuple):
+    name: str
+    statement: TextClause
+    # Fixed sample values for parameters the advisor can't derive from the data
+    params: Dict[str, Any]
+
+# Filled in as the declaring modules are imported
+HOT_QUERIES: Dict[str, HotQuery] = {}
+
+def hot_query(name: str, statement: str, **params) -> TextClause:
+    """Build a statement and register it for the index advisor"""
+    clause = text(statement)
+    HOT_QUERIES[name] = HotQuery(name, clause, params)
+    return clause
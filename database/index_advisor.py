@@ -0,0 +1,196 @@
+"""Missing-index advisor.
+
+Runs EXPLAIN (ANALYZE, BUFFERS) for every statement the bot and services
+declare with database.hot_queries.hot_query() against the configured database
+and flags sequential scans on large tables. INSERT/UPDATE/DELETE statements
+only get a plain EXPLAIN unless --analyze-dml is given; analyzed statements run
+inside a transaction that is rolled back, but their row locks and trigger side
+effects are real while it is open, so only analyze DML against a copy:
+
+    python -m database.index_advisor
+    python -m database.index_advisor --min-rows 1000 --json
+    python -m database.index_advisor --analyze-dml
+"""
+import re
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import importlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+from sqlalchemy import text
+from database.hot_queries import HOT_QUERIES, HotQuery
+
+logger = logging.getLogger(__name__)
+
+# Modules that declare their statements with hot_query(); importing them fills HOT_QUERIES
+HOT_QUERY_MODULES = [
+    "services.user_service",
+    "services.admin_service",
+    "services.leaderboard_service",
+    "services.stats_service",
+    "services.metrics_service",
+    "services.audit_service",
+    "services.purge_service",
+    "services.referral_service",
+    "services.slot_service",
+    "services.checkpoint_service",
+    "services.payout_service",
+    "services.export_service",
+    "services.reel_update_service",
+    "services.invoice_service",
+    # Needs BOT_TOKEN/APIFY_TOKEN like the bot itself (exits without them)
+    "bot_fixed",
+]
+
+_DML = re.compile(r"\b(INSERT\s+INTO|DELETE\s+FROM|UPDATE\s+\w+(\s+\w+)?\s+SET)\b", re.IGNORECASE)
+
+def is_dml(statement: str) -> bool:
+    """Whether a statement writes (including data-modifying CTEs)"""
+    return bool(_DML.search(statement))
+
+def load_hot_queries() -> Dict[str, HotQuery]:
+    """Import the declaring modules and return every registered statement"""
+    for module in HOT_QUERY_MODULES:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"⚠️ Skipping hot queries of {module}: {e!r}")
+    return HOT_QUERIES
+
+async def sample_params(conn) -> Dict[str, Any]:
+    """Pick representative parameter values from the data (the heaviest submitter)"""
+    row = (await conn.execute(text("""
+        SELECT r.user_id, MIN(r.shortcode), MIN(r.username), MAX(u.total_views)
+        FROM reels r LEFT JOIN users u ON u.user_id = r.user_id
+        GROUP BY r.user_id
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+    """))).fetchone()
+    user_id, shortcode, handle, views = row if row else (0, "", "", 0)
+    now = datetime.now()
+    return {
+        "u": user_id,
+        "sc": shortcode or "",
+        "codes": [shortcode or ""],
+        "h": handle or "",
+        "v": views or 0,
+        "since": now - timedelta(days=30),
+        "until": now,
+    }
+
+async def _table_rows(conn) -> Dict[str, int]:
+    result = await conn.execute(text("""
+        SELECT relname, CAST(reltuples AS BIGINT) FROM pg_class
+        WHERE relkind IN ('r', 'p') AND relnamespace = CAST('public' AS regnamespace)
+    """))
+    return {name: max(int(rows), 0) for name, rows in result.fetchall()}
+
+def _walk(node: Dict[str, Any]):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+async def explain(engine, name: str, statement: str, params: Dict[str, Any],
+                  table_rows: Dict[str, int], min_rows: int, analyze: bool = True) -> Dict[str, Any]:
+    """EXPLAIN (ANALYZE, BUFFERS) one statement in a rolled-back transaction (plain EXPLAIN unless analyze)"""
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            result = await conn.execute(text(f"EXPLAIN ({options}) {statement}"), params)
+            plan = result.scalar()
+        finally:
+            await transaction.rollback()
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+
+    seq_scans = []
+    for node in _walk(root):
+        if node.get("Node Type") != "Seq Scan":
+            continue
+        relation = node.get("Relation Name")
+        rows = table_rows.get(relation, 0)
+        if rows >= min_rows:
+            seq_scans.append({"table": relation, "rows": rows, "filter": node.get("Filter")})
+
+    return {
+        "name": name,
+        "analyzed": analyze,
+        "cost": root.get("Total Cost", 0.0),
+        "ms": round(plan[0]["Execution Time"], 3) if analyze else None,
+        "shared_hit": root.get("Shared Hit Blocks", 0),
+        "shared_read": root.get("Shared Read Blocks", 0),
+        "seq_scans": seq_scans,
+    }
+
+async def run_advisor(engine, min_rows: int = 10_000, analyze_dml: bool = False) -> List[Dict[str, Any]]:
+    """Explain every registered statement; returns one report per statement"""
+    async with engine.connect() as conn:
+        params = await sample_params(conn)
+        table_rows = await _table_rows(conn)
+
+    reports = []
+    for name, query in sorted(load_hot_queries().items()):
+        try:
+            statement = query.statement.text
+            reports.append(await explain(engine, name, statement, {**params, **query.params},
+                                         table_rows, min_rows, analyze=analyze_dml or not is_dml(statement)))
+        except Exception as e:
+            reports.append({"name": name, "error": str(e), "seq_scans": []})
+    return reports
+
+def _print_report(reports: List[Dict[str, Any]], min_rows: int):
+    for report in reports:
+        if "error" in report:
+            print(f"⚠️  {report['name']}: {report['error'].splitlines()[0]}")
+            continue
+
+        flag = "🐢" if report["seq_scans"] else "✅"
+        if report["analyzed"]:
+            print(f"{flag} {report['name']}: {report['ms']} ms, "
+                  f"buffers hit={report['shared_hit']} read={report['shared_read']}")
+        else:
+            print(f"{flag} {report['name']}: estimated cost {report['cost']} (not executed)")
+        for scan in report["seq_scans"]:
+            print(f"     Seq Scan on {scan['table']} (~{scan['rows']:,} rows)"
+                  + (f" filter: {scan['filter']}" if scan["filter"] else ""))
+
+    flagged = sum(1 for report in reports if report["seq_scans"])
+    print(f"\n{flagged} of {len(reports)} statements scan a table with at least {min_rows:,} rows sequentially")
+
+async def _main(argv: List[str]) -> int:
+    from dotenv import load_dotenv
+    from database.connection import get_db_manager
+
+    parser = argparse.ArgumentParser(prog="python -m database.index_advisor")
+    parser.add_argument("--min-rows", type=int, default=10_000,
+                        help="flag sequential scans only on tables with at least this many rows")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    parser.add_argument("--analyze-dml", action="store_true",
+                        help="also execute (and roll back) INSERT/UPDATE/DELETE statements to time them")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    manager = get_db_manager()
+    try:
+        reports = await run_advisor(manager.engine, args.min_rows, args.analyze_dml)
+    finally:
+        await manager.close()
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        _print_report(reports, args.min_rows)
+    return 1 if any(report["seq_scans"] for report in reports) else 0
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO
+    )
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -0,0 +1,522 @@
+"""Versioned schema migrations.
+
+Startup only checks the recorded schema version. Pending migrations are
+applied explicitly, e.g. as a release step before rolling out the bot:
+
+    python -m database.migrations upgrade
+    python -m database.migrations status
+"""
+import sys
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+from sqlalchemy import text
+from database.partitions import partition_log_tables
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant so concurrent runners serialize on the same advisory lock
+MIGRATION_LOCK_KEY = 727_001
+
+class Migration:
+    def __init__(self, version: int, name: str, apply: Callable[..., Awaitable[None]],
+                 transactional: bool = True):
+        self.version = version
+        self.name = name
+        self.apply = apply
+        # False for statements that can't run in a transaction, e.g. CREATE INDEX CONCURRENTLY
+        self.transactional = transactional
+
+def sql_migration(version: int, name: str, *statements: str, transactional: bool = True) -> Migration:
+    """Build a migration that runs plain SQL statements in order"""
+    async def apply(conn):
+        for statement in statements:
+            await conn.execute(text(statement))
+    return Migration(version, name, apply, transactional)
+
+# The schema Base.metadata.create_all produced on startup before migrations existed, frozen here so
+# fresh and upgraded databases start from the same tables (later changes belong in later migrations)
+BASELINE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        user_id BIGSERIAL NOT NULL,
+        username VARCHAR(255),
+        registered INTEGER,
+        approved BOOLEAN,
+        total_views BIGINT,
+        total_reels INTEGER,
+        max_slots INTEGER,
+        used_slots INTEGER,
+        last_submission TIMESTAMP WITHOUT TIME ZONE,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS reels (
+        id SERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        shortcode VARCHAR(255) NOT NULL,
+        url TEXT,
+        username VARCHAR(255),
+        views BIGINT,
+        likes BIGINT,
+        comments BIGINT,
+        caption TEXT,
+        media_url TEXT,
+        submitted_at TIMESTAMP WITHOUT TIME ZONE,
+        last_updated TIMESTAMP WITHOUT TIME ZONE,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        UNIQUE (shortcode)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS allowed_accounts (
+        id SERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        insta_handle VARCHAR(255) NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS payment_details (
+        id SERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        usdt_address VARCHAR(255),
+        paypal_email VARCHAR(255),
+        upi_address VARCHAR(255),
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS account_requests (
+        id SERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        insta_handle VARCHAR(255) NOT NULL,
+        status VARCHAR(50),
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS admins (
+        id SERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        added_by BIGINT NOT NULL,
+        added_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        UNIQUE (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS banned_users (
+        user_id BIGSERIAL NOT NULL,
+        PRIMARY KEY (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS submission_logs (
+        id SERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        shortcode VARCHAR(255) NOT NULL,
+        views BIGINT NOT NULL,
+        old_views BIGINT,
+        insta_handle VARCHAR(255) NOT NULL,
+        action VARCHAR(100) NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS force_update_logs (
+        id SERIAL NOT NULL,
+        total_reels INTEGER NOT NULL,
+        successful_updates INTEGER NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS slot_accounts (
+        id SERIAL NOT NULL,
+        slot_number INTEGER NOT NULL,
+        insta_handle VARCHAR(255) NOT NULL,
+        added_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS slot_submissions (
+        id SERIAL NOT NULL,
+        slot_number INTEGER NOT NULL,
+        shortcode VARCHAR(255) NOT NULL,
+        insta_handle VARCHAR(255) NOT NULL,
+        submitted_at TIMESTAMP WITHOUT TIME ZONE,
+        view_count BIGINT,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS referrals (
+        id SERIAL NOT NULL,
+        user_id BIGINT NOT NULL,
+        referrer_id BIGINT NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        UNIQUE (user_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS config (
+        id SERIAL NOT NULL,
+        key VARCHAR(255) NOT NULL,
+        value TEXT NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        UNIQUE (key)
+    )
+    """,
+]
+
+async def _baseline(conn):
+    """Tables, constraints, indexes and config that used to be created on every startup"""
+    for statement in BASELINE_TABLES:
+        await conn.execute(text(statement))
+
+    await conn.execute(text("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.table_constraints
+                WHERE table_name = 'allowed_accounts'
+                AND constraint_type = 'UNIQUE'
+                AND constraint_name = 'allowed_accounts_user_id_insta_handle_key'
+            ) THEN
+                ALTER TABLE allowed_accounts
+                ADD CONSTRAINT allowed_accounts_user_id_insta_handle_key
+                UNIQUE (user_id, insta_handle);
+            END IF;
+        END$$;
+    """))
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS idx_reels_user_id ON reels(user_id)"))
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS idx_reels_shortcode ON reels(shortcode)"))
+    await conn.execute(text("CREATE INDEX IF NOT EXISTS idx_users_total_views ON users(total_views)"))
+
+    default_configs = [
+        ('referral_commission_rate', '0.00'),
+        ('min_date', '2024-01-01'),
+    ]
+    for key, value in default_configs:
+        await conn.execute(
+            text("""
+                INSERT INTO config (key, value)
+                VALUES (:key, :value)
+                ON CONFLICT (key) DO NOTHING
+            """),
+            {"key": key, "value": value}
+        )
+
+# Ordered list of migrations; append new ones with the next version number
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline", _baseline),
+    sql_migration(
+        2, "leaderboard",
+        """
+        CREATE TABLE IF NOT EXISTS leaderboard (
+            user_id BIGINT PRIMARY KEY,
+            username VARCHAR(255),
+            total_views BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_leaderboard_rank ON leaderboard (total_views DESC, user_id DESC)",
+        """
+        INSERT INTO leaderboard (user_id, username, total_views)
+        SELECT u.user_id, u.username, u.total_views
+        FROM users u
+        WHERE u.total_views > 0
+          AND NOT EXISTS (SELECT 1 FROM banned_users b WHERE b.user_id = u.user_id)
+        ON CONFLICT (user_id) DO NOTHING
+        """,
+    ),
+    sql_migration(
+        3, "payout_batches",
+        """
+        CREATE TABLE IF NOT EXISTS payout_batches (
+            id SERIAL PRIMARY KEY,
+            rate_per_thousand VARCHAR(50) NOT NULL,
+            tax_rate VARCHAR(50) NOT NULL,
+            commission_rate VARCHAR(50) NOT NULL,
+            user_count INTEGER NOT NULL DEFAULT 0,
+            total_gross_cents BIGINT NOT NULL DEFAULT 0,
+            total_net_cents BIGINT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT now()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS payout_batch_items (
+            batch_id INTEGER NOT NULL REFERENCES payout_batches(id) ON DELETE CASCADE,
+            user_id BIGINT NOT NULL,
+            views BIGINT NOT NULL,
+            gross_cents BIGINT NOT NULL,
+            tax_cents BIGINT NOT NULL,
+            referral_cents BIGINT NOT NULL,
+            net_cents BIGINT NOT NULL,
+            PRIMARY KEY (batch_id, user_id)
+        )
+        """,
+    ),
+    sql_migration(
+        4, "reel_metrics_history",
+        """
+        CREATE TABLE IF NOT EXISTS reel_metrics_history (
+            id BIGSERIAL PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            shortcode VARCHAR(255) NOT NULL,
+            insta_handle VARCHAR(255),
+            views_delta BIGINT NOT NULL DEFAULT 0,
+            likes_delta BIGINT NOT NULL DEFAULT 0,
+            comments_delta BIGINT NOT NULL DEFAULT 0,
+            sampled_at TIMESTAMP DEFAULT now(),
+            -- Per-row rollup state: an id watermark would skip rows committed out of id order
+            rolled_up BOOLEAN NOT NULL DEFAULT FALSE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_reel_metrics_history_sampled_at ON reel_metrics_history USING brin (sampled_at)",
+        "CREATE INDEX IF NOT EXISTS idx_reel_metrics_history_pending ON reel_metrics_history (id) WHERE NOT rolled_up",
+        """
+        CREATE TABLE IF NOT EXISTS user_daily_views (
+            user_id BIGINT NOT NULL,
+            day DATE NOT NULL,
+            views_gained BIGINT NOT NULL DEFAULT 0,
+            likes_gained BIGINT NOT NULL DEFAULT 0,
+            comments_gained BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS handle_daily_views (
+            insta_handle VARCHAR(255) NOT NULL,
+            day DATE NOT NULL,
+            views_gained BIGINT NOT NULL DEFAULT 0,
+            likes_gained BIGINT NOT NULL DEFAULT 0,
+            comments_gained BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (insta_handle, day)
+        )
+        """,
+    ),
+    Migration(5, "partition_logs", partition_log_tables, transactional=False),
+    sql_migration(
+        6, "ban_purge_jobs",
+        """
+        CREATE TABLE IF NOT EXISTS purge_jobs (
+            id SERIAL PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            current_table VARCHAR(64),
+            deleted_rows BIGINT NOT NULL DEFAULT 0,
+            error TEXT,
+            -- Failed runs go back to pending until attempts runs out; next_attempt_at spaces the retries
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP NOT NULL DEFAULT now(),
+            finished_at TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_purge_jobs_active ON purge_jobs (id) WHERE status IN ('pending', 'running')",
+        "CREATE INDEX IF NOT EXISTS idx_purge_jobs_user_id ON purge_jobs (user_id)",
+        # Batched purges look rows up by user_id; reels, allowed_accounts and referrals are already covered.
+        # A failed concurrent build leaves an invalid index behind; dropping first lets a rerun rebuild it
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_payment_details_user_id",
+        "CREATE INDEX CONCURRENTLY idx_payment_details_user_id ON payment_details (user_id)",
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_account_requests_user_status",
+        "CREATE INDEX CONCURRENTLY idx_account_requests_user_status ON account_requests (user_id, status)",
+        transactional=False,
+    ),
+    sql_migration(
+        7, "hot_query_indexes",
+        # Duplicates the index behind reels' unique shortcode constraint
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_reels_shortcode",
+        # A failed concurrent build leaves an invalid index behind; dropping first lets a rerun rebuild it
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_account_requests_pending",
+        # Pending-request counts and the review queue only ever look at pending rows
+        "CREATE INDEX CONCURRENTLY idx_account_requests_pending ON account_requests (created_at) WHERE status = 'pending'",
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_reels_submitted_at",
+        # reels are appended in submitted_at order, so a BRIN index serves the per-day stats cheaply
+        "CREATE INDEX CONCURRENTLY idx_reels_submitted_at ON reels USING brin (submitted_at)",
+        # Replaced by the leaderboard table's rank index
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_users_total_views",
+        transactional=False,
+    ),
+    sql_migration(
+        8, "scrape_checkpoints",
+        # Apify tasks still running when the bot shut down; their results are stored after restart
+        """
+        CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+            task_id VARCHAR(100) PRIMARY KEY,
+            user_id BIGINT NOT NULL,
+            chat_id BIGINT NOT NULL,
+            username VARCHAR(255),
+            urls TEXT[] NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """,
+    ),
+    sql_migration(
+        9, "slot_submissions_unique",
+        # Keep the newest row of any duplicates so the unique index can be built. A duplicate inserted
+        # before the build finishes fails it; the rerun drops the invalid index and dedupes again
+        """
+        DELETE FROM slot_submissions a USING slot_submissions b
+        WHERE a.slot_number = b.slot_number AND a.shortcode = b.shortcode AND a.id < b.id
+        """,
+        "DROP INDEX CONCURRENTLY IF EXISTS uq_slot_submissions_slot_shortcode",
+        # Conflict target of the slot refresh upsert; also serves per-slot totals
+        "CREATE UNIQUE INDEX CONCURRENTLY uq_slot_submissions_slot_shortcode ON slot_submissions (slot_number, shortcode)",
+        transactional=False,
+    ),
+    sql_migration(
+        10, "referral_ledger",
+        # Commission in exact cents per view delta; 'adjustment' rows come from reconciliation
+        """
+        CREATE TABLE IF NOT EXISTS referral_ledger (
+            id BIGSERIAL PRIMARY KEY,
+            referrer_id BIGINT NOT NULL,
+            referee_id BIGINT NOT NULL,
+            views_delta BIGINT NOT NULL,
+            commission NUMERIC(20, 6) NOT NULL,
+            kind VARCHAR(20) NOT NULL DEFAULT 'accrual',
+            created_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_referral_ledger_referrer ON referral_ledger (referrer_id, created_at)",
+        # Running totals of the ledger, one row per referrer
+        """
+        CREATE TABLE IF NOT EXISTS referral_balances (
+            referrer_id BIGINT PRIMARY KEY,
+            referred_views BIGINT NOT NULL DEFAULT 0,
+            commission NUMERIC(20, 6) NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """,
+    ),
+    sql_migration(
+        11, "submission_logs_detail",
+        # Structured details of admin actions, which used to be squeezed into views/shortcode
+        "ALTER TABLE submission_logs ADD COLUMN IF NOT EXISTS detail JSONB",
+    ),
+    sql_migration(
+        12, "purge_metrics_history",
+        # Purges now delete a banned user's raw metrics history and scrape checkpoints in batches by user_id
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_reel_metrics_history_user_id",
+        "CREATE INDEX CONCURRENTLY idx_reel_metrics_history_user_id ON reel_metrics_history (user_id)",
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_scrape_checkpoints_user_id",
+        "CREATE INDEX CONCURRENTLY idx_scrape_checkpoints_user_id ON scrape_checkpoints (user_id)",
+        transactional=False,
+    ),
+    sql_migration(
+        13, "referral_baseline",
+        # Referee views already counted when the referral was made; reconciliation fills it in for new referrals
+        "ALTER TABLE referrals ADD COLUMN IF NOT EXISTS baseline_views BIGINT",
+        # Reconciliation walks referrers in batches
+        "DROP INDEX CONCURRENTLY IF EXISTS idx_referrals_referrer_id",
+        "CREATE INDEX CONCURRENTLY idx_referrals_referrer_id ON referrals (referrer_id)",
+        transactional=False,
+    ),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+async def _ensure_version_table(conn):
+    await conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+    """))
+
+async def get_current_version(conn) -> int:
+    """Get the highest applied migration version"""
+    result = await conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version"))
+    return result.scalar() or 0
+
+async def _apply(conn, migration: Migration) -> int:
+    """Apply one migration unless already recorded; returns the schema version afterwards"""
+    current = await get_current_version(conn)
+    if migration.version <= current:
+        return current
+
+    logger.info(f"🔧 Applying migration {migration.version}: {migration.name}")
+    await migration.apply(conn)
+    await conn.execute(
+        text("INSERT INTO schema_version (version, name) VALUES (:v, :n)"),
+        {"v": migration.version, "n": migration.name}
+    )
+    return migration.version
+
+async def run_migrations(engine, target: Optional[int] = None) -> int:
+    """Apply pending migrations up to target (default: latest), one transaction each (unless non-transactional)"""
+    target = LATEST_VERSION if target is None else target
+
+    async with engine.begin() as conn:
+        await _ensure_version_table(conn)
+
+    current = 0
+    for migration in MIGRATIONS:
+        if migration.version > target:
+            break
+
+        if migration.transactional:
+            async with engine.begin() as conn:
+                await conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": MIGRATION_LOCK_KEY})
+                current = await _apply(conn, migration)
+        else:
+            # Autocommit, so the lock has to be held for the session and released explicitly
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": MIGRATION_LOCK_KEY})
+                try:
+                    current = await _apply(conn, migration)
+                finally:
+                    await conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": MIGRATION_LOCK_KEY})
+
+    logger.info(f"✅ Database schema at version {current}")
+    return current
+
+async def _main(argv: List[str]) -> int:
+    from dotenv import load_dotenv
+    from database.connection import get_db_manager
+
+    load_dotenv()
+    command = argv[0] if argv else "status"
+    manager = get_db_manager()
+
+    try:
+        if command == "upgrade":
+            target = int(argv[1]) if len(argv) > 1 else None
+            await run_migrations(manager.engine, target)
+        elif command == "status":
+            async with manager.engine.begin() as conn:
+                await _ensure_version_table(conn)
+                current = await get_current_version(conn)
+            print(f"Current version: {current}, latest: {LATEST_VERSION}")
+            for migration in MIGRATIONS:
+                state = "applied" if migration.version <= current else "pending"
+                print(f"  {migration.version:>4} {migration.name} ({state})")
+        else:
+            print("Usage: python -m database.migrations [upgrade [version] | status]")
+            return 2
+    finally:
+        await manager.close()
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO
+    )
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
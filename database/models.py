@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Boolean, Text, Float
+from sqlalchemy import Column, Integer, String, BigInteger, DateTime, Date, Boolean, Text, Float, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -76,23 +77,27 @@ class BannedUser(Base):
 
 class SubmissionLog(Base):
     __tablename__ = "submission_logs"
+    # Monthly range partitions are managed by database.partitions
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(BigInteger, nullable=False)
     shortcode = Column(String(255), nullable=False)
     views = Column(BigInteger, nullable=False)
     old_views = Column(BigInteger, nullable=True)
     insta_handle = Column(String(255), nullable=False)
     action = Column(String(100), nullable=False)
-    created_at = Column(DateTime, default=datetime.now)
+    detail = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.now)
 
 class ForceUpdateLog(Base):
     __tablename__ = "force_update_logs"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
     
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     total_reels = Column(Integer, nullable=False)
     successful_updates = Column(Integer, nullable=False)
-    created_at = Column(DateTime, default=datetime.now)
+    created_at = Column(DateTime, primary_key=True, default=datetime.now)
 
 class SlotAccount(Base):
     __tablename__ = "slot_accounts"
@@ -104,6 +109,7 @@ class SlotAccount(Base):
 
 class SlotSubmission(Base):
     __tablename__ = "slot_submissions"
+    __table_args__ = (UniqueConstraint("slot_number", "shortcode", name="uq_slot_submissions_slot_shortcode"),)
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     slot_number = Column(Integer, nullable=False)
@@ -119,6 +125,7 @@ class Referral(Base):
     user_id = Column(BigInteger, nullable=False, unique=True)
     referrer_id = Column(BigInteger, nullable=False)
     created_at = Column(DateTime, default=datetime.now)
+    baseline_views = Column(BigInteger, nullable=True)
 
 class Config(Base):
     __tablename__ = "config"
@@ -126,4 +133,68 @@ class Config(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     key = Column(String(255), nullable=False, unique=True)
     value = Column(Text, nullable=False)
-    created_at = Column(DateTime, default=datetime.now)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.now)
+
+class LeaderboardEntry(Base):
+    __tablename__ = "leaderboard"
+    
+    user_id = Column(BigInteger, primary_key=True)
+    username = Column(String(255), nullable=True)
+    total_views = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.now)
+
+class PayoutBatch(Base):
+    __tablename__ = "payout_batches"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    rate_per_thousand = Column(String(50), nullable=False)
+    tax_rate = Column(String(50), nullable=False)
+    commission_rate = Column(String(50), nullable=False)
+    user_count = Column(Integer, nullable=False, default=0)
+    total_gross_cents = Column(BigInteger, nullable=False, default=0)
+    total_net_cents = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.now)
+
+class PayoutBatchItem(Base):
+    __tablename__ = "payout_batch_items"
+    
+    batch_id = Column(Integer, primary_key=True)
+    user_id = Column(BigInteger, primary_key=True)
+    views = Column(BigInteger, nullable=False)
+    gross_cents = Column(BigInteger, nullable=False)
+    tax_cents = Column(BigInteger, nullable=False)
+    referral_cents = Column(BigInteger, nullable=False)
+    net_cents = Column(BigInteger, nullable=False)
+
+class ReelMetricsHistory(Base):
+    __tablename__ = "reel_metrics_history"
+    
+    # Each row stores the change since the previous sample of the reel
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    user_id = Column(BigInteger, nullable=False)
+    shortcode = Column(String(255), nullable=False)
+    insta_handle = Column(String(255), nullable=True)
+    views_delta = Column(BigInteger, nullable=False, default=0)
+    likes_delta = Column(BigInteger, nullable=False, default=0)
+    comments_delta = Column(BigInteger, nullable=False, default=0)
+    sampled_at = Column(DateTime, default=datetime.now)
+    # Set once the row has been folded into the daily rollups
+    rolled_up = Column(Boolean, nullable=False, default=False)
+
+class UserDailyViews(Base):
+    __tablename__ = "user_daily_views"
+    
+    user_id = Column(BigInteger, primary_key=True)
+    day = Column(Date, primary_key=True)
+    views_gained = Column(BigInteger, nullable=False, default=0)
+    likes_gained = Column(BigInteger, nullable=False, default=0)
+    comments_gained = Column(BigInteger, nullable=False, default=0)
+
+class HandleDailyViews(Base):
+    __tablename__ = "handle_daily_views"
+    
+    insta_handle = Column(String(255), primary_key=True)
+    day = Column(Date, primary_key=True)
+    views_gained = Column(BigInteger, nullable=False, default=0)
+    likes_gained = Column(BigInteger, nullable=False, default=0)
+    comments_gained = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,229 @@
+import os
+import re
+import logging
+from datetime import date
+from typing import Dict, List, Tuple
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Tables range-partitioned by month on created_at
+PARTITIONED_TABLES = ["submission_logs", "force_update_logs"]
+
+_PARTITION_NAME = re.compile(r"_y(\d{4})m(\d{2})$")
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    """Name of the partition holding the given month"""
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+async def list_partitions(conn, table: str) -> Dict[str, date]:
+    """Get the monthly partitions attached to a table, by name"""
+    result = await conn.execute(
+        text("""
+            SELECT child.relname FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = :t
+        """),
+        {"t": table}
+    )
+    partitions = {}
+    for (name,) in result.fetchall():
+        match = _PARTITION_NAME.search(name)
+        if match:
+            partitions[name] = date(int(match.group(1)), int(match.group(2)), 1)
+    return partitions
+
+async def ensure_partitions(conn, table: str, start: date, months_ahead: int) -> List[str]:
+    """Create any missing monthly partitions from start's month through months_ahead after today"""
+    existing = await list_partitions(conn, table)
+    month = date(start.year, start.month, 1)
+    last = _add_months(date.today().replace(day=1), months_ahead)
+
+    created = []
+    while month <= last:
+        name = partition_name(table, month)
+        if name not in existing:
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            ))
+            created.append(name)
+        month = _add_months(month, 1)
+
+    if created:
+        logger.info(f"🗂 Created partitions for {table}: {', '.join(created)}")
+    return created
+
+async def apply_retention(conn, table: str, retention_months: int, mode: str = "detach") -> List[str]:
+    """Detach (or drop) monthly partitions entirely older than the retention window
+
+    Detached partitions become standalone tables that can be archived and dropped later.
+    """
+    if retention_months <= 0:
+        return []
+
+    cutoff = _add_months(date.today().replace(day=1), -retention_months)
+    removed = []
+    for name, month in sorted((await list_partitions(conn, table)).items(), key=lambda item: item[1]):
+        if _add_months(month, 1) > cutoff:
+            continue
+
+        await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        if mode == "drop":
+            await conn.execute(text(f"DROP TABLE {name}"))
+        removed.append(name)
+
+    if removed:
+        logger.info(f"🗂 {'Dropped' if mode == 'drop' else 'Detached'} old partitions of {table}: {', '.join(removed)}")
+    return removed
+
+async def _relation_exists(conn, name: str) -> bool:
+    return (await conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"), {"t": name})).scalar()
+
+async def _is_partitioned(conn, table: str) -> bool:
+    return bool((await conn.execute(
+        text("""
+            SELECT 1 FROM pg_partitioned_table p
+            JOIN pg_class c ON c.oid = p.partrelid
+            WHERE c.relname = :t
+        """),
+        {"t": table}
+    )).scalar())
+
+async def _convert_to_partitioned(conn, table: str, columns: str, column_names: str):
+    """Move an existing plain table into a new month-partitioned table with the same name
+
+    Needs an autocommit connection: the tables are swapped in one short statement and rows are
+    then moved over in batches, so writers only wait for the swap, not the copy. Rerunning
+    resumes a move that was interrupted.
+    """
+    legacy = f"{table}_legacy"
+    if not await _is_partitioned(conn, table):
+        # New rows go to the (still empty) partitioned table from here on, so their partitions must exist
+        # before it is visible (rows parked in the default partition would block creating them later)
+        this_month = date.today().replace(day=1)
+        upcoming = "".join(
+            f"CREATE TABLE {partition_name(table, month)} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}');\n"
+            for month in (_add_months(this_month, offset) for offset in range(4))
+        )
+        # Indexes are built while the table is still empty
+        indexes = "".join(f"{statement};\n" for statement in _TABLE_INDEXES.get(table, []))
+        await conn.execute(text(f"""
+            DO $$ BEGIN
+                ALTER TABLE {table} RENAME TO {legacy};
+                ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey;
+                CREATE TABLE {table} (
+                    id BIGINT NOT NULL DEFAULT nextval('{table}_id_seq'),
+                    {columns},
+                    created_at TIMESTAMP NOT NULL DEFAULT now(),
+                    PRIMARY KEY (id, created_at)
+                ) PARTITION BY RANGE (created_at);
+                -- Keep the id sequence alive when the legacy table is dropped
+                ALTER SEQUENCE {table}_id_seq AS BIGINT OWNED BY {table}.id;
+                CREATE TABLE {table}_default PARTITION OF {table} DEFAULT;
+                {upcoming}
+                {indexes}
+            END $$
+        """))
+
+    if not await _relation_exists(conn, legacy):
+        return
+
+    oldest = (await conn.execute(text(f"SELECT MIN(created_at) FROM {legacy}"))).scalar()
+    await ensure_partitions(conn, table, (oldest or date.today()).replace(day=1), 3)
+
+    # Each batch is deleted from the legacy table and inserted in one statement, so it moves exactly once
+    after, moved = 0, 0
+    while True:
+        count, last_id = (await conn.execute(
+            text(f"""
+                WITH batch AS (
+                    DELETE FROM {legacy}
+                    WHERE id IN (SELECT id FROM {legacy} WHERE id > :after ORDER BY id LIMIT :n)
+                    RETURNING id, {column_names}, created_at
+                ),
+                copied AS (
+                    INSERT INTO {table} (id, {column_names}, created_at)
+                    SELECT id, {column_names}, COALESCE(created_at, now()) FROM batch
+                    RETURNING id
+                )
+                SELECT COUNT(*), MAX(id) FROM copied
+            """),
+            {"after": after, "n": PARTITION_COPY_BATCH}
+        )).fetchone()
+        if not count:
+            break
+        after, moved = last_id, moved + count
+
+    await conn.execute(text(f"DROP TABLE {legacy}"))
+    logger.info(f"🗂 Moved {moved} rows of {table} into partitions")
+
+# Rows moved per statement when converting an existing log table
+PARTITION_COPY_BATCH = int(os.getenv("LOG_PARTITION_COPY_BATCH", 10_000))
+
+_TABLE_COLUMNS: Dict[str, Tuple[str, str]] = {
+    "submission_logs": (
+        """user_id BIGINT NOT NULL,
+                    shortcode VARCHAR(255) NOT NULL,
+                    views BIGINT NOT NULL,
+                    old_views BIGINT,
+                    insta_handle VARCHAR(255) NOT NULL,
+                    action VARCHAR(100) NOT NULL""",
+        "user_id, shortcode, views, old_views, insta_handle, action",
+    ),
+    "force_update_logs": (
+        """total_reels INTEGER NOT NULL,
+                    successful_updates INTEGER NOT NULL""",
+        "total_reels, successful_updates",
+    ),
+}
+
+_TABLE_INDEXES: Dict[str, List[str]] = {
+    "submission_logs": [
+        "CREATE INDEX IF NOT EXISTS idx_submission_logs_user_created ON submission_logs (user_id, created_at)",
+    ],
+}
+
+async def partition_log_tables(conn):
+    """Migration: range-partition the log tables by month (converting existing tables in place; autocommit)"""
+    for table in PARTITIONED_TABLES:
+        columns, column_names = _TABLE_COLUMNS[table]
+        # Resumes an interrupted move; only checks once converted
+        await _convert_to_partitioned(conn, table, columns, column_names)
+        await ensure_partitions(conn, table, date.today().replace(day=1), 3)
+
+class PartitionMaintenance:
+    """Periodic creation of upcoming partitions and retention of old ones"""
+
+    def __init__(self):
+        self.months_ahead = int(os.getenv("LOG_PARTITION_MONTHS_AHEAD", 3))
+        self.retention_months = int(os.getenv("LOG_RETENTION_MONTHS", 12))
+        self.retention_mode = os.getenv("LOG_RETENTION_MODE", "detach")
+        self.interval_seconds = float(os.getenv("LOG_PARTITION_MAINTENANCE_SECONDS", 6 * 3600))
+
+    async def run(self):
+        """Create upcoming partitions and apply retention to all partitioned tables"""
+        from database.connection import get_db_manager
+
+        async with get_db_manager().engine.begin() as conn:
+            for table in PARTITIONED_TABLES:
+                await ensure_partitions(conn, table, date.today().replace(day=1), self.months_ahead)
+                await apply_retention(conn, table, self.retention_months, self.retention_mode)
+
+    def start(self):
+        """Schedule partition maintenance"""
+        from utils.tasks import get_background_tasks
+        get_background_tasks().start_periodic("log_partition_maintenance", self.interval_seconds, self.run)
+
+# Global partition maintenance instance
+partition_maintenance = PartitionMaintenance()
+
+def get_partition_maintenance() -> PartitionMaintenance:
+    """Get partition maintenance instance"""
+    return partition_maintenance
@@ -0,0 +1,118 @@
+import os
+import re
+import time
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Same statement shape repeated this many times in one update is reported as N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", 5))
+
+_WHITESPACE = re.compile(r"\s+")
+
+class UpdateQueryStats:
+    """SQL statements issued while handling a single Telegram update"""
+
+    def __init__(self, handler: str):
+        self.handler = handler
+        self.statements = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+
+# Stats of the update being handled. SQLAlchemy's greenlet runs cursor events in the caller's
+# context, and tasks spawned while handling an update inherit it, so their statements count too
+_current_stats: ContextVar[Optional[UpdateQueryStats]] = ContextVar("query_stats", default=None)
+
+class QueryTracker:
+    def __init__(self):
+        self._handlers: Dict[str, Dict[str, Any]] = {}
+        self.total_statements = 0
+        self.total_db_time = 0.0
+
+    def instrument(self, engine):
+        """Attach statement counters to an (async) engine"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        elapsed = time.perf_counter() - starts.pop() if starts else 0.0
+
+        self.total_statements += 1
+        self.total_db_time += elapsed
+
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.db_time += elapsed
+            stats.shapes[_WHITESPACE.sub(" ", statement).strip()] += 1
+
+    @asynccontextmanager
+    async def track(self, handler: str):
+        """Count statements issued in the current context for one update"""
+        stats = UpdateQueryStats(handler)
+        token = _current_stats.set(stats)
+        try:
+            yield stats
+        finally:
+            _current_stats.reset(token)
+            self._record(stats)
+
+    def _record(self, stats: UpdateQueryStats):
+        entry = self._handlers.setdefault(stats.handler, {
+            "updates": 0,
+            "statements": 0,
+            "db_time_ms": 0.0,
+            "max_statements": 0,
+            "n_plus_one": 0,
+        })
+        entry["updates"] += 1
+        entry["statements"] += stats.statements
+        entry["db_time_ms"] += stats.db_time * 1000
+        entry["max_statements"] = max(entry["max_statements"], stats.statements)
+
+        for shape, count in stats.shapes.items():
+            if count >= N_PLUS_ONE_THRESHOLD:
+                entry["n_plus_one"] += 1
+                logger.warning(
+                    f"⚠️ Possible N+1 in {stats.handler}: statement repeated {count}x in one update: "
+                    f"{shape[:200]}"
+                )
+
+        logger.debug(
+            f"{stats.handler}: {stats.statements} SQL statement(s), {stats.db_time * 1000:.1f} ms in DB"
+        )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get aggregated per-handler statistics"""
+        handlers = {}
+        for name, entry in self._handlers.items():
+            updates = entry["updates"] or 1
+            handlers[name] = {
+                **entry,
+                "db_time_ms": round(entry["db_time_ms"], 2),
+                "avg_statements": round(entry["statements"] / updates, 2),
+                "avg_db_time_ms": round(entry["db_time_ms"] / updates, 2),
+            }
+
+        return {
+            "total_statements": self.total_statements,
+            "total_db_time_ms": round(self.total_db_time * 1000, 2),
+            "handlers": handlers,
+        }
+
+# Global query tracker instance
+query_tracker = QueryTracker()
+
+def get_query_tracker() -> QueryTracker:
+    """Get query tracker instance"""
+    return query_tracker
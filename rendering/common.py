@@ -0,0 +1,46 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from PIL import ImageFont
+
+logger = logging.getLogger(__name__)
+
+ASSETS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Pillow releases the GIL while decoding, drawing and encoding, so threads keep the event loop free
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", min(4, os.cpu_count() or 1)))
+FONT_PATH = os.getenv("RENDER_FONT_PATH", "DejaVuSans.ttf")
+BOLD_FONT_PATH = os.getenv("RENDER_BOLD_FONT_PATH", "DejaVuSans-Bold.ttf")
+
+_executor = None
+
+def get_render_executor() -> ThreadPoolExecutor:
+    """Get the shared thread pool used for image rendering"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render")
+    return _executor
+
+async def run_render(fn, *args):
+    """Run a blocking render function in the render pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_render_executor(), fn, *args)
+
+def asset_path(name: str) -> str:
+    """Get absolute path of a bundled image asset"""
+    return os.path.join(ASSETS_DIR, name)
+
+@lru_cache(maxsize=32)
+def load_font(size: int, bold: bool = False):
+    """Load a TrueType font once per size, falling back to Pillow's default font"""
+    path = BOLD_FONT_PATH if bold else FONT_PATH
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        logger.warning(f"⚠️ Font {path} not found, using default font")
+        try:
+            return ImageFont.load_default(size)
+        except TypeError:
+            return ImageFont.load_default()
@@ -0,0 +1,84 @@
+import os
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+from PIL import Image, ImageDraw
+from rendering.common import asset_path, load_font
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE = "invoice_template.jpg"
+
+TEXT_COLOR = (20, 20, 20)
+INVERSE_COLOR = (255, 255, 255)
+
+# Positions on the 1414x2000 template, as fractions of its size
+INVOICE_ID_POS = (0.752, 0.1635)
+INVOICE_TO_POS = (0.119, 0.285)
+VIEWS_POS = (0.69, 0.4275)
+LINE_TOTAL_POS = (0.88, 0.4275)
+# Left of the subtotal, only drawn when the user earned referral commission
+REFERRAL_POS = (0.119, 0.667)
+SUBTOTAL_POS = (0.88, 0.667)
+TAX_POS = (0.88, 0.698)
+TOTAL_POS = (0.88, 0.752)
+
+@lru_cache(maxsize=1)
+def _template() -> Image.Image:
+    """Decode the invoice template once per process"""
+    return Image.open(asset_path(TEMPLATE)).convert("RGB")
+
+def preload():
+    """Process pool initializer: decode the template and fonts before the first job"""
+    height = _template().size[1]
+    load_font(int(height * 0.016))
+    load_font(int(height * 0.018), bold=True)
+
+def _money(cents: int) -> str:
+    """Exact dollars from integer cents"""
+    sign = "-" if cents < 0 else ""
+    return f"{sign}${abs(cents) // 100:,}.{abs(cents) % 100:02d}"
+
+def render_invoice(line: Dict[str, Any], output_dir: str, fmt: str = "png") -> str:
+    """Draw one payout line onto the invoice template and write it to output_dir"""
+    image = _template().copy()
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+
+    font = load_font(int(height * 0.016))
+    bold = load_font(int(height * 0.018), bold=True)
+
+    def at(pos):
+        return (width * pos[0], height * pos[1])
+
+    draw.text(at(INVOICE_ID_POS), line["invoice_id"], font=font, fill=TEXT_COLOR, anchor="lm")
+
+    recipient = f"@{line['username']}" if line.get("username") else "Creator"
+    x, y = at(INVOICE_TO_POS)
+    draw.text((x, y), recipient, font=bold, fill=TEXT_COLOR, anchor="lm")
+    draw.text((x, y + height * 0.025), f"User ID: {line['user_id']}", font=font, fill=TEXT_COLOR, anchor="lm")
+
+    draw.text(at(VIEWS_POS), f"{line['views']:,}", font=font, fill=TEXT_COLOR, anchor="mm")
+    draw.text(at(LINE_TOTAL_POS), _money(line["gross_cents"]), font=font, fill=TEXT_COLOR, anchor="rm")
+    referral = line.get("referral_cents") or 0
+    if referral:
+        x, y = at(REFERRAL_POS)
+        draw.text((x, y), "Incl. referral commission", font=font, fill=TEXT_COLOR, anchor="lm")
+        draw.text((x, y + height * 0.031), _money(referral), font=bold, fill=TEXT_COLOR, anchor="lm")
+    draw.text(at(SUBTOTAL_POS), _money(line["gross_cents"] + referral), font=bold, fill=TEXT_COLOR, anchor="rm")
+    draw.text(at(TAX_POS), _money(-line["tax_cents"]), font=bold, fill=TEXT_COLOR, anchor="rm")
+    draw.text(at(TOTAL_POS), _money(line["net_cents"]), font=bold, fill=INVERSE_COLOR, anchor="rm")
+
+    path = os.path.join(output_dir, f"invoice_{line['invoice_id']}.{fmt}")
+    if fmt == "pdf":
+        image.save(path, format="PDF", resolution=150)
+    else:
+        image.save(path, format="PNG")
+    return path
+
+def render_invoices(lines: List[Dict[str, Any]], output_dir: str, fmt: str = "png") -> List[Tuple[str, str]]:
+    """Render a chunk of invoices, returning (invoice_id, path) pairs
+
+    One process pool task per chunk keeps pickling overhead low.
+    """
+    return [(line["invoice_id"], render_invoice(line, output_dir, fmt)) for line in lines]
@@ -0,0 +1,18 @@
+from typing import Any, Dict, List, Tuple
+
+# Entry points of the invoice render pool. Workers unpickle them by importing this module only, so it
+# must stay free of bot, database and service imports; the renderer is imported inside the worker.
+
+def init_worker():
+    """Process pool initializer: decode the template and fonts before the first job"""
+    from rendering.invoice import preload
+    preload()
+
+def ready() -> bool:
+    """No-op job used to start a worker"""
+    return True
+
+def render_chunk(lines: List[Dict[str, Any]], output_dir: str, fmt: str) -> List[Tuple[str, str]]:
+    """Render a chunk of invoices, returning (invoice_id, path) pairs"""
+    from rendering.invoice import render_invoices
+    return render_invoices(lines, output_dir, fmt)
@@ -0,0 +1,91 @@
+import io
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from PIL import Image, ImageDraw
+from rendering.common import asset_path, load_font, run_render
+from utils.helpers import format_views, truncate_text
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND = "private_leaderboard_bg.png"
+BACKGROUND_FILL = (18, 18, 24)
+MEDAL_COLORS = [(255, 215, 0), (192, 192, 192), (205, 127, 50)]
+TEXT_COLOR = (240, 240, 240)
+
+@lru_cache(maxsize=1)
+def _background() -> Image.Image:
+    """Decode the background once; the PNG is transparent so flatten it onto a dark fill"""
+    image = Image.open(asset_path(BACKGROUND)).convert("RGBA")
+    flattened = Image.new("RGBA", image.size, BACKGROUND_FILL + (255,))
+    flattened.alpha_composite(image)
+    return flattened.convert("RGB")
+
+def render_leaderboard(rows: List[Dict[str, Any]], first_rank: int = 1) -> bytes:
+    """Draw ranked rows onto the leaderboard background and return PNG bytes"""
+    image = _background().copy()
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+
+    title_font = load_font(int(height * 0.06), bold=True)
+    row_font = load_font(int(height * 0.035))
+
+    draw.text((width / 2, height * 0.08), "LEADERBOARD", font=title_font, fill=TEXT_COLOR, anchor="mm")
+
+    top, bottom = height * 0.18, height * 0.95
+    step = (bottom - top) / max(len(rows), 10)
+    for offset, row in enumerate(rows):
+        rank = first_rank + offset
+        y = top + step * (offset + 0.5)
+        color = MEDAL_COLORS[rank - 1] if rank <= len(MEDAL_COLORS) else TEXT_COLOR
+        name = f"@{row['username']}" if row.get("username") else str(row["user_id"])
+
+        draw.text((width * 0.08, y), f"#{rank}", font=row_font, fill=color, anchor="lm")
+        draw.text((width * 0.2, y), truncate_text(name, 24), font=row_font, fill=TEXT_COLOR, anchor="lm")
+        draw.text((width * 0.92, y), format_views(row["total_views"]), font=row_font, fill=color, anchor="rm")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
+
+class LeaderboardImageCache:
+    """Rendered top page per leaderboard version, plus the Telegram file_id once uploaded"""
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.rows: List[Dict[str, Any]] = []
+        self.png: Optional[bytes] = None
+        self.file_id: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    def get(self, version: int) -> Optional[Dict[str, Any]]:
+        """Get cached rows and photo (file_id preferred over bytes) for a version"""
+        if self.version != version or (self.png is None and self.file_id is None):
+            return None
+        return {"rows": self.rows, "photo": self.file_id or self.png}
+
+    async def render(self, version: int, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Render rows for a version off the event loop, reusing a concurrent render"""
+        async with self._lock:
+            cached = self.get(version)
+            if cached:
+                return cached
+
+            png = await run_render(render_leaderboard, rows)
+            self.version, self.rows, self.png, self.file_id = version, rows, png, None
+            return {"rows": rows, "photo": png}
+
+    def remember_file_id(self, version: int, file_id: str):
+        """Store the file_id Telegram assigned to the uploaded image"""
+        if self.version == version:
+            self.file_id = file_id
+            # Telegram serves the photo from now on, no need to keep the bytes
+            self.png = None
+
+# Global leaderboard image cache
+leaderboard_images = LeaderboardImageCache()
+
+def get_leaderboard_images() -> LeaderboardImageCache:
+    """Get leaderboard image cache instance"""
+    return leaderboard_images
@@ -0,0 +1,119 @@
+import io
+import os
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from PIL import Image, ImageDraw
+from rendering.common import asset_path, load_font, run_render
+from utils.helpers import format_views, truncate_text
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE = "template_profile_card.png"
+CACHE_SIZE = int(os.getenv("PROFILE_CARD_CACHE_SIZE", 1000))
+
+LABEL_COLOR = (110, 110, 110)
+VALUE_COLOR = (30, 30, 30)
+AVATAR_COLOR = (90, 90, 90)
+
+# Layout of the 1024x1024 template, as fractions of its size
+AVATAR_CENTER = (0.5, 0.39)
+STATS_TOP, STATS_BOTTOM = 0.56, 0.86
+LEFT_COLUMN, RIGHT_COLUMN = 0.14, 0.86
+
+@lru_cache(maxsize=1)
+def _template() -> Image.Image:
+    """Decode the card template once"""
+    return Image.open(asset_path(TEMPLATE)).convert("RGB")
+
+def preload():
+    """Decode the template and fonts up front so the first /profile is not slow"""
+    size = _template().size[1]
+    load_font(int(size * 0.09), bold=True)
+    load_font(int(size * 0.03))
+    load_font(int(size * 0.03), bold=True)
+
+def render_profile_card(stats: Dict[str, Any]) -> bytes:
+    """Draw profile stats onto the card template and return PNG bytes"""
+    image = _template().copy()
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+
+    username = stats.get("username") or ""
+    initial = username[:1].upper() or "?"
+    draw.text(
+        (width * AVATAR_CENTER[0], height * AVATAR_CENTER[1]),
+        initial,
+        font=load_font(int(height * 0.09), bold=True),
+        fill=AVATAR_COLOR,
+        anchor="mm"
+    )
+
+    label_font = load_font(int(height * 0.03))
+    value_font = load_font(int(height * 0.03), bold=True)
+
+    accounts = stats.get("accounts") or []
+    lines = [
+        ("User", f"@{username}" if username else "—"),
+        ("Total Views", format_views(stats["total_views"])),
+        ("Total Reels", str(stats["total_reels"])),
+        ("Slots Used", f"{stats['used_slots']}/{stats['max_slots']}"),
+        ("Payable Amount", f"${stats['payout']:.2f}"),
+        ("Linked Accounts", truncate_text(", ".join(f"@{a}" for a in accounts), 28) if accounts else "None"),
+    ]
+
+    step = (STATS_BOTTOM - STATS_TOP) * height / len(lines)
+    for index, (label, value) in enumerate(lines):
+        y = STATS_TOP * height + step * (index + 0.5)
+        draw.text((width * LEFT_COLUMN, y), label, font=label_font, fill=LABEL_COLOR, anchor="lm")
+        draw.text((width * RIGHT_COLUMN, y), value, font=value_font, fill=VALUE_COLOR, anchor="rm")
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
+
+def stats_hash(stats: Dict[str, Any]) -> str:
+    """Hash of the stats that appear on the card"""
+    return hashlib.sha1(json.dumps(stats, sort_keys=True, default=str).encode()).hexdigest()
+
+class ProfileCardCache:
+    """Per-user rendered cards, reused while the user's stats hash is unchanged"""
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        # user_id -> (stats hash, png bytes or None, telegram file_id or None)
+        self._cards: "OrderedDict[int, Tuple[str, Optional[bytes], Optional[str]]]" = OrderedDict()
+
+    async def get_photo(self, user_id: int, stats: Dict[str, Any]):
+        """Get a file_id or PNG bytes for the user's current stats, rendering if needed"""
+        digest = stats_hash(stats)
+        cached = self._cards.get(user_id)
+        if cached and cached[0] == digest:
+            self._cards.move_to_end(user_id)
+            return cached[2] or cached[1]
+
+        png = await run_render(render_profile_card, stats)
+        self._store(user_id, (digest, png, None))
+        return png
+
+    def remember_file_id(self, user_id: int, stats: Dict[str, Any], file_id: str):
+        """Store the file_id Telegram assigned to the uploaded card"""
+        cached = self._cards.get(user_id)
+        if cached and cached[0] == stats_hash(stats):
+            self._store(user_id, (cached[0], None, file_id))
+
+    def _store(self, user_id: int, entry):
+        self._cards[user_id] = entry
+        self._cards.move_to_end(user_id)
+        while len(self._cards) > self.max_size:
+            self._cards.popitem(last=False)
+
+# Global profile card cache
+profile_cards = ProfileCardCache()
+
+def get_profile_cards() -> ProfileCardCache:
+    """Get profile card cache instance"""
+    return profile_cards
@@ -1,10 +1,15 @@
-from sqlalchemy import text
-from database.connection import get_db_session
+from database.connection import get_db_session, get_db_read_session, mark_user_write
+from database.hot_queries import hot_query
 from typing import Set
 import logging
 
 logger = logging.getLogger(__name__)
 
+_IS_ADMIN = hot_query("admin.is_admin", "SELECT 1 FROM admins WHERE user_id = :u")
+_ADD_ADMIN = hot_query("admin.add", "INSERT INTO admins (user_id, added_by) VALUES (:u, :a)", a=0)
+_REMOVE_ADMIN = hot_query("admin.remove", "DELETE FROM admins WHERE user_id = :u")
+_ALL_ADMINS = hot_query("admin.all", "SELECT user_id, added_by, added_at FROM admins ORDER BY added_at")
+
 class AdminService:
     def __init__(self, admin_ids: Set[int]):
         self.admin_ids = admin_ids
@@ -17,11 +22,8 @@ class AdminService:
         
         # Check database
         try:
-            async with await get_db_session() as session:
-                result = await session.execute(
-                    text("SELECT 1 FROM admins WHERE user_id = :u"),
-                    {"u": user_id}
-                )
+            async with await get_db_read_session(user_id) as session:
+                result = await session.execute(_IS_ADMIN, {"u": user_id})
                 return bool(result.scalar())
         except Exception as e:
             logger.error(f"Error checking admin status for {user_id}: {e}")
@@ -32,20 +34,15 @@ class AdminService:
         try:
             async with await get_db_session() as session:
                 # Check if already admin
-                existing = await session.execute(
-                    text("SELECT 1 FROM admins WHERE user_id = :u"),
-                    {"u": user_id}
-                )
+                existing = await session.execute(_IS_ADMIN, {"u": user_id})
                 
                 if existing.scalar():
                     return False
                 
                 # Add admin
-                await session.execute(
-                    text("INSERT INTO admins (user_id, added_by) VALUES (:u, :a)"),
-                    {"u": user_id, "a": added_by}
-                )
+                await session.execute(_ADD_ADMIN, {"u": user_id, "a": added_by})
                 await session.commit()
+                mark_user_write(user_id)
                 return True
                 
         except Exception as e:
@@ -56,11 +53,9 @@ class AdminService:
         """Remove admin from database"""
         try:
             async with await get_db_session() as session:
-                result = await session.execute(
-                    text("DELETE FROM admins WHERE user_id = :u"),
-                    {"u": user_id}
-                )
+                result = await session.execute(_REMOVE_ADMIN, {"u": user_id})
                 await session.commit()
+                mark_user_write(user_id)
                 return result.rowcount > 0
                 
         except Exception as e:
@@ -70,10 +65,8 @@ class AdminService:
     async def get_all_admins(self) -> list:
         """Get all admins from database"""
         try:
-            async with await get_db_session() as session:
-                result = await session.execute(
-                    text("SELECT user_id, added_by, added_at FROM admins ORDER BY added_at")
-                )
+            async with await get_db_read_session() as session:
+                result = await session.execute(_ALL_ADMINS)
                 return result.fetchall()
                 
         except Exception as e:
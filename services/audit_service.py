@@ -0,0 +1,204 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from database.connection import get_db_session
+from database.hot_queries import hot_query
+
+logger = logging.getLogger(__name__)
+
+# submission_logs column widths; longer values would make the whole batch fail
+_MAX_LENGTHS = {"shortcode": 255, "insta_handle": 255, "action": 100}
+
+def _rejected(error: Exception) -> bool:
+    """Whether the database rejected the rows themselves (data or constraint error), not the connection"""
+    sqlstate = getattr(getattr(error, "orig", None), "sqlstate", None) or ""
+    return sqlstate[:2] in ("22", "23")
+
+_INSERT_BATCH = hot_query("audit.flush", """
+    INSERT INTO submission_logs
+        (user_id, shortcode, views, old_views, insta_handle, action, detail, created_at)
+    SELECT u, s, v, o, h, a, CAST(d AS JSONB), c FROM unnest(
+        CAST(:u AS BIGINT[]), CAST(:s AS VARCHAR[]), CAST(:v AS BIGINT[]),
+        CAST(:o AS BIGINT[]), CAST(:h AS VARCHAR[]), CAST(:a AS VARCHAR[]),
+        CAST(:d AS TEXT[]), CAST(:c AS TIMESTAMP[])
+    ) AS batch (u, s, v, o, h, a, d, c)
+""", u=[0], s=["bench"], v=[0], o=[None], h=["bench"], a=["bench"], d=[None], c=[datetime(2024, 1, 1)])
+
+class AuditLogger:
+    """Write-behind buffer for submission_logs rows, flushed in bulk off the request path"""
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+        self.flush_seconds = float(os.getenv("AUDIT_FLUSH_MS", 1000)) / 1000
+        self.queue_size = int(os.getenv("AUDIT_QUEUE_SIZE", 10_000))
+        self.enqueue_timeout = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT_SECONDS", 5))
+        self.max_attempts = int(os.getenv("AUDIT_MAX_ATTEMPTS", 3))
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def start(self):
+        """Start the background flusher"""
+        if self._task is not None and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="audit_flusher")
+
+    async def log(self, user_id: int, action: str, shortcode: str = "", views: int = 0,
+                  old_views: Optional[int] = None, insta_handle: str = "",
+                  detail: Optional[Dict[str, Any]] = None):
+        """Queue an audit row; waits (backpressure) while the buffer is full
+
+        views is the reel's view count; anything else an action records goes in detail.
+        """
+        if self._task is None or self._task.done():
+            self.start()
+
+        row = {
+            "user_id": user_id,
+            "shortcode": shortcode or "",
+            "views": views or 0,
+            "old_views": old_views,
+            "insta_handle": insta_handle or "",
+            "action": action,
+            "detail": json.dumps(detail, default=str) if detail else None,
+            "created_at": datetime.now(),
+        }
+        for column, length in _MAX_LENGTHS.items():
+            row[column] = row[column][:length]
+        try:
+            await asyncio.wait_for(self._queue.put(row), self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            logger.warning(f"⚠️ Audit buffer full, dropped {action} row for {user_id}")
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        """Collect up to batch_size rows, waiting at most flush_seconds after the first one"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        deadline = None
+
+        while len(batch) < self.batch_size:
+            if self._stopping.is_set():
+                # Shutting down: take whatever is queued without waiting for more
+                try:
+                    row = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+            else:
+                timeout = None if deadline is None else deadline - loop.time()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+            if row is None:
+                # Wake-up sentinel from close()
+                continue
+            batch.append(row)
+            if deadline is None:
+                deadline = loop.time() + self.flush_seconds
+
+        return batch
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        async with await get_db_session() as session:
+            # One statement per batch: columns are unnested server-side
+            await session.execute(
+                _INSERT_BATCH,
+                {
+                    "u": [row["user_id"] for row in batch],
+                    "s": [row["shortcode"] for row in batch],
+                    "v": [row["views"] for row in batch],
+                    "o": [row["old_views"] for row in batch],
+                    "h": [row["insta_handle"] for row in batch],
+                    "a": [row["action"] for row in batch],
+                    "d": [row["detail"] for row in batch],
+                    "c": [row["created_at"] for row in batch],
+                }
+            )
+            await session.commit()
+        self.written += len(batch)
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            # Keep retrying; the bounded queue pushes back on producers meanwhile. A batch the
+            # database keeps rejecting is split until the bad rows are isolated and dropped
+            parts = [batch]
+            attempts = 0
+            splitting = False
+            while parts:
+                part = parts[-1]
+                try:
+                    await self._write(part)
+                    parts.pop()
+                    continue
+                except Exception as e:
+                    self.failed_flushes += 1
+                    attempts += 1
+                    if _rejected(e) and (splitting or attempts >= self.max_attempts):
+                        splitting = True
+                        parts.pop()
+                        if len(part) > 1:
+                            middle = len(part) // 2
+                            parts.extend([part[middle:], part[:middle]])
+                        else:
+                            self.rejected += 1
+                            logger.error(f"❌ Dropping audit row rejected by the database ({part[0]['action']} "
+                                         f"for {part[0]['user_id']}): {e}")
+                        continue
+                    logger.error(f"❌ Failed to flush {len(part)} audit rows: {e}")
+                await asyncio.sleep(self.flush_seconds)
+
+    async def close(self, timeout: float = 10.0):
+        """Flush everything still buffered, giving up after timeout seconds"""
+        if self._task is None or self._task.done():
+            return
+
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+        try:
+            await asyncio.wait_for(self._task, timeout)
+            logger.info(f"✅ Audit buffer flushed ({self.written} rows written)")
+        except asyncio.TimeoutError:
+            lost = self._queue.qsize()
+            self.dropped += lost
+            logger.error(f"❌ Audit flush timed out, {lost} buffered rows lost")
+
+    def stats(self) -> Dict[str, int]:
+        """Buffer depth and flush counters"""
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "failed_flushes": self.failed_flushes,
+        }
+
+# Global audit logger instance
+audit_logger = AuditLogger()
+
+def get_audit_logger() -> AuditLogger:
+    """Get audit logger instance"""
+    return audit_logger
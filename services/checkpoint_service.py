@@ -0,0 +1,55 @@
+import logging
+from typing import Any, Dict, List
+from database.connection import get_db_session, get_db_read_session
+from database.hot_queries import hot_query
+
+logger = logging.getLogger(__name__)
+
+_SAVE = hot_query("checkpoint.save", """
+    INSERT INTO scrape_checkpoints (task_id, user_id, chat_id, username, urls)
+    VALUES (:t, :u, :c, :n, :urls)
+    ON CONFLICT (task_id) DO NOTHING
+""", t="bench", c=0, n="bench", urls=["bench"])
+_PENDING = hot_query("checkpoint.pending", """
+    SELECT task_id, user_id, chat_id, username, urls, created_at
+    FROM scrape_checkpoints ORDER BY created_at
+""")
+_DELETE = hot_query("checkpoint.delete", "DELETE FROM scrape_checkpoints WHERE task_id = :t", t="bench")
+class CheckpointService:
+    """Scrapes interrupted by a shutdown, kept so their (already paid for) results are stored after restart"""
+
+    async def save_scrape(self, task_id: str, user_id: int, chat_id: int, username: str, urls: List[str]) -> bool:
+        """Record an Apify task whose results were not stored yet"""
+        try:
+            async with await get_db_session() as session:
+                await session.execute(
+                    _SAVE,
+                    {"t": task_id, "u": user_id, "c": chat_id, "n": username, "urls": urls}
+                )
+                await session.commit()
+            logger.info(f"💾 Checkpointed scrape {task_id} for {user_id} ({len(urls)} URLs)")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to checkpoint scrape {task_id} for {user_id}: {e}")
+            return False
+
+    async def pending_scrapes(self) -> List[Dict[str, Any]]:
+        """Checkpointed scrapes, oldest first"""
+        try:
+            async with await get_db_read_session() as session:
+                result = await session.execute(_PENDING)
+                return [dict(row._mapping) for row in result.fetchall()]
+        except Exception as e:
+            logger.error(f"❌ Failed to load scrape checkpoints: {e}")
+            return []
+
+    async def delete_scrape(self, session, task_id: str):
+        """Drop a checkpoint inside the caller's transaction (the one storing its results)"""
+        await session.execute(_DELETE, {"t": task_id})
+
+# Global checkpoint service instance
+checkpoint_service = CheckpointService()
+
+def get_checkpoint_service() -> CheckpointService:
+    """Get checkpoint service instance"""
+    return checkpoint_service
@@ -0,0 +1,145 @@
+import os
+import csv
+import gzip
+import time
+import asyncio
+import logging
+from datetime import date, datetime
+from typing import Any, Dict, List, Sequence
+from database.connection import get_db_read_session
+from database.hot_queries import hot_query
+from database.models import Base
+
+logger = logging.getLogger(__name__)
+
+# Whitelisted export queries; ordered by primary key so exports are reproducible
+_EXPORT_SQL = {
+    "users": """
+        SELECT user_id, username, approved, total_views, total_reels, max_slots, used_slots,
+               last_submission, created_at
+        FROM users ORDER BY user_id
+    """,
+    "reels": """
+        SELECT id, user_id, shortcode, url, username, views, likes, comments,
+               submitted_at, last_updated, created_at
+        FROM reels ORDER BY id
+    """,
+    "allowed_accounts": "SELECT id, user_id, insta_handle FROM allowed_accounts ORDER BY id",
+    "payment_details": """
+        SELECT id, user_id, usdt_address, paypal_email, upi_address, created_at
+        FROM payment_details ORDER BY id
+    """,
+}
+# Whole-table reads by design
+EXPORT_QUERIES = {table: hot_query(f"export.{table}", sql) for table, sql in _EXPORT_SQL.items()}
+
+class _GzipCsvWriter:
+    extension = "csv.gz"
+
+    def __init__(self, path: str, columns: Sequence[str], types: Sequence[type]):
+        self._file = gzip.open(path, "wt", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows: List[Sequence[Any]]):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+class _ParquetWriter:
+    extension = "parquet"
+
+    def __init__(self, path: str, columns: Sequence[str], types: Sequence[type]):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ValueError("Parquet export requires pyarrow to be installed")
+
+        self._pa = pyarrow
+        arrow_types = {
+            bool: pyarrow.bool_(),
+            int: pyarrow.int64(),
+            float: pyarrow.float64(),
+            datetime: pyarrow.timestamp("us"),
+            date: pyarrow.date32(),
+        }
+        # Declared up front: inferring from the first chunk turns an all-NULL column into the null type
+        self._schema = pyarrow.schema([
+            (name, arrow_types.get(python_type, pyarrow.string()))
+            for name, python_type in zip(columns, types)
+        ])
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema, compression="snappy")
+
+    def write(self, rows: List[Sequence[Any]]):
+        columns = [[row[i] for row in rows] for i in range(len(self._schema))]
+        self._writer.write_table(self._pa.Table.from_arrays(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+_WRITERS = {"csv": _GzipCsvWriter, "parquet": _ParquetWriter}
+
+class ExportService:
+    def __init__(self):
+        self.output_dir = os.getenv("EXPORT_OUTPUT_DIR", "exports")
+        self.chunk_size = int(os.getenv("EXPORT_CHUNK_SIZE", 5000))
+
+    async def export_table(self, table: str, fmt: str = "csv") -> Dict[str, Any]:
+        """Stream a table to a compressed file chunk by chunk so memory stays flat"""
+        if table not in EXPORT_QUERIES:
+            raise ValueError(f"Unknown export table: {table}")
+        if fmt not in _WRITERS:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        writer_cls = _WRITERS[fmt]
+        path = os.path.join(
+            self.output_dir,
+            f"{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{writer_cls.extension}"
+        )
+
+        rows = 0
+        writer = None
+        completed = False
+        try:
+            async with await get_db_read_session() as session:
+                # Server-side cursor: rows arrive in chunks instead of being buffered client-side
+                result = await session.stream(EXPORT_QUERIES[table])
+                columns = list(result.keys())
+                # Every export query selects plain columns of its table, so the models give their types
+                model_columns = Base.metadata.tables[table].c
+                types = [model_columns[name].type.python_type for name in columns]
+                writer = await loop.run_in_executor(None, writer_cls, path, columns, types)
+
+                async for chunk in result.partitions(self.chunk_size):
+                    # Compression runs in a thread so the event loop keeps serving updates
+                    await loop.run_in_executor(None, writer.write, [tuple(row) for row in chunk])
+                    rows += len(chunk)
+            completed = True
+        finally:
+            if writer is not None:
+                await loop.run_in_executor(None, writer.close)
+            if not completed and os.path.exists(path):
+                os.remove(path)
+
+        stats = {
+            "table": table,
+            "path": path,
+            "rows": rows,
+            "bytes": os.path.getsize(path),
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        logger.info(f"📦 Exported {table}: {stats}")
+        return stats
+
+# Global export service instance
+export_service = ExportService()
+
+def get_export_service() -> ExportService:
+    """Get export service instance"""
+    return export_service
@@ -0,0 +1,89 @@
+import os
+from datetime import datetime
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, FileResponse
+import uvicorn
+from database.connection import get_db_manager
+from database.query_stats import get_query_tracker
+from services.health_service import get_health_service, UNHEALTHY
+from services.audit_service import get_audit_logger
+from utils.loop_monitor import get_loop_monitor
+from utils.profiler import get_profiler
+from utils.startup import get_startup_timer
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN")
+
+# FastAPI health check
+app_fastapi = FastAPI()
+
+@app_fastapi.get("/")
+async def root():
+    return {"message": "Bot is running 🚀"}
+
+@app_fastapi.get("/health")
+async def health_check():
+    report = await get_health_service().health()
+    report["timestamp"] = datetime.now().isoformat()
+    return JSONResponse(report, status_code=503 if report["status"] == UNHEALTHY else 200)
+
+@app_fastapi.get("/ready")
+async def ready_check():
+    report = await get_health_service().ready()
+    report["timestamp"] = datetime.now().isoformat()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@app_fastapi.get("/metrics")
+async def metrics():
+    return {
+        "sql": get_query_tracker().snapshot(),
+        "db_pool": get_db_manager().pool_stats(),
+        "audit": get_audit_logger().stats(),
+        "event_loop": get_loop_monitor().stats(),
+        "startup": get_startup_timer().report(),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+def _check_profiler_token(token: Optional[str]):
+    # The profiler routes are disabled unless PROFILER_TOKEN is set
+    if not PROFILER_TOKEN or token != PROFILER_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+@app_fastapi.get("/profiler")
+async def profiler_status(x_profiler_token: Optional[str] = Header(None)):
+    _check_profiler_token(x_profiler_token)
+    return get_profiler().status()
+
+@app_fastapi.post("/profiler/start")
+async def profiler_start(seconds: float = None, interval_ms: float = None,
+                         x_profiler_token: Optional[str] = Header(None)):
+    _check_profiler_token(x_profiler_token)
+    if not get_profiler().start(seconds, interval_ms):
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    return get_profiler().status()
+
+@app_fastapi.post("/profiler/stop")
+async def profiler_stop(x_profiler_token: Optional[str] = Header(None)):
+    _check_profiler_token(x_profiler_token)
+    get_profiler().stop()
+    return await get_profiler().wait()
+
+@app_fastapi.get("/profiler/result")
+async def profiler_result(x_profiler_token: Optional[str] = Header(None)):
+    _check_profiler_token(x_profiler_token)
+    result = get_profiler().last_result
+    if not result or "path" not in result:
+        raise HTTPException(status_code=404, detail="No profile recorded yet")
+    return FileResponse(result["path"], media_type="text/plain", filename=os.path.basename(result["path"]))
+
+class _Server(uvicorn.Server):
+    def install_signal_handlers(self):
+        # SIGTERM belongs to the bot's graceful shutdown (utils/shutdown.py); uvicorn's own
+        # handler would only stop this server and leave the bot polling
+        pass
+
+async def serve(port: int):
+    """Run the health check server until cancelled"""
+    config = uvicorn.Config(app_fastapi, host="0.0.0.0", port=port, log_level="info")
+    server = _Server(config)
+    await server.serve()
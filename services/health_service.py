@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from database.connection import get_db_manager
+from utils.tasks import get_background_tasks
+
+logger = logging.getLogger(__name__)
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+UNHEALTHY = "unhealthy"
+
+_SEVERITY = {HEALTHY: 0, DEGRADED: 1, UNHEALTHY: 2}
+
+def _grade(value: float, degraded: float, unhealthy: float) -> str:
+    """Grade a measurement against thresholds (a threshold of 0 disables it)"""
+    if unhealthy and value >= unhealthy:
+        return UNHEALTHY
+    if degraded and value >= degraded:
+        return DEGRADED
+    return HEALTHY
+
+class HealthService:
+    def __init__(self):
+        self.cache_seconds = float(os.getenv("HEALTH_CACHE_SECONDS", 5))
+        self.db_degraded_ms = float(os.getenv("HEALTH_DB_DEGRADED_MS", 250))
+        self.db_unhealthy_ms = float(os.getenv("HEALTH_DB_UNHEALTHY_MS", 2000))
+        self.update_age_degraded = float(os.getenv("HEALTH_UPDATE_AGE_DEGRADED_SECONDS", 0))
+        self.update_age_unhealthy = float(os.getenv("HEALTH_UPDATE_AGE_UNHEALTHY_SECONDS", 0))
+        self.job_lag_degraded_ms = float(os.getenv("HEALTH_JOB_LAG_DEGRADED_MS", 500))
+        self.job_lag_unhealthy_ms = float(os.getenv("HEALTH_JOB_LAG_UNHEALTHY_MS", 5000))
+
+        self.application = None
+        self.last_update_at: Optional[float] = None
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    def attach_application(self, application):
+        """Register the running Telegram application for polling checks"""
+        self.application = application
+
+    def record_update(self):
+        """Mark that an update has just been processed"""
+        self.last_update_at = time.monotonic()
+
+    def start_monitoring(self):
+        """Start the heartbeat job used to measure job queue lag"""
+        async def heartbeat():
+            pass
+
+        get_background_tasks().start_periodic("heartbeat", 1.0, heartbeat)
+
+    async def _cached(self, name: str, check: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run a check at most once per cache window"""
+        cached = self._cache.get(name)
+        now = time.monotonic()
+        if cached and now - cached[0] < self.cache_seconds:
+            return cached[1]
+
+        try:
+            result = await check()
+        except Exception as e:
+            logger.error(f"❌ Health check {name} failed: {e}")
+            result = {"status": UNHEALTHY, "error": str(e)}
+
+        self._cache[name] = (now, result)
+        return result
+
+    async def _check_database(self) -> Dict[str, Any]:
+        # A hung connection must not hang the probe; past the unhealthy threshold the answer is known
+        timeout = self.db_unhealthy_ms / 1000 or None
+        try:
+            latency_ms = (await asyncio.wait_for(get_db_manager().ping(), timeout)) * 1000
+        except asyncio.TimeoutError:
+            return {"status": UNHEALTHY, "error": f"ping timed out after {self.db_unhealthy_ms:.0f} ms"}
+        return {
+            "status": _grade(latency_ms, self.db_degraded_ms, self.db_unhealthy_ms),
+            "latency_ms": round(latency_ms, 2),
+        }
+
+    async def _check_updates(self) -> Dict[str, Any]:
+        updater = self.application.updater if self.application else None
+        polling = bool(updater and updater.running)
+        age = time.monotonic() - self.last_update_at if self.last_update_at else None
+
+        status = HEALTHY if polling else UNHEALTHY
+        if polling and age is not None:
+            status = _grade(age, self.update_age_degraded, self.update_age_unhealthy)
+
+        return {
+            "status": status,
+            "polling": polling,
+            "last_update_age_seconds": round(age, 1) if age is not None else None,
+        }
+
+    async def _check_jobs(self) -> Dict[str, Any]:
+        lag_ms = get_background_tasks().max_lag() * 1000
+        return {
+            "status": _grade(lag_ms, self.job_lag_degraded_ms, self.job_lag_unhealthy_ms),
+            "lag_ms": round(lag_ms, 2),
+        }
+
+    async def _check_apify(self) -> Dict[str, Any]:
+        from apify_client import get_apify_client
+
+        state = get_apify_client().breaker_state()
+        # Scraping being unavailable degrades /submit but the rest of the bot still works
+        return {"status": HEALTHY if state == "closed" else DEGRADED, "breaker": state}
+
+    async def health(self) -> Dict[str, Any]:
+        """Run all dependency checks and summarize the worst status"""
+        checks = {
+            "database": await self._cached("database", self._check_database),
+            "updates": await self._cached("updates", self._check_updates),
+            "jobs": await self._cached("jobs", self._check_jobs),
+            "apify": await self._cached("apify", self._check_apify),
+        }
+        status = max((c["status"] for c in checks.values()), key=_SEVERITY.get)
+        return {"status": status, "checks": checks}
+
+    async def ready(self) -> Dict[str, Any]:
+        """Check whether the bot can serve traffic (database reachable and polling)"""
+        database = await self._cached("database", self._check_database)
+        updates = await self._cached("updates", self._check_updates)
+        ready = database["status"] != UNHEALTHY and updates.get("polling", False)
+        return {"ready": ready, "checks": {"database": database, "updates": updates}}
+
+# Global health service instance
+health_service = HealthService()
+
+def get_health_service() -> HealthService:
+    """Get health service instance"""
+    return health_service
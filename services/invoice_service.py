@@ -0,0 +1,168 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from database.connection import get_db_read_session
+from database.hot_queries import hot_query
+from rendering import invoice_worker
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, int, float], Awaitable[None]]
+
+_LATEST_BATCH = hot_query("invoice.latest_batch", "SELECT MAX(id) FROM payout_batches")
+_PAYOUT_LINES = hot_query("invoice.payout_lines", """
+    SELECT i.user_id, u.username, i.views, i.gross_cents, i.tax_cents, i.referral_cents, i.net_cents
+    FROM payout_batch_items i
+    LEFT JOIN users u ON u.user_id = i.user_id
+    WHERE i.batch_id = :b
+    ORDER BY i.user_id
+""", b=1)
+
+class InvoiceService:
+    def __init__(self):
+        self.output_dir = os.getenv("INVOICE_OUTPUT_DIR", "invoices")
+        self.workers = int(os.getenv("INVOICE_WORKERS", os.cpu_count() or 1))
+        self.chunk_size = int(os.getenv("INVOICE_CHUNK_SIZE", 50))
+        self.delivery_concurrency = int(os.getenv("INVOICE_DELIVERY_CONCURRENCY", 10))
+        self.format = os.getenv("INVOICE_FORMAT", "png")
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        """Create the render pool and start its workers, which are then reused for every batch"""
+        if self._pool is None:
+            # spawn: forking the threaded bot process can deadlock the children
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=invoice_worker.init_worker,
+            )
+            self._spawn_workers()
+
+    def _spawn_workers(self):
+        """Start every worker now, without it re-running the bot's main script"""
+        # spawn re-executes __main__ in each child unless it has neither a file nor a spec. Workers are
+        # started inside submit(), one per submit while none is idle, so one no-op each starts them all here
+        main = sys.modules["__main__"]
+        saved = {name: main.__dict__[name] for name in ("__file__", "__spec__") if name in main.__dict__}
+        main.__file__, main.__spec__ = None, None
+        try:
+            for _ in range(self.workers):
+                self._pool.submit(invoice_worker.ready)
+        finally:
+            for name in ("__file__", "__spec__"):
+                if name in saved:
+                    setattr(main, name, saved[name])
+                else:
+                    delattr(main, name)
+
+    async def stop(self):
+        """Shut the render pool down without blocking the event loop"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+    async def get_payout_lines(self, batch_id: Optional[int] = None) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+        """Invoice lines of a stored payout batch (default: the latest), amounts in cents"""
+        async with await get_db_read_session() as session:
+            if batch_id is None:
+                batch_id = (await session.execute(_LATEST_BATCH)).scalar()
+                if batch_id is None:
+                    return None, []
+
+            result = await session.stream(_PAYOUT_LINES, {"b": batch_id})
+            lines = []
+            async for partition in result.partitions(1000):
+                for user_id, username, views, gross, tax, referral, net in partition:
+                    lines.append({
+                        "invoice_id": f"{batch_id}-{user_id}",
+                        "user_id": user_id,
+                        "username": username,
+                        "views": views,
+                        "gross_cents": gross,
+                        "tax_cents": tax,
+                        "referral_cents": referral,
+                        "net_cents": net,
+                    })
+        return batch_id, lines
+
+    async def generate_batch(self, bot=None, deliver: bool = False,
+                             progress: Optional[ProgressCallback] = None,
+                             batch_id: Optional[int] = None,
+                             lines: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Render invoices for a payout batch in the process pool, optionally sending them to users"""
+        started = time.perf_counter()
+        if lines is None:
+            batch_id, lines = await self.get_payout_lines(batch_id)
+        label = str(batch_id) if batch_id is not None else datetime.now().strftime("%Y%m%d%H%M%S")
+        output_dir = os.path.join(self.output_dir, label)
+        os.makedirs(output_dir, exist_ok=True)
+
+        total = len(lines)
+        stats = {"batch_id": batch_id, "total": total, "rendered": 0, "render_failed": 0,
+                 "delivered": 0, "delivery_failed": 0,
+                 "output_dir": output_dir}
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.delivery_concurrency)
+
+        async def send(line: Dict[str, Any], path: str):
+            async with semaphore:
+                try:
+                    with open(path, "rb") as document:
+                        await bot.send_document(
+                            line["user_id"],
+                            document,
+                            filename=os.path.basename(path),
+                            caption=f"🧾 Invoice {line['invoice_id']}: ${line['net_cents'] / 100:.2f}"
+                        )
+                    stats["delivered"] += 1
+                except Exception as e:
+                    stats["delivery_failed"] += 1
+                    logger.error(f"Failed to deliver invoice to {line['user_id']}: {e}")
+
+        chunks = [lines[i:i + self.chunk_size] for i in range(0, total, self.chunk_size)]
+        lines_by_id = {line["invoice_id"]: line for line in lines}
+        deliveries = []
+
+        self.start()
+        futures = [
+            loop.run_in_executor(self._pool, invoice_worker.render_chunk, chunk, output_dir, self.format)
+            for chunk in chunks
+        ]
+        for future in asyncio.as_completed(futures):
+            try:
+                rendered = await future
+            except Exception as e:
+                logger.error(f"❌ Invoice render chunk failed: {e}")
+                continue
+
+            for invoice_id, path in rendered:
+                stats["rendered"] += 1
+                if deliver and bot is not None:
+                    deliveries.append(asyncio.create_task(send(lines_by_id[invoice_id], path)))
+
+            if progress:
+                await progress(stats["rendered"], total, time.perf_counter() - started)
+
+        if deliveries:
+            await asyncio.gather(*deliveries)
+
+        elapsed = time.perf_counter() - started
+        stats["render_failed"] = total - stats["rendered"]
+        stats["seconds"] = round(elapsed, 2)
+        stats["per_second"] = round(stats["rendered"] / elapsed, 1) if elapsed else 0.0
+        logger.info(f"🧾 Invoice batch {batch_id}: {stats}")
+        return stats
+
+# Global invoice service instance
+invoice_service = InvoiceService()
+
+def get_invoice_service() -> InvoiceService:
+    """Get invoice service instance"""
+    return invoice_service
@@ -0,0 +1,165 @@
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from database.connection import get_db_session, get_db_read_session
+from database.hot_queries import hot_query
+from services.referral_service import get_referral_service
+
+logger = logging.getLogger(__name__)
+
+_APPLY_DELTA = hot_query("leaderboard.apply_view_delta", """
+    INSERT INTO leaderboard (user_id, username, total_views, updated_at)
+    VALUES (:u, :n, :d, now())
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_views = leaderboard.total_views + EXCLUDED.total_views,
+        username = COALESCE(EXCLUDED.username, leaderboard.username),
+        updated_at = EXCLUDED.updated_at
+    RETURNING total_views
+""", n="bench", d=1)
+_REMOVE = hot_query("leaderboard.remove_user", "DELETE FROM leaderboard WHERE user_id = :u")
+_FIRST_PAGE = hot_query("leaderboard.first_page", """
+    SELECT user_id, username, total_views FROM leaderboard
+    ORDER BY total_views DESC, user_id DESC
+    LIMIT :n
+""", n=10)
+_NEXT_PAGE = hot_query("leaderboard.next_page", """
+    SELECT user_id, username, total_views FROM leaderboard
+    WHERE (total_views, user_id) < (:v, :u)
+    ORDER BY total_views DESC, user_id DESC
+    LIMIT :n
+""", n=10)
+# Counts the rows ahead with a range scan of idx_leaderboard_rank (the ORDER BY keeps the planner on the index,
+# its estimate for the correlated bound favours a seq scan), so the cost grows with the rank
+_RANK = hot_query("leaderboard.rank", """
+    SELECT l.total_views, (
+        SELECT COUNT(*) FROM (
+            SELECT 1 FROM leaderboard a
+            WHERE (a.total_views, a.user_id) > (l.total_views, l.user_id)
+            ORDER BY a.total_views DESC, a.user_id DESC
+        ) ahead
+    ) + 1
+    FROM leaderboard l
+    WHERE l.user_id = :u
+""")
+
+class LeaderboardService:
+    """Leaderboard kept in its own table and updated as view deltas arrive"""
+
+    def __init__(self):
+        self.page_size = int(os.getenv("LEADERBOARD_PAGE_SIZE", 10))
+        # Bumped after committed changes that can alter the top page; used as a cache key by renderers
+        self.version = 0
+        # (version, user_ids, lowest (total_views, user_id)) of the top page last read at that version
+        self._top_page: Optional[Tuple[int, frozenset, Optional[Tuple[int, int]]]] = None
+
+    def _bump_version(self):
+        self.version += 1
+        # Until the top page is read again every change counts
+        self._top_page = None
+
+    def _changed(self, user_id: int, total_views: Optional[int]):
+        """Bump the version if a committed change to a user can alter the top page"""
+        if self._top_page is None or self._top_page[0] != self.version:
+            return self._bump_version()
+
+        _, user_ids, floor = self._top_page
+        # Users on the page changed views or name (or left); others only matter if they now rank onto it
+        if user_id in user_ids or floor is None or (
+            total_views is not None and (total_views, user_id) > floor
+        ):
+            self._bump_version()
+
+    async def apply_view_delta(self, user_id: int, delta: int, username: str = None, session=None) -> bool:
+        """Add a view delta to a user's leaderboard entry and accrue referral commission on it
+        (inside session's transaction if given)"""
+        if not delta and username is None:
+            return False
+
+        query = _APPLY_DELTA
+        params = {"u": user_id, "n": username, "d": delta}
+
+        try:
+            if session is not None:
+                total_views = (await session.execute(query, params)).scalar()
+                await get_referral_service().accrue(session, user_id, delta)
+                event.listen(
+                    session.sync_session, "after_commit",
+                    lambda *args: self._changed(user_id, total_views), once=True
+                )
+                return True
+
+            async with await get_db_session() as own_session:
+                total_views = (await own_session.execute(query, params)).scalar()
+                await get_referral_service().accrue(own_session, user_id, delta)
+                await own_session.commit()
+            self._changed(user_id, total_views)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error applying leaderboard delta for {user_id}: {e}")
+            if session is not None:
+                raise
+            return False
+
+    async def remove_user(self, user_id: int) -> bool:
+        """Remove a user from the leaderboard"""
+        try:
+            async with await get_db_session() as session:
+                await session.execute(_REMOVE, {"u": user_id})
+                await session.commit()
+            self._changed(user_id, None)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error removing {user_id} from leaderboard: {e}")
+            return False
+
+    async def get_page(self, after: Optional[Tuple[int, int]] = None, limit: int = None) -> List[Dict[str, Any]]:
+        """Get the next page after the (total_views, user_id) keyset of the previous page's last row"""
+        limit = limit or self.page_size
+        version = self.version
+
+        try:
+            async with await get_db_read_session() as session:
+                if after is None:
+                    result = await session.execute(_FIRST_PAGE, {"n": limit})
+                else:
+                    result = await session.execute(_NEXT_PAGE, {"v": after[0], "u": after[1], "n": limit})
+
+                rows = [
+                    {"user_id": row[0], "username": row[1], "total_views": row[2]}
+                    for row in result.fetchall()
+                ]
+
+            # Remember what the top page held, unless something changed it while it was being read
+            if after is None and limit == self.page_size and version == self.version:
+                floor = (rows[-1]["total_views"], rows[-1]["user_id"]) if len(rows) == limit else None
+                self._top_page = (version, frozenset(row["user_id"] for row in rows), floor)
+            return rows
+
+        except Exception as e:
+            logger.error(f"Error getting leaderboard page: {e}")
+            return []
+
+    async def get_rank(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get a user's rank and views (None if not on the leaderboard)"""
+        try:
+            async with await get_db_read_session(user_id) as session:
+                result = await session.execute(_RANK, {"u": user_id})
+                row = result.fetchone()
+                if not row:
+                    return None
+
+                return {"total_views": row[0], "rank": row[1]}
+
+        except Exception as e:
+            logger.error(f"Error getting leaderboard rank for {user_id}: {e}")
+            return None
+
+# Global leaderboard service instance
+leaderboard_service = LeaderboardService()
+
+def get_leaderboard_service() -> LeaderboardService:
+    """Get leaderboard service instance"""
+    return leaderboard_service
@@ -0,0 +1,167 @@
+import os
+import logging
+from datetime import date
+from typing import Any, Dict, List, Tuple
+from database.connection import get_db_session, get_db_read_session
+from database.hot_queries import hot_query
+from utils.tasks import get_background_tasks
+
+logger = logging.getLogger(__name__)
+
+_RECORD_SAMPLE = hot_query("metrics.record_sample", """
+    INSERT INTO reel_metrics_history
+        (user_id, shortcode, insta_handle, views_delta, likes_delta, comments_delta)
+    VALUES (:u, :s, :h, :v, :l, :c)
+""", s="bench", h="bench", l=0, c=0)
+_ROLLUP = hot_query("metrics.rollup", """
+    WITH batch AS (
+        SELECT id FROM reel_metrics_history
+        WHERE NOT rolled_up
+        ORDER BY id
+        LIMIT :n
+        FOR UPDATE SKIP LOCKED
+    ),
+    folded AS (
+        UPDATE reel_metrics_history h SET rolled_up = TRUE
+        FROM batch
+        WHERE h.id = batch.id
+        RETURNING h.user_id, h.insta_handle, CAST(h.sampled_at AS DATE) AS day,
+                  h.views_delta, h.likes_delta, h.comments_delta
+    ),
+    by_user AS (
+        INSERT INTO user_daily_views (user_id, day, views_gained, likes_gained, comments_gained)
+        SELECT user_id, day, SUM(views_delta), SUM(likes_delta), SUM(comments_delta)
+        FROM folded
+        GROUP BY 1, 2
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            views_gained = user_daily_views.views_gained + EXCLUDED.views_gained,
+            likes_gained = user_daily_views.likes_gained + EXCLUDED.likes_gained,
+            comments_gained = user_daily_views.comments_gained + EXCLUDED.comments_gained
+    ),
+    by_handle AS (
+        INSERT INTO handle_daily_views (insta_handle, day, views_gained, likes_gained, comments_gained)
+        SELECT insta_handle, day, SUM(views_delta), SUM(likes_delta), SUM(comments_delta)
+        FROM folded
+        WHERE insta_handle IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (insta_handle, day) DO UPDATE SET
+            views_gained = handle_daily_views.views_gained + EXCLUDED.views_gained,
+            likes_gained = handle_daily_views.likes_gained + EXCLUDED.likes_gained,
+            comments_gained = handle_daily_views.comments_gained + EXCLUDED.comments_gained
+    )
+    SELECT COUNT(*) FROM folded
+""", n=50_000)
+_EXPIRE_HISTORY = hot_query("metrics.expire_history", """
+    DELETE FROM reel_metrics_history
+    WHERE rolled_up AND sampled_at < now() - make_interval(days => CAST(:d AS INTEGER))
+""", d=30)
+_VIEWS_GAINED = hot_query("profile.views_gained", """
+    SELECT COALESCE(SUM(views_gained), 0) FROM user_daily_views
+    WHERE user_id = :u AND day > CURRENT_DATE - CAST(:d AS INTEGER)
+""", d=7)
+_USER_SERIES = hot_query("metrics.user_series", """
+    SELECT day, views_gained FROM user_daily_views
+    WHERE user_id = :u AND day > CURRENT_DATE - CAST(:d AS INTEGER)
+    ORDER BY day
+""", d=30)
+_HANDLE_SERIES = hot_query("metrics.handle_series", """
+    SELECT day, views_gained FROM handle_daily_views
+    WHERE insta_handle = :h AND day > CURRENT_DATE - CAST(:d AS INTEGER)
+    ORDER BY day
+""", d=30)
+
+class MetricsService:
+    """Delta-encoded reel metrics history folded into daily per-user and per-handle rollups"""
+
+    def __init__(self):
+        self.rollup_seconds = float(os.getenv("METRICS_ROLLUP_SECONDS", 300))
+        self.rollup_batch = int(os.getenv("METRICS_ROLLUP_BATCH", 50_000))
+        self.history_retention_days = int(os.getenv("METRICS_HISTORY_RETENTION_DAYS", 30))
+
+    async def record_samples(self, session, samples: List[Dict[str, Any]]):
+        """Store metric changes for reels inside the caller's transaction
+
+        Each sample has user_id, shortcode, insta_handle, views, likes, comments and
+        optionally old_views/old_likes/old_comments (absent for a new reel).
+        """
+        rows = []
+        for sample in samples:
+            row = {
+                "u": sample["user_id"],
+                "s": sample["shortcode"],
+                "h": sample.get("insta_handle") or None,
+                "v": (sample.get("views") or 0) - (sample.get("old_views") or 0),
+                "l": (sample.get("likes") or 0) - (sample.get("old_likes") or 0),
+                "c": (sample.get("comments") or 0) - (sample.get("old_comments") or 0),
+            }
+            # Unchanged samples carry no information in a delta encoding
+            if row["v"] or row["l"] or row["c"]:
+                rows.append(row)
+
+        if rows:
+            await session.execute(_RECORD_SAMPLE, rows)
+
+    async def rollup(self) -> int:
+        """Fold history rows not rolled up yet into the daily rollups; returns the number of rows folded"""
+        async with await get_db_session() as session:
+            # Rows are flagged in the same statement that folds them, and a row is only seen once
+            # it has committed, so late commits are picked up by the next run instead of skipped
+            count = (await session.execute(_ROLLUP, {"n": self.rollup_batch})).scalar()
+
+            # Raw history is only needed until it has been rolled up
+            if count and self.history_retention_days > 0:
+                await session.execute(_EXPIRE_HISTORY, {"d": self.history_retention_days})
+
+            await session.commit()
+            if count:
+                logger.info(f"📈 Rolled up {count} metric samples")
+            return count
+
+    async def _rollup_job(self):
+        # Catch up in batches when a backlog built up
+        while await self.rollup() >= self.rollup_batch:
+            pass
+
+    def start_rollups(self):
+        """Schedule the periodic rollup job"""
+        get_background_tasks().start_periodic("metrics_rollup", self.rollup_seconds, self._rollup_job)
+
+    async def views_gained(self, user_id: int, days: int = 7) -> int:
+        """Views gained by a user over the last N days (today included), from rollups"""
+        try:
+            async with await get_db_read_session(user_id) as session:
+                result = await session.execute(_VIEWS_GAINED, {"u": user_id, "d": days})
+                return int(result.scalar() or 0)
+
+        except Exception as e:
+            logger.error(f"Error getting views gained for {user_id}: {e}")
+            return 0
+
+    async def daily_series(self, user_id: int, days: int = 30) -> List[Tuple[date, int]]:
+        """Daily views gained by a user for charting, from rollups"""
+        try:
+            async with await get_db_read_session(user_id) as session:
+                result = await session.execute(_USER_SERIES, {"u": user_id, "d": days})
+                return [(row[0], row[1]) for row in result.fetchall()]
+
+        except Exception as e:
+            logger.error(f"Error getting daily series for {user_id}: {e}")
+            return []
+
+    async def handle_daily_series(self, insta_handle: str, days: int = 30) -> List[Tuple[date, int]]:
+        """Daily views gained by an Instagram handle for charting, from rollups"""
+        try:
+            async with await get_db_read_session() as session:
+                result = await session.execute(_HANDLE_SERIES, {"h": insta_handle, "d": days})
+                return [(row[0], row[1]) for row in result.fetchall()]
+
+        except Exception as e:
+            logger.error(f"Error getting daily series for @{insta_handle}: {e}")
+            return []
+
+# Global metrics service instance
+metrics_service = MetricsService()
+
+def get_metrics_service() -> MetricsService:
+    """Get metrics service instance"""
+    return metrics_service
@@ -0,0 +1,162 @@
+import os
+import time
+import logging
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict
+import numpy as np
+from database.connection import get_db_session, get_db_read_session
+from database.hot_queries import hot_query
+
+logger = logging.getLogger(__name__)
+
+_COMMISSION_RATE = hot_query("payout.commission_rate", "SELECT value FROM config WHERE key = 'referral_commission_rate'")
+# Reads every user by design; streamed in partitions
+_INPUTS = hot_query("payout.inputs", """
+    SELECT u.user_id, COALESCE(u.total_views, 0), COALESCE(r.referrer_id, 0)
+    FROM users u
+    LEFT JOIN referrals r ON r.user_id = u.user_id
+    ORDER BY u.user_id
+""")
+_INSERT_BATCH = hot_query("payout.insert_batch", """
+    INSERT INTO payout_batches
+        (rate_per_thousand, tax_rate, commission_rate, user_count, total_gross_cents, total_net_cents)
+    VALUES (:r, :t, :c, :n, :g, :net)
+    RETURNING id
+""", r="0", t="0", c="0", n=0, g=0, net=0)
+_INSERT_ITEMS = hot_query("payout.insert_items", """
+    INSERT INTO payout_batch_items
+        (batch_id, user_id, views, gross_cents, tax_cents, referral_cents, net_cents)
+    SELECT :b, * FROM unnest(
+        CAST(:u AS BIGINT[]), CAST(:v AS BIGINT[]), CAST(:g AS BIGINT[]),
+        CAST(:t AS BIGINT[]), CAST(:r AS BIGINT[]), CAST(:n AS BIGINT[])
+    )
+""", b=0, u=[], v=[], g=[], t=[], r=[], n=[])
+def _scaled(rate: Decimal, scale: int) -> int:
+    """Express a decimal rate as an exact integer multiple of 1/scale"""
+    return int((rate * scale).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def _div_round_half_up(numerator: np.ndarray, denominator: int) -> np.ndarray:
+    """Integer division rounding halves up (all inputs are non-negative)"""
+    return (numerator + denominator // 2) // denominator
+
+def compute_payouts(user_ids: np.ndarray, views: np.ndarray, referrer_ids: np.ndarray,
+                    rate_per_thousand: Decimal, tax_rate: Decimal, commission_rate: Decimal) -> Dict[str, np.ndarray]:
+    """Compute gross, tax, referral commission and net in integer cents for all users at once
+
+    user_ids must be sorted; referrer_ids holds 0 for users without a referrer.
+    """
+    rate_micro = _scaled(rate_per_thousand, 1_000_000)  # micro-dollars per 1000 views
+    tax_bp = _scaled(tax_rate, 10_000)                  # basis points
+    commission_bp = _scaled(commission_rate, 10_000)
+
+    # views * $/1000 views in cents = views * rate_micro / (1000 * 10_000)
+    gross = _div_round_half_up(views * rate_micro, 10_000_000)
+    tax = _div_round_half_up(gross * tax_bp, 10_000)
+
+    # Each referee's gross earns their referrer a commission
+    referral = np.zeros_like(gross)
+    if commission_bp:
+        commission = _div_round_half_up(gross * commission_bp, 10_000)
+        positions = np.searchsorted(user_ids, referrer_ids)
+        positions = np.minimum(positions, len(user_ids) - 1)
+        has_referrer = (referrer_ids != 0) & (user_ids[positions] == referrer_ids)
+        np.add.at(referral, positions[has_referrer], commission[has_referrer])
+
+    return {
+        "gross": gross,
+        "tax": tax,
+        "referral": referral,
+        "net": gross - tax + referral,
+    }
+
+class PayoutService:
+    def __init__(self):
+        self.rate_per_thousand = Decimal(os.getenv("PAYOUT_RATE_PER_THOUSAND", "0.025"))
+        self.tax_rate = Decimal(os.getenv("PAYOUT_TAX_RATE", "0.12"))
+
+    async def get_commission_rate(self, session) -> Decimal:
+        """Get referral_commission_rate from config"""
+        result = await session.execute(_COMMISSION_RATE)
+        value = result.scalar()
+        try:
+            return Decimal(value) if value is not None else Decimal(0)
+        except Exception:
+            logger.warning(f"Invalid referral_commission_rate {value!r}, using 0")
+            return Decimal(0)
+
+    async def load_inputs(self):
+        """Stream user_id, total_views and referrer for every user into typed arrays"""
+        user_ids, views, referrer_ids = array("q"), array("q"), array("q")
+
+        async with await get_db_read_session() as session:
+            commission_rate = await self.get_commission_rate(session)
+            result = await session.stream(_INPUTS)
+            async for partition in result.partitions(5000):
+                for user_id, user_views, referrer_id in partition:
+                    user_ids.append(user_id)
+                    views.append(user_views)
+                    referrer_ids.append(referrer_id)
+
+        return (
+            np.frombuffer(user_ids, dtype=np.int64),
+            np.frombuffer(views, dtype=np.int64),
+            np.frombuffer(referrer_ids, dtype=np.int64),
+            commission_rate,
+        )
+
+    async def run_batch(self) -> Dict[str, Any]:
+        """Compute payouts for all users and store them as a new payout batch"""
+        started = time.perf_counter()
+        user_ids, views, referrer_ids, commission_rate = await self.load_inputs()
+
+        if len(user_ids) == 0:
+            return {"batch_id": None, "user_count": 0, "total_gross": 0.0, "total_net": 0.0, "seconds": 0.0}
+
+        payouts = compute_payouts(user_ids, views, referrer_ids,
+                                  self.rate_per_thousand, self.tax_rate, commission_rate)
+        payable = (payouts["gross"] > 0) | (payouts["referral"] > 0)
+
+        total_gross = int(payouts["gross"][payable].sum())
+        total_net = int(payouts["net"][payable].sum())
+
+        async with await get_db_session() as session:
+            batch_id = (await session.execute(
+                _INSERT_BATCH,
+                {
+                    "r": str(self.rate_per_thousand), "t": str(self.tax_rate), "c": str(commission_rate),
+                    "n": int(payable.sum()), "g": total_gross, "net": total_net,
+                }
+            )).scalar()
+
+            # One statement for the whole batch: arrays are unnested server-side
+            await session.execute(
+                _INSERT_ITEMS,
+                {
+                    "b": batch_id,
+                    "u": user_ids[payable].tolist(),
+                    "v": views[payable].tolist(),
+                    "g": payouts["gross"][payable].tolist(),
+                    "t": payouts["tax"][payable].tolist(),
+                    "r": payouts["referral"][payable].tolist(),
+                    "n": payouts["net"][payable].tolist(),
+                }
+            )
+            await session.commit()
+
+        summary = {
+            "batch_id": batch_id,
+            "user_count": int(payable.sum()),
+            "total_gross": total_gross / 100,
+            "total_net": total_net / 100,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        logger.info(f"💸 Payout batch {batch_id}: {summary}")
+        return summary
+
+# Global payout service instance
+payout_service = PayoutService()
+
+def get_payout_service() -> PayoutService:
+    """Get payout service instance"""
+    return payout_service
@@ -0,0 +1,230 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from database.connection import get_db_session, get_db_read_session
+from database.hot_queries import hot_query
+from utils.tasks import get_background_tasks
+
+logger = logging.getLogger(__name__)
+
+# Tables holding a banned user's data, with the key used to delete in batches; users goes last.
+# Raw metrics history goes before the daily rollups so a rollup can't recreate purged days.
+# Kept on purpose: referral_ledger/referral_balances are the append-only record of commission
+# (reconciliation books an adjustment reversing a purged referee's share), and
+# handle_daily_views is per Instagram handle, not per user.
+PURGE_TABLES = [
+    ("reels", "id"),
+    ("allowed_accounts", "id"),
+    ("payment_details", "id"),
+    ("account_requests", "id"),
+    ("referrals", "id"),
+    ("scrape_checkpoints", "task_id"),
+    ("reel_metrics_history", "id"),
+    ("user_daily_views", "day"),
+    ("submission_logs", "id"),
+    ("users", "user_id"),
+]
+
+_BATCH_DELETES = {
+    table: hot_query(f"purge.delete_{table}", f"""
+        DELETE FROM {table} WHERE user_id = :u AND {key} IN (
+            SELECT {key} FROM {table} WHERE user_id = :u LIMIT :n
+        )
+    """, n=500)
+    for table, key in PURGE_TABLES
+}
+_ACTIVE_JOBS = hot_query("purge.active_jobs", """
+    SELECT id, user_id FROM purge_jobs
+    WHERE status IN ('pending', 'running') AND (next_attempt_at IS NULL OR next_attempt_at <= now())
+    ORDER BY id
+""")
+_ENQUEUE = hot_query("purge.enqueue", "INSERT INTO purge_jobs (user_id) VALUES (:u) RETURNING id")
+_CANCEL = hot_query("purge.cancel", """
+    UPDATE purge_jobs SET status = 'cancelled', updated_at = now(), finished_at = now()
+    WHERE user_id = :u AND status IN ('pending', 'running')
+""")
+_LOCK_JOB = hot_query("purge.lock_job", "SELECT status FROM purge_jobs WHERE id = :j FOR UPDATE", j=0)
+_PROGRESS = hot_query("purge.progress", """
+    UPDATE purge_jobs
+    SET status = 'running', current_table = :t,
+        deleted_rows = deleted_rows + :d, updated_at = now()
+    WHERE id = :j
+""", t="reels", d=0, j=0)
+_FINISH = hot_query("purge.finish", """
+    UPDATE purge_jobs
+    SET status = :s, error = :e, current_table = NULL, next_attempt_at = NULL,
+        updated_at = now(), finished_at = now()
+    WHERE id = :j AND status IN ('pending', 'running')
+""", s="done", e=None, j=0)
+# Back to pending with an exponentially growing delay, or failed for good once attempts run out
+_RETRY_OR_FAIL = hot_query("purge.retry_or_fail", """
+    UPDATE purge_jobs SET
+        attempts = attempts + 1,
+        status = CASE WHEN attempts + 1 >= :max THEN 'failed' ELSE 'pending' END,
+        next_attempt_at = CASE WHEN attempts + 1 >= :max THEN NULL
+                          ELSE now() + make_interval(secs => CAST(:base AS DOUBLE PRECISION) * power(2, attempts)) END,
+        finished_at = CASE WHEN attempts + 1 >= :max THEN now() END,
+        error = :e, current_table = NULL, updated_at = now()
+    WHERE id = :j AND status IN ('pending', 'running')
+    RETURNING status, attempts, next_attempt_at
+""", max=5, base=60, e="bench", j=0)
+_RECENT_JOBS = hot_query("purge.recent_jobs", """
+    SELECT id, user_id, status, current_table, deleted_rows, error, attempts, next_attempt_at,
+           created_at, finished_at
+    FROM purge_jobs
+    WHERE CAST(:u AS BIGINT) IS NULL OR user_id = :u
+    ORDER BY id DESC
+    LIMIT :n
+""", n=10)
+
+class PurgeService:
+    """Background deletion of banned users' data in small batches, tracked in purge_jobs"""
+
+    def __init__(self):
+        self.batch_size = int(os.getenv("PURGE_BATCH_SIZE", 500))
+        self.batch_pause = float(os.getenv("PURGE_BATCH_PAUSE_MS", 50)) / 1000
+        self.poll_seconds = float(os.getenv("PURGE_POLL_SECONDS", 60))
+        self.max_attempts = int(os.getenv("PURGE_MAX_ATTEMPTS", 5))
+        self.retry_base_seconds = float(os.getenv("PURGE_RETRY_BASE_SECONDS", 60))
+        self._lock = asyncio.Lock()
+        self._wake_task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def enqueue(self, session, user_id: int) -> int:
+        """Queue a purge for a user inside the caller's transaction; returns the job id"""
+        result = await session.execute(_ENQUEUE, {"u": user_id})
+        return result.scalar()
+
+    async def cancel(self, session, user_id: int):
+        """Stop any unfinished purge for a user (e.g. after an unban)"""
+        await session.execute(_CANCEL, {"u": user_id})
+
+    async def _delete_batch(self, job_id: int, user_id: int, table: str) -> Optional[int]:
+        """Delete one batch and record progress; returns rows deleted, or None if the job was cancelled"""
+        async with await get_db_session() as session:
+            status = (await session.execute(_LOCK_JOB, {"j": job_id})).scalar()
+            if status not in ("pending", "running"):
+                await session.rollback()
+                return None
+
+            result = await session.execute(
+                _BATCH_DELETES[table],
+                {"u": user_id, "n": self.batch_size}
+            )
+            await session.execute(
+                _PROGRESS,
+                {"t": table, "d": result.rowcount, "j": job_id}
+            )
+            await session.commit()
+            return result.rowcount
+
+    async def _finish(self, job_id: int, status: str, error: str = None):
+        async with await get_db_session() as session:
+            await session.execute(
+                _FINISH,
+                {"s": status, "e": error, "j": job_id}
+            )
+            await session.commit()
+
+    async def _retry_or_fail(self, job_id: int, user_id: int, error: str):
+        async with await get_db_session() as session:
+            row = (await session.execute(
+                _RETRY_OR_FAIL,
+                {"max": self.max_attempts, "base": self.retry_base_seconds, "e": error, "j": job_id}
+            )).fetchone()
+            await session.commit()
+
+        if row is None:
+            return
+        if row.status == "failed":
+            logger.error(f"❌ Purge job {job_id} for {user_id} failed after {row.attempts} attempts: {error}")
+        else:
+            logger.warning(f"⚠️ Purge job {job_id} for {user_id} failed (attempt {row.attempts}), "
+                           f"retrying at {row.next_attempt_at:%H:%M:%S}: {error}")
+
+    async def purge_user(self, job_id: int, user_id: int) -> bool:
+        """Delete a user's rows table by table, one short transaction per batch"""
+        deleted = 0
+        try:
+            for table, _ in PURGE_TABLES:
+                while True:
+                    count = await self._delete_batch(job_id, user_id, table)
+                    if count is None:
+                        logger.info(f"🛑 Purge job {job_id} for {user_id} cancelled after {deleted} rows")
+                        return False
+                    deleted += count
+                    if self._stopping:
+                        # Progress is committed per batch; run_pending resumes 'running' jobs on the next start
+                        logger.info(f"⏸️ Purge job {job_id} for {user_id} paused for shutdown after {deleted} rows")
+                        return False
+                    if count < self.batch_size:
+                        break
+                    # Give submissions a chance at the locks between batches
+                    await asyncio.sleep(self.batch_pause)
+
+            await self._finish(job_id, "done")
+            logger.info(f"🧹 Purge job {job_id} for {user_id} finished, {deleted} rows deleted")
+            return True
+
+        except Exception as e:
+            # Deletes are idempotent and progress is committed per batch, so a retry picks up where this stopped
+            await self._retry_or_fail(job_id, user_id, str(e))
+            return False
+
+    async def run_pending(self):
+        """Process queued (and interrupted) purge jobs oldest first"""
+        async with self._lock:
+            async with await get_db_session() as session:
+                jobs = (await session.execute(_ACTIVE_JOBS)).fetchall()
+
+            for job_id, user_id in jobs:
+                if self._stopping:
+                    break
+                await self.purge_user(job_id, user_id)
+
+    async def _run_now(self):
+        try:
+            await self.run_pending()
+        except Exception as e:
+            logger.error(f"❌ Purge run failed: {e}")
+
+    def wake(self):
+        """Start processing queued jobs now instead of waiting for the next poll"""
+        if self._wake_task is None or self._wake_task.done():
+            self._wake_task = asyncio.create_task(self._run_now())
+
+    def start(self):
+        """Schedule the purge job and pick up jobs left over from a previous run"""
+        get_background_tasks().start_periodic("ban_purge", self.poll_seconds, self.run_pending)
+        self.wake()
+
+    async def stop(self, timeout: float):
+        """Pause after the current batch so shutdown doesn't cut a purge mid-transaction"""
+        self._stopping = True
+        if self._wake_task is not None and not self._wake_task.done():
+            try:
+                await asyncio.wait_for(self._wake_task, timeout)
+            except asyncio.TimeoutError:
+                logger.warning("⏱️ Purge run still busy at shutdown, cancelled")
+
+    async def get_jobs(self, user_id: int = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get recent purge jobs with their progress, optionally for one user"""
+        try:
+            async with await get_db_read_session() as session:
+                result = await session.execute(
+                    _RECENT_JOBS,
+                    {"u": user_id, "n": limit}
+                )
+                return [dict(row._mapping) for row in result.fetchall()]
+
+        except Exception as e:
+            logger.error(f"Error getting purge jobs: {e}")
+            return []
+
+# Global purge service instance
+purge_service = PurgeService()
+
+def get_purge_service() -> PurgeService:
+    """Get purge service instance"""
+    return purge_service
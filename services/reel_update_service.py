@@ -0,0 +1,165 @@
+import os
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List
+from database.connection import get_db_session, get_db_read_session, mark_user_write
+from database.hot_queries import hot_query
+from services.leaderboard_service import get_leaderboard_service
+from services.metrics_service import get_metrics_service
+from utils.validators import extract_shortcode_from_url
+
+logger = logging.getLogger(__name__)
+
+_NEXT_REELS = hot_query("reel_update.next_reels", """
+    SELECT r.id, r.shortcode, r.url FROM reels r
+    WHERE r.id > :after
+      AND NOT EXISTS (SELECT 1 FROM banned_users b WHERE b.user_id = r.user_id)
+    ORDER BY r.id
+    LIMIT :n
+""", after=0, n=100)
+_UPDATE_REELS = hot_query("reel_update.apply", """
+    WITH scraped AS (
+        SELECT s, v, l, c FROM unnest(
+            CAST(:s AS VARCHAR[]), CAST(:v AS BIGINT[]), CAST(:l AS BIGINT[]), CAST(:c AS BIGINT[])
+        ) AS batch (s, v, l, c)
+    ),
+    old AS (
+        SELECT r.id, COALESCE(r.views, 0) AS views, COALESCE(r.likes, 0) AS likes,
+               COALESCE(r.comments, 0) AS comments
+        FROM reels r JOIN scraped ON scraped.s = r.shortcode
+        FOR UPDATE OF r
+    )
+    UPDATE reels r SET views = scraped.v, likes = scraped.l, comments = scraped.c, last_updated = now()
+    FROM old, scraped
+    WHERE r.id = old.id AND r.shortcode = scraped.s
+      AND (old.views, old.likes, old.comments) IS DISTINCT FROM (scraped.v, scraped.l, scraped.c)
+    RETURNING r.user_id, r.shortcode, r.username, scraped.v, scraped.l, scraped.c,
+              old.views AS old_views, old.likes AS old_likes, old.comments AS old_comments
+""", s=["bench"], v=[0], l=[0], c=[0])
+_ADD_USER_VIEWS = hot_query("reel_update.user_views", """
+    UPDATE users u SET total_views = COALESCE(u.total_views, 0) + batch.d
+    FROM unnest(CAST(:u AS BIGINT[]), CAST(:d AS BIGINT[])) AS batch (user_id, d)
+    WHERE u.user_id = batch.user_id
+""", u=[0], d=[0])
+_LOG_RUN = hot_query("reel_update.log_run", """
+    INSERT INTO force_update_logs (total_reels, successful_updates, created_at)
+    VALUES (:t, :s, now())
+""", t=0, s=0)
+
+class ReelUpdateService:
+    """Rescrape tracked reels and apply their view changes to users, leaderboard, referrals and metrics"""
+
+    def __init__(self):
+        self.scrape_batch = int(os.getenv("REEL_UPDATE_BATCH", 100))
+        self._lock = asyncio.Lock()
+
+    async def _scrape(self, reels: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+        """Current counts of a batch of reels keyed by shortcode (reels that failed are left out)"""
+        from apify_client import get_apify_client
+
+        client = get_apify_client()
+        urls = [reel["url"] or f"https://www.instagram.com/reel/{reel['shortcode']}/" for reel in reels]
+        task_id = await client.create_scraping_task(urls, "batch")
+        result = await client.get_task_results(task_id, wait=True)
+
+        # Keyed by shortcode: one statement can't update the same reel twice
+        scraped = {}
+        for item in result.get("results", []):
+            shortcode = extract_shortcode_from_url(item.get("url"))
+            if item.get("success", False) and shortcode:
+                scraped[shortcode] = {
+                    "views": item.get("views") or 0,
+                    "likes": item.get("likes") or 0,
+                    "comments": item.get("comments") or 0,
+                }
+        return scraped
+
+    async def _apply(self, scraped: Dict[str, Dict[str, int]]) -> int:
+        """Write a batch of new counts and propagate the view deltas in one transaction; returns reels changed"""
+        async with await get_db_session() as session:
+            changed = (await session.execute(
+                _UPDATE_REELS,
+                {
+                    "s": list(scraped),
+                    "v": [counts["views"] for counts in scraped.values()],
+                    "l": [counts["likes"] for counts in scraped.values()],
+                    "c": [counts["comments"] for counts in scraped.values()],
+                }
+            )).fetchall()
+            if not changed:
+                return 0
+
+            deltas = defaultdict(int)
+            for row in changed:
+                deltas[row.user_id] += row.v - row.old_views
+            deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+
+            if deltas:
+                await session.execute(_ADD_USER_VIEWS, {"u": list(deltas), "d": list(deltas.values())})
+                for user_id, delta in deltas.items():
+                    # Also accrues the referrer's commission on the delta
+                    await get_leaderboard_service().apply_view_delta(user_id, delta, session=session)
+
+            await get_metrics_service().record_samples(session, [
+                {
+                    "user_id": row.user_id,
+                    "shortcode": row.shortcode,
+                    "insta_handle": row.username,
+                    "views": row.v,
+                    "likes": row.l,
+                    "comments": row.c,
+                    "old_views": row.old_views,
+                    "old_likes": row.old_likes,
+                    "old_comments": row.old_comments,
+                }
+                for row in changed
+            ])
+            await session.commit()
+
+        for user_id in deltas:
+            mark_user_write(user_id)
+        return len(changed)
+
+    async def update_all(self) -> Dict[str, Any]:
+        """Rescrape every reel of non-banned users in batches and apply the changes"""
+        async with self._lock:
+            started = time.perf_counter()
+            stats = {"reels": 0, "scraped": 0, "changed": 0, "failed_batches": 0}
+            after = 0
+
+            while True:
+                async with await get_db_read_session() as session:
+                    reels = [
+                        dict(row._mapping)
+                        for row in (await session.execute(_NEXT_REELS, {"after": after, "n": self.scrape_batch})).fetchall()
+                    ]
+                if not reels:
+                    break
+                after = reels[-1]["id"]
+                stats["reels"] += len(reels)
+
+                try:
+                    scraped = await self._scrape(reels)
+                    stats["scraped"] += len(scraped)
+                    if scraped:
+                        stats["changed"] += await self._apply(scraped)
+                except Exception as e:
+                    logger.error(f"❌ Reel update failed for reels {reels[0]['id']}-{after}: {e}")
+                    stats["failed_batches"] += 1
+
+            async with await get_db_session() as session:
+                await session.execute(_LOG_RUN, {"t": stats["reels"], "s": stats["scraped"]})
+                await session.commit()
+
+            stats["seconds"] = round(time.perf_counter() - started, 2)
+            logger.info(f"🔄 Reel update: {stats}")
+            return stats
+
+# Global reel update service instance
+reel_update_service = ReelUpdateService()
+
+def get_reel_update_service() -> ReelUpdateService:
+    """Get reel update service instance"""
+    return reel_update_service
@@ -0,0 +1,233 @@
+import os
+import time
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Optional
+from database.connection import get_db_session, get_db_read_session
+from database.hot_queries import hot_query
+from utils.tasks import get_background_tasks
+
+logger = logging.getLogger(__name__)
+
+# referral_commission_rate as a number (0 when missing or malformed, so accrual never fails a submit)
+_COMMISSION_RATE = """
+    COALESCE((
+        SELECT CASE WHEN value ~ '^[0-9]*[.]?[0-9]+$' THEN CAST(value AS NUMERIC) ELSE 0 END
+        FROM config WHERE key = 'referral_commission_rate'
+    ), 0)
+"""
+
+_ACCRUE = hot_query("referral.accrue", f"""
+    WITH entry AS (
+        INSERT INTO referral_ledger (referrer_id, referee_id, views_delta, commission)
+        SELECT r.referrer_id, r.user_id, CAST(:d AS BIGINT), CAST(:d AS BIGINT) * CAST(:cpv AS NUMERIC) * {_COMMISSION_RATE}
+        FROM referrals r
+        WHERE r.user_id = :u
+        RETURNING referrer_id, views_delta, commission
+    )
+    INSERT INTO referral_balances (referrer_id, referred_views, commission, updated_at)
+    SELECT referrer_id, views_delta, commission, now() FROM entry
+    ON CONFLICT (referrer_id) DO UPDATE SET
+        referred_views = referral_balances.referred_views + EXCLUDED.referred_views,
+        commission = referral_balances.commission + EXCLUDED.commission,
+        updated_at = EXCLUDED.updated_at
+""", d=1, cpv="0.0025")
+_BALANCE = hot_query(
+    "referral.balance",
+    "SELECT referred_views, commission, updated_at FROM referral_balances WHERE referrer_id = :r",
+    r=0,
+)
+_NEXT_REFERRERS = hot_query("referral.next_referrers", """
+    SELECT referrer_id FROM (
+        SELECT referrer_id FROM referrals WHERE referrer_id > :after
+        UNION
+        SELECT referrer_id FROM referral_balances WHERE referrer_id > :after
+    ) referrers
+    ORDER BY referrer_id
+    LIMIT :n
+""", after=0, n=500)
+# Referrals made outside the bot have no baseline yet: everything the ledger doesn't hold predates them.
+# Accruals add the same amount to total_views and the ledger, so this is stable under concurrent ones
+_SET_BASELINES = hot_query("referral.set_baselines", """
+    UPDATE referrals r SET baseline_views = COALESCE(u.total_views, 0) - COALESCE((
+        SELECT SUM(l.views_delta) FROM referral_ledger l
+        WHERE l.referrer_id = r.referrer_id AND l.referee_id = r.user_id
+    ), 0)
+    FROM users u
+    WHERE u.user_id = r.user_id AND r.baseline_views IS NULL
+      AND r.referrer_id = ANY(CAST(:r AS BIGINT[]))
+""", r=[0])
+# One statement per batch of referrers, so the referees' views, the ledger and the balances are read from
+# one snapshot. Balances are corrected by the difference to that snapshot rather than overwritten, so an
+# accrual committed meanwhile keeps its increment and no lock is needed
+_RECONCILE = hot_query("referral.reconcile", f"""
+    WITH batch AS (
+        SELECT unnest(CAST(:r AS BIGINT[])) AS referrer_id
+    ),
+    expected AS (
+        SELECT r.referrer_id, r.user_id AS referee_id,
+               COALESCE(u.total_views, 0) - COALESCE(r.baseline_views, 0) AS views
+        FROM referrals r
+        JOIN batch b ON b.referrer_id = r.referrer_id
+        JOIN users u ON u.user_id = r.user_id
+    ),
+    recorded AS (
+        SELECT l.referrer_id, l.referee_id, SUM(l.views_delta) AS views, SUM(l.commission) AS commission
+        FROM referral_ledger l
+        JOIN batch b ON b.referrer_id = l.referrer_id
+        GROUP BY l.referrer_id, l.referee_id
+    ),
+    drift AS (
+        SELECT COALESCE(e.referrer_id, l.referrer_id) AS referrer_id,
+               COALESCE(e.referee_id, l.referee_id) AS referee_id,
+               COALESCE(e.views, 0) - COALESCE(l.views, 0) AS views
+        FROM expected e
+        FULL JOIN recorded l ON l.referrer_id = e.referrer_id AND l.referee_id = e.referee_id
+    ),
+    adjusted AS (
+        INSERT INTO referral_ledger (referrer_id, referee_id, views_delta, commission, kind)
+        SELECT referrer_id, referee_id, views, views * CAST(:cpv AS NUMERIC) * {_COMMISSION_RATE},
+               'adjustment'
+        FROM drift
+        WHERE views <> 0
+        RETURNING referrer_id, views_delta, commission
+    ),
+    totals AS (
+        SELECT b.referrer_id, COALESCE(SUM(t.views), 0) AS views, COALESCE(SUM(t.commission), 0) AS commission
+        FROM batch b
+        LEFT JOIN (
+            SELECT referrer_id, views, commission FROM recorded
+            UNION ALL
+            SELECT referrer_id, views_delta, commission FROM adjusted
+        ) t ON t.referrer_id = b.referrer_id
+        GROUP BY b.referrer_id
+    ),
+    corrections AS (
+        SELECT t.referrer_id, t.views - COALESCE(rb.referred_views, 0) AS views,
+               t.commission - COALESCE(rb.commission, 0) AS commission
+        FROM totals t
+        LEFT JOIN referral_balances rb ON rb.referrer_id = t.referrer_id
+        WHERE (t.views, t.commission) IS DISTINCT FROM (COALESCE(rb.referred_views, 0), COALESCE(rb.commission, 0))
+    ),
+    rewritten AS (
+        INSERT INTO referral_balances (referrer_id, referred_views, commission, updated_at)
+        SELECT referrer_id, views, commission, now() FROM corrections
+        -- Same lock order as other batches
+        ORDER BY referrer_id
+        ON CONFLICT (referrer_id) DO UPDATE SET
+            referred_views = referral_balances.referred_views + EXCLUDED.referred_views,
+            commission = referral_balances.commission + EXCLUDED.commission,
+            updated_at = EXCLUDED.updated_at
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM adjusted), (SELECT COUNT(DISTINCT referrer_id) FROM adjusted),
+           (SELECT COALESCE(SUM(ABS(views_delta)), 0) FROM adjusted),
+           (SELECT COALESCE(SUM(commission), 0) FROM adjusted),
+           (SELECT COUNT(*) FROM rewritten)
+""", r=[0], cpv="0.0025")
+
+class ReferralService:
+    """Referral commission ledger accrued with every view delta, with per-referrer running balances
+
+    Amounts are exact NUMERIC cents; rounding happens only when a balance is shown.
+    """
+
+    def __init__(self):
+        # Commission is a share of the referee's gross: views * PAYOUT_RATE_PER_THOUSAND / 1000 dollars
+        self.cents_per_view = Decimal(os.getenv("PAYOUT_RATE_PER_THOUSAND", "0.025")) / 10
+        self.reconcile_seconds = float(os.getenv("REFERRAL_RECONCILE_SECONDS", 86400))
+        self.reconcile_adjust = os.getenv("REFERRAL_RECONCILE_ADJUST", "true").lower() == "true"
+        self.reconcile_batch = int(os.getenv("REFERRAL_RECONCILE_BATCH", 500))
+
+    async def accrue(self, session, user_id: int, delta: int):
+        """Credit a referee's view delta to their referrer inside the caller's transaction"""
+        if not delta:
+            return
+        # No-op (one unique-index probe on referrals) for users without a referrer
+        await session.execute(
+            _ACCRUE,
+            {"u": user_id, "d": delta, "cpv": str(self.cents_per_view)}
+        )
+
+    async def get_balance(self, referrer_id: int, session=None) -> Optional[Dict[str, Any]]:
+        """Referred views and accrued commission of a referrer (None if they never earned any)"""
+        query = _BALANCE
+        try:
+            if session is not None:
+                row = (await session.execute(query, {"r": referrer_id})).fetchone()
+            else:
+                async with await get_db_read_session(referrer_id) as own_session:
+                    row = (await own_session.execute(query, {"r": referrer_id})).fetchone()
+
+            if not row:
+                return None
+            return {
+                "referred_views": row[0],
+                "commission_cents": row[1],
+                "commission": float(row[1] / 100),
+                "updated_at": row[2],
+            }
+
+        except Exception as e:
+            logger.error(f"Error getting referral balance for {referrer_id}: {e}")
+            return None
+
+    async def reconcile(self) -> Dict[str, Any]:
+        """Compare the ledger with referees' views since their referral, and balances with the ledger, a batch
+        of referrers at a time; report (and fix) drift"""
+        started = time.perf_counter()
+        pairs = referrers = views = balances = 0
+        commission = Decimal(0)
+        after = 0
+
+        while True:
+            async with await get_db_session() as session:
+                batch = [
+                    row[0]
+                    for row in (await session.execute(
+                        _NEXT_REFERRERS, {"after": after, "n": self.reconcile_batch}
+                    )).fetchall()
+                ]
+                if not batch:
+                    break
+                after = batch[-1]
+
+                await session.execute(_SET_BASELINES, {"r": batch})
+                row = (await session.execute(
+                    _RECONCILE, {"r": batch, "cpv": str(self.cents_per_view)}
+                )).fetchone()
+
+                if self.reconcile_adjust:
+                    await session.commit()
+                else:
+                    await session.rollback()
+
+            pairs, referrers, views, balances = pairs + row[0], referrers + row[1], views + row[2], balances + row[4]
+            commission += row[3]
+
+        stats = {
+            "drifted_pairs": pairs,
+            "drifted_referrers": referrers,
+            "views_drift": int(views),
+            "commission_drift": float(commission / 100),
+            # Includes referrers whose balance only moved because of this run's adjustments
+            "balances_rewritten": balances,
+            "adjusted": self.reconcile_adjust,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+        if pairs or balances:
+            logger.warning(f"⚠️ Referral ledger drift: {stats}")
+        else:
+            logger.info(f"✅ Referral ledger reconciled, no drift ({stats['seconds']}s)")
+        return stats
+
+    def start(self):
+        """Schedule the periodic reconciliation"""
+        get_background_tasks().start_periodic("referral_reconcile", self.reconcile_seconds, self.reconcile)
+
+# Global referral service instance
+referral_service = ReferralService()
+
+def get_referral_service() -> ReferralService:
+    """Get referral service instance"""
+    return referral_service
@@ -0,0 +1,140 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from database.connection import get_db_session, get_db_read_session
+from database.hot_queries import hot_query
+from utils.tasks import get_background_tasks
+
+logger = logging.getLogger(__name__)
+
+_SLOT_HANDLES = hot_query("slot.handles", """
+    SELECT insta_handle, array_agg(DISTINCT slot_number)
+    FROM slot_accounts
+    GROUP BY insta_handle
+    ORDER BY insta_handle
+""")
+_UPSERT = hot_query("slot.upsert", """
+    WITH upserted AS (
+        INSERT INTO slot_submissions (slot_number, shortcode, insta_handle, view_count, submitted_at)
+        SELECT n, s, h, v, now() FROM unnest(
+            CAST(:n AS INTEGER[]), CAST(:s AS VARCHAR[]), CAST(:h AS VARCHAR[]), CAST(:v AS BIGINT[])
+        ) AS batch (n, s, h, v)
+        ON CONFLICT (slot_number, shortcode) DO UPDATE SET view_count = EXCLUDED.view_count
+        WHERE slot_submissions.view_count IS DISTINCT FROM EXCLUDED.view_count
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted
+""", n=[1], s=["bench"], h=["bench"], v=[0])
+_TOTALS = hot_query("slot.totals", """
+    SELECT slot_number,
+           COUNT(*) AS reels,
+           COUNT(DISTINCT insta_handle) AS accounts,
+           COALESCE(SUM(view_count), 0) AS total_views,
+           MAX(submitted_at) AS last_new_reel
+    FROM slot_submissions
+    WHERE CAST(:slot AS INTEGER) IS NULL OR slot_number = :slot
+    GROUP BY slot_number
+    ORDER BY slot_number
+""", slot=None)
+
+class SlotService:
+    """Scheduled rescrape of every slot account's reels into slot_submissions"""
+
+    def __init__(self):
+        self.refresh_seconds = float(os.getenv("SLOT_REFRESH_SECONDS", 3600))
+        self.scrape_batch = int(os.getenv("SLOT_SCRAPE_BATCH", 50))
+        self.reels_per_handle = int(os.getenv("SLOT_REELS_PER_HANDLE", 50))
+        self._lock = asyncio.Lock()
+
+    async def _slot_handles(self) -> Dict[str, List[int]]:
+        """Slots each handle belongs to (a handle can be in several slots)"""
+        async with await get_db_read_session() as session:
+            result = await session.execute(_SLOT_HANDLES)
+            return {handle: list(slots) for handle, slots in result.fetchall()}
+
+    async def _upsert(self, rows: Dict[tuple, Dict[str, Any]]) -> Dict[str, int]:
+        """Insert new slot reels and refresh view counts of known ones in one statement"""
+        async with await get_db_session() as session:
+            # Unchanged view counts are skipped so a rescrape doesn't rewrite every row
+            counts = (await session.execute(
+                _UPSERT,
+                {
+                    "n": [row["slot_number"] for row in rows.values()],
+                    "s": [row["shortcode"] for row in rows.values()],
+                    "h": [row["insta_handle"] for row in rows.values()],
+                    "v": [row["view_count"] for row in rows.values()],
+                }
+            )).fetchone()
+            await session.commit()
+            return {"new": counts[0], "updated": counts[1]}
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Rescrape all slot accounts in batches and upsert their reels"""
+        from apify_client import get_apify_client
+
+        async with self._lock:
+            started = time.perf_counter()
+            handles = await self._slot_handles()
+            names = list(handles)
+            stats = {"handles": len(names), "reels": 0, "new": 0, "updated": 0, "failed_batches": 0}
+
+            for i in range(0, len(names), self.scrape_batch):
+                batch = names[i:i + self.scrape_batch]
+                try:
+                    reels = await get_apify_client().get_profile_reels(batch, self.reels_per_handle)
+                except Exception as e:
+                    logger.error(f"❌ Slot scrape failed for {len(batch)} handles: {e}")
+                    stats["failed_batches"] += 1
+                    continue
+
+                # Keyed by the conflict target: one statement can't update the same row twice
+                rows = {}
+                for handle, items in reels.items():
+                    for item in items:
+                        stats["reels"] += 1
+                        for slot_number in handles.get(handle, []):
+                            rows[(slot_number, item["shortcode"])] = {
+                                "slot_number": slot_number,
+                                "shortcode": item["shortcode"],
+                                "insta_handle": handle,
+                                "view_count": item.get("view_count") or 0,
+                            }
+                if not rows:
+                    continue
+
+                try:
+                    counts = await self._upsert(rows)
+                except Exception as e:
+                    logger.error(f"❌ Slot upsert failed for {len(batch)} handles: {e}")
+                    stats["failed_batches"] += 1
+                    continue
+                stats["new"] += counts["new"]
+                stats["updated"] += counts["updated"]
+
+            stats["seconds"] = round(time.perf_counter() - started, 2)
+            logger.info(f"🎰 Slot refresh: {stats}")
+            return stats
+
+    def start(self):
+        """Schedule the periodic slot refresh"""
+        get_background_tasks().start_periodic("slot_refresh", self.refresh_seconds, self.refresh)
+
+    async def get_totals(self, slot_number: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Reels, accounts and views per slot from a single aggregate"""
+        try:
+            async with await get_db_read_session() as session:
+                result = await session.execute(_TOTALS, {"slot": slot_number})
+                return [dict(row._mapping) for row in result.fetchall()]
+
+        except Exception as e:
+            logger.error(f"Error getting slot totals: {e}")
+            return []
+
+# Global slot service instance
+slot_service = SlotService()
+
+def get_slot_service() -> SlotService:
+    """Get slot service instance"""
+    return slot_service
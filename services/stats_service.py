@@ -0,0 +1,126 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+from database.connection import get_db_read_session
+from database.hot_queries import hot_query
+
+logger = logging.getLogger(__name__)
+
+# Whole-table aggregates by design; they run at most once per snapshot TTL
+_USER_TOTALS = hot_query("stats.user_totals", """
+    SELECT COUNT(*),
+           COUNT(*) FILTER (WHERE approved),
+           COUNT(*) FILTER (WHERE NOT approved OR approved IS NULL),
+           COALESCE(SUM(total_views), 0),
+           percentile_cont(0.5) WITHIN GROUP (ORDER BY total_views) FILTER (WHERE total_views > 0),
+           percentile_cont(0.9) WITHIN GROUP (ORDER BY total_views) FILTER (WHERE total_views > 0),
+           percentile_cont(0.99) WITHIN GROUP (ORDER BY total_views) FILTER (WHERE total_views > 0),
+           MAX(total_views)
+    FROM users
+""")
+_REEL_TOTALS = hot_query("stats.reel_totals", "SELECT COUNT(*), COALESCE(SUM(views), 0), COUNT(DISTINCT user_id) FROM reels")
+_TOP_ACCOUNTS = hot_query("stats.top_accounts", """
+    SELECT username, COUNT(*) AS reels, COALESCE(SUM(views), 0) AS views
+    FROM reels
+    WHERE username IS NOT NULL AND username <> ''
+    GROUP BY username
+    ORDER BY views DESC
+    LIMIT :n
+""", n=10)
+_PENDING_REQUESTS = hot_query("stats.pending_requests", "SELECT COUNT(*) FROM account_requests WHERE status = 'pending'")
+_REELS_PER_DAY = hot_query("stats.reels_per_day", """
+    SELECT CAST(submitted_at AS DATE) AS day, COUNT(*)
+    FROM reels
+    WHERE submitted_at >= CURRENT_DATE - make_interval(days => :d)
+    GROUP BY day
+    ORDER BY day
+""", d=14)
+
+class StatsService:
+    """Admin statistics aggregated in SQL and served from a short-lived snapshot"""
+
+    def __init__(self):
+        self.ttl_seconds = float(os.getenv("STATS_CACHE_SECONDS", 60))
+        self.reels_per_day_window = int(os.getenv("STATS_REELS_PER_DAY_WINDOW", 14))
+        self.top_accounts_limit = int(os.getenv("STATS_TOP_ACCOUNTS", 10))
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._computed_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def compute_snapshot(self) -> Dict[str, Any]:
+        """Run the aggregate queries (on the replica when configured)"""
+        async with await get_db_read_session() as session:
+            users = (await session.execute(_USER_TOTALS)).fetchone()
+            reels = (await session.execute(_REEL_TOTALS)).fetchone()
+
+            pending_requests = (await session.execute(_PENDING_REQUESTS)).scalar() or 0
+
+            per_day = (await session.execute(
+                _REELS_PER_DAY,
+                {"d": self.reels_per_day_window}
+            )).fetchall()
+
+            top_accounts = (await session.execute(_TOP_ACCOUNTS, {"n": self.top_accounts_limit})).fetchall()
+
+        return {
+            "users": {
+                "total": users[0],
+                "approved": users[1],
+                "pending": users[2],
+                "total_views": int(users[3]),
+            },
+            "views_percentiles": {
+                "p50": int(users[4] or 0),
+                "p90": int(users[5] or 0),
+                "p99": int(users[6] or 0),
+                "max": int(users[7] or 0),
+            },
+            "reels": {
+                "total": reels[0],
+                "total_views": int(reels[1]),
+                "submitters": reels[2],
+            },
+            "pending_account_requests": pending_requests,
+            "reels_per_day": [(row[0], row[1]) for row in per_day],
+            "top_accounts": [
+                {"username": row[0], "reels": row[1], "views": int(row[2])} for row in top_accounts
+            ],
+            "computed_at": datetime.now(),
+        }
+
+    async def refresh(self) -> Dict[str, Any]:
+        """Recompute the snapshot (concurrent callers share one computation)"""
+        async with self._lock:
+            if self._snapshot is not None and time.monotonic() - self._computed_at < self.ttl_seconds:
+                return self._snapshot
+            self._snapshot = await self.compute_snapshot()
+            self._computed_at = time.monotonic()
+            return self._snapshot
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error(f"Error refreshing stats snapshot: {e}")
+
+    async def get_snapshot(self) -> Dict[str, Any]:
+        """Get the stats snapshot, serving a stale one while it refreshes in the background"""
+        if self._snapshot is None:
+            return await self.refresh()
+
+        if time.monotonic() - self._computed_at >= self.ttl_seconds:
+            if self._refresh_task is None or self._refresh_task.done():
+                self._refresh_task = asyncio.create_task(self._background_refresh())
+
+        return self._snapshot
+
+# Global stats service instance
+stats_service = StatsService()
+
+def get_stats_service() -> StatsService:
+    """Get stats service instance"""
+    return stats_service
@@ -1,32 +1,77 @@
-from sqlalchemy import text
-from database.connection import get_db_session
+from sqlalchemy import event
+from database.connection import get_db_session, get_db_read_session, mark_user_write
+from database.hot_queries import hot_query
+from services.leaderboard_service import get_leaderboard_service
+from services.purge_service import get_purge_service
+from utils.tasks import get_background_tasks
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Set
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+_GET_USER = hot_query("user.get_user", """
+    SELECT user_id, username, approved, total_views, total_reels,
+           max_slots, used_slots, last_submission, created_at
+    FROM users WHERE user_id = :u
+""")
+_IS_BANNED = hot_query("user.is_banned", "SELECT 1 FROM banned_users WHERE user_id = :u")
+_USER_EXISTS = hot_query("user.exists", "SELECT 1 FROM users WHERE user_id = :u")
+_CREATE_USER = hot_query("user.create", """
+    INSERT INTO users (user_id, username, approved, total_views, total_reels, max_slots, used_slots)
+    VALUES (:u, :n, :a, :v, :r, :m, :s)
+""", u=-1, n="bench", a=False, r=0, m=50, s=0)
+# NULL leaves a column unchanged, so one statement serves every combination of updated stats
+_UPDATE_STATS = hot_query("user.update_stats", """
+    UPDATE users SET
+        total_views = COALESCE(CAST(:tv AS BIGINT), total_views),
+        total_reels = COALESCE(CAST(:tr AS INTEGER), total_reels),
+        used_slots = COALESCE(CAST(:us AS INTEGER), used_slots),
+        last_submission = :ls
+    WHERE user_id = :u
+""", tv=None, tr=1, us=None, ls=datetime(2024, 1, 1))
+_APPROVE = hot_query("user.approve", "UPDATE users SET approved = TRUE WHERE user_id = :u")
+_BAN = hot_query("user.ban", "INSERT INTO banned_users (user_id) VALUES (:u) ON CONFLICT (user_id) DO NOTHING")
+_UNBAN = hot_query("user.unban", "DELETE FROM banned_users WHERE user_id = :u")
+_ALL_BANS = hot_query("user.all_bans", "SELECT user_id FROM banned_users")
+_SUBMISSION_LOGS = hot_query("user.submission_logs", """
+    SELECT shortcode, views, old_views, insta_handle, action, created_at
+    FROM submission_logs
+    WHERE user_id = :u AND created_at >= :since AND created_at < :until
+    ORDER BY created_at DESC
+    LIMIT :n
+""", n=100)
+
 class UserService:
     
+    def __init__(self):
+        # Banned user ids, kept current by ban_user/unban_user and reloaded periodically to pick up
+        # bans made elsewhere (another instance, the database directly)
+        self._banned: Optional[Set[int]] = None
+        # Bans/unbans made while a reload is running, applied on top of its (possibly older) result
+        self._changes_during_load: Optional[Dict[int, bool]] = None
+        self.ban_refresh_seconds = float(os.getenv("BAN_REFRESH_SECONDS", 300))
+    
+    def _remember_ban(self, user_id: int, banned: bool):
+        if self._banned is not None:
+            (self._banned.add if banned else self._banned.discard)(user_id)
+        if self._changes_during_load is not None:
+            self._changes_during_load[user_id] = banned
+    
     async def create_user(self, user_id: int, username: str = None) -> bool:
         """Create new user if doesn't exist"""
         try:
             async with await get_db_session() as session:
                 # Check if user exists
-                existing = await session.execute(
-                    text("SELECT 1 FROM users WHERE user_id = :u"),
-                    {"u": user_id}
-                )
+                existing = await session.execute(_USER_EXISTS, {"u": user_id})
                 
                 if existing.scalar():
                     return False
                 
                 # Create user
                 await session.execute(
-                    text("""
-                        INSERT INTO users (user_id, username, approved, total_views, total_reels, max_slots, used_slots)
-                        VALUES (:u, :n, :a, :v, :r, :m, :s)
-                    """),
+                    _CREATE_USER,
                     {
                         "u": user_id, 
                         "n": username, 
@@ -38,6 +83,7 @@ class UserService:
                     }
                 )
                 await session.commit()
+                mark_user_write(user_id)
                 return True
                 
         except Exception as e:
@@ -47,15 +93,8 @@ class UserService:
     async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user data"""
         try:
-            async with await get_db_session() as session:
-                result = await session.execute(
-                    text("""
-                        SELECT user_id, username, approved, total_views, total_reels, 
-                               max_slots, used_slots, last_submission, created_at
-                        FROM users WHERE user_id = :u
-                    """),
-                    {"u": user_id}
-                )
+            async with await get_db_read_session(user_id) as session:
+                result = await session.execute(_GET_USER, {"u": user_id})
                 row = result.fetchone()
                 
                 if not row:
@@ -78,50 +117,39 @@ class UserService:
             return None
     
     async def update_user_stats(self, user_id: int, total_views: int = None, 
-                               total_reels: int = None, used_slots: int = None) -> bool:
-        """Update user statistics"""
+                               total_reels: int = None, used_slots: int = None, session=None) -> bool:
+        """Update user statistics (inside session's transaction if given)"""
+        if total_views is None and total_reels is None and used_slots is None:
+            return False
+        
+        query = _UPDATE_STATS
+        params = {"u": user_id, "tv": total_views, "tr": total_reels, "us": used_slots, "ls": datetime.now()}
+        
         try:
-            async with await get_db_session() as session:
-                updates = []
-                params = {"u": user_id}
-                
-                if total_views is not None:
-                    updates.append("total_views = :tv")
-                    params["tv"] = total_views
-                
-                if total_reels is not None:
-                    updates.append("total_reels = :tr")
-                    params["tr"] = total_reels
-                
-                if used_slots is not None:
-                    updates.append("used_slots = :us")
-                    params["us"] = used_slots
-                
-                if not updates:
-                    return False
-                
-                updates.append("last_submission = :ls")
-                params["ls"] = datetime.now()
-                
-                query = f"UPDATE users SET {', '.join(updates)} WHERE user_id = :u"
-                
-                await session.execute(text(query), params)
-                await session.commit()
+            if session is not None:
+                await session.execute(query, params)
+                event.listen(session.sync_session, "after_commit", lambda *args: mark_user_write(user_id), once=True)
+                return True
+            
+            async with await get_db_session() as own_session:
+                await own_session.execute(query, params)
+                await own_session.commit()
+                mark_user_write(user_id)
                 return True
                 
         except Exception as e:
             logger.error(f"Error updating user stats {user_id}: {e}")
+            if session is not None:
+                raise
             return False
     
     async def approve_user(self, user_id: int) -> bool:
         """Approve user account"""
         try:
             async with await get_db_session() as session:
-                await session.execute(
-                    text("UPDATE users SET approved = TRUE WHERE user_id = :u"),
-                    {"u": user_id}
-                )
+                await session.execute(_APPROVE, {"u": user_id})
                 await session.commit()
+                mark_user_write(user_id)
                 return True
                 
         except Exception as e:
@@ -129,47 +157,97 @@ class UserService:
             return False
     
     async def ban_user(self, user_id: int) -> bool:
-        """Ban user and delete their data"""
+        """Ban user immediately and queue a background purge of their data"""
         try:
             async with await get_db_session() as session:
-                # Add to banned users
-                await session.execute(
-                    text("INSERT INTO banned_users (user_id) VALUES (:u) ON CONFLICT (user_id) DO NOTHING"),
-                    {"u": user_id}
-                )
-                
-                # Delete user data
-                tables_to_clean = [
-                    "reels", "allowed_accounts", "payment_details", 
-                    "account_requests", "referrals", "users"
-                ]
-                
-                for table in tables_to_clean:
-                    await session.execute(
-                        text(f"DELETE FROM {table} WHERE user_id = :u"),
-                        {"u": user_id}
-                    )
-                
+                result = await session.execute(_BAN, {"u": user_id})
+                # Banning again must not queue another purge of the same user
+                job_id = await get_purge_service().enqueue(session, user_id) if result.rowcount else None
                 await session.commit()
+            
+            self._remember_ban(user_id, True)
+            mark_user_write(user_id)
+            
+            if job_id is None:
+                logger.info(f"🚫 {user_id} was already banned")
                 return True
+            
+            # Single-row delete so the user drops off the leaderboard right away
+            await get_leaderboard_service().remove_user(user_id)
+            get_purge_service().wake()
+            logger.info(f"🚫 Banned {user_id}, purge job {job_id} queued")
+            return True
                 
         except Exception as e:
             logger.error(f"Error banning user {user_id}: {e}")
             return False
     
+    async def unban_user(self, user_id: int) -> bool:
+        """Lift a ban and stop any purge still in progress"""
+        try:
+            async with await get_db_session() as session:
+                result = await session.execute(_UNBAN, {"u": user_id})
+                await get_purge_service().cancel(session, user_id)
+                await session.commit()
+            
+            self._remember_ban(user_id, False)
+            mark_user_write(user_id)
+            return result.rowcount > 0
+                
+        except Exception as e:
+            logger.error(f"Error unbanning user {user_id}: {e}")
+            return False
+    
+    async def load_bans(self) -> int:
+        """Load all banned user ids into memory so ban checks skip the database"""
+        self._changes_during_load = {}
+        try:
+            async with await get_db_session() as session:
+                result = await session.execute(_ALL_BANS)
+                banned = {row[0] for row in result.fetchall()}
+            for user_id, is_banned in self._changes_during_load.items():
+                (banned.add if is_banned else banned.discard)(user_id)
+        finally:
+            self._changes_during_load = None
+        
+        if self._banned is None or banned != self._banned:
+            logger.info(f"🚫 Loaded {len(banned)} banned users")
+        self._banned = banned
+        return len(banned)
+    
+    def start_ban_refresh(self):
+        """Schedule the periodic reload of the ban list"""
+        get_background_tasks().start_periodic("ban_refresh", self.ban_refresh_seconds, self.load_bans)
+    
     async def is_banned(self, user_id: int) -> bool:
         """Check if user is banned"""
+        if self._banned is not None:
+            return user_id in self._banned
+        
         try:
-            async with await get_db_session() as session:
-                result = await session.execute(
-                    text("SELECT 1 FROM banned_users WHERE user_id = :u"),
-                    {"u": user_id}
-                )
+            async with await get_db_read_session(user_id) as session:
+                result = await session.execute(_IS_BANNED, {"u": user_id})
                 return bool(result.scalar())
                 
         except Exception as e:
             logger.error(f"Error checking ban status for {user_id}: {e}")
             return False
+    
+    async def get_submission_logs(self, user_id: int, since: datetime,
+                                  until: Optional[datetime] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Get a user's submission log entries in [since, until), newest first"""
+        try:
+            async with await get_db_read_session(user_id) as session:
+                # Bounded created_at range lets the planner prune to the matching partitions
+                result = await session.execute(
+                    _SUBMISSION_LOGS,
+                    {"u": user_id, "since": since, "until": until or datetime.now(), "n": limit}
+                )
+                return [dict(row._mapping) for row in result.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"Error getting submission logs for {user_id}: {e}")
+            return []
 
 # Global user service instance
 user_service = UserService()
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+from services.audit_service import AuditLogger
+
+class FakeDatabaseError(Exception):
+    def __init__(self, sqlstate: str):
+        super().__init__(f"sqlstate {sqlstate}")
+        self.orig = SimpleNamespace(sqlstate=sqlstate)
+
+def make_logger(write) -> AuditLogger:
+    audit = AuditLogger()
+    audit.batch_size = 100
+    audit.flush_seconds = 0.01
+    audit.max_attempts = 2
+    audit._write = write
+    return audit
+
+async def log_and_close(audit: AuditLogger, actions):
+    for user_id, action in enumerate(actions):
+        await audit.log(user_id, action)
+    await audit.close()
+
+def test_rejected_batch_is_split_until_bad_rows_are_dropped():
+    written, attempts = [], []
+
+    async def write(batch):
+        attempts.append(len(batch))
+        if any(row["action"] == "bad" for row in batch):
+            # invalid_text_representation: the rows themselves are wrong
+            raise FakeDatabaseError("22P02")
+        written.extend(row["user_id"] for row in batch)
+
+    audit = make_logger(write)
+    actions = ["ok"] * 10
+    actions[3] = actions[8] = "bad"
+    asyncio.run(log_and_close(audit, actions))
+
+    assert sorted(written) == [0, 1, 2, 4, 5, 6, 7, 9]
+    assert audit.rejected == 2
+    # The whole batch is retried max_attempts times before it is split
+    assert attempts[:2] == [10, 10]
+    assert audit.stats()["queued"] == 0
+
+def test_connection_errors_are_retried_without_splitting():
+    written, attempts = [], []
+
+    async def write(batch):
+        attempts.append(len(batch))
+        if len(attempts) <= 4:
+            # connection_failure: nothing wrong with the rows
+            raise FakeDatabaseError("08006")
+        written.extend(row["user_id"] for row in batch)
+
+    audit = make_logger(write)
+    asyncio.run(log_and_close(audit, ["ok"] * 5))
+
+    assert attempts == [5, 5, 5, 5, 5]
+    assert sorted(written) == [0, 1, 2, 3, 4]
+    assert audit.rejected == 0
+    assert audit.failed_flushes == 4
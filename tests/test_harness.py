@@ -0,0 +1,20 @@
+import pytest
+from benchmarks.harness import latency_summary, percentile
+
+@pytest.mark.parametrize("fraction, expected", [
+    (0.0, 1), (0.01, 1), (0.10, 1), (0.11, 2), (0.50, 5), (0.90, 9), (0.99, 10), (1.0, 10),
+])
+def test_percentile_is_nearest_rank(fraction, expected):
+    assert percentile([float(i) for i in range(1, 11)], fraction) == expected
+
+def test_percentile_edge_cases():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3.0], 0.99) == 3.0
+    # p99 of 1000 values is the 990th, not interpolated
+    assert percentile(list(range(1, 1001)), 0.99) == 990
+
+def test_latency_summary_in_milliseconds():
+    summary = latency_summary([0.004, 0.001, 0.003, 0.002])
+
+    assert summary == {"p50_ms": 2.0, "p90_ms": 4.0, "p99_ms": 4.0, "max_ms": 4.0, "mean_ms": 2.5}
+    assert latency_summary([])["p99_ms"] == 0.0
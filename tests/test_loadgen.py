@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+from benchmarks.loadgen import find_saturation
+
+ARGS = SimpleNamespace(lag_threshold_ms=100.0, queue_threshold=10.0, slo_ms=1000.0)
+
+def stage(users, throughput, **overrides):
+    values = {
+        "users": users, "throughput_per_s": throughput, "pool_full_fraction": 0.0, "loop_lag_p99_ms": 5.0,
+        "queue_depth_mean": 0.0, "job_lag_max_ms": 1.0, "p99_ms": 50.0, "timeouts": 0, "errors": 0,
+    }
+    values.update(overrides)
+    return values
+
+def test_find_saturation_reports_first_saturated_stage_per_resource():
+    stages = [
+        stage(25, 100.0),
+        stage(50, 190.0, pool_full_fraction=0.6),
+        stage(100, 195.0, loop_lag_p99_ms=150.0, pool_full_fraction=0.2),
+        stage(250, 190.0, queue_depth_mean=12.0, job_lag_max_ms=100.0),
+        stage(500, 180.0, p99_ms=1500.0),
+    ]
+
+    assert find_saturation(stages, ARGS) == {
+        "db_pool": 50,
+        "event_loop": 100,
+        "update_queue": 250,
+        "job_queue": 250,
+        "latency_slo": 500,
+        # 195 is within 5% of the best so far (190)
+        "throughput_plateau": 100,
+    }
+
+def test_find_saturation_counts_errors_and_timeouts_against_the_slo():
+    stages = [stage(25, 100.0), stage(50, 200.0, timeouts=1), stage(100, 400.0, errors=2)]
+
+    result = find_saturation(stages, ARGS)
+    assert result["latency_slo"] == 50
+    assert result["throughput_plateau"] is None
+
+def test_find_saturation_nothing_saturated():
+    stages = [stage(25, 100.0), stage(50, 200.0), stage(100, 400.0)]
+
+    assert set(find_saturation(stages, ARGS).values()) == {None}
+    assert set(find_saturation([], ARGS).values()) == {None}
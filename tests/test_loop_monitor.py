@@ -0,0 +1,73 @@
+import time
+import asyncio
+from utils.loop_monitor import LoopMonitor
+
+def block_the_loop(seconds: float):
+    time.sleep(seconds)
+
+def make_monitor() -> LoopMonitor:
+    monitor = LoopMonitor()
+    monitor.interval = 0.02
+    monitor.spike_threshold = 0.1
+    return monitor
+
+def test_spike_is_attributed_to_the_blocking_handler():
+    monitor = make_monitor()
+
+    async def handler():
+        with monitor.track("submit"):
+            await asyncio.sleep(0)
+            block_the_loop(0.4)
+
+    async def main():
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+            await asyncio.create_task(handler())
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+
+    asyncio.run(main())
+
+    assert len(monitor.spikes) == 1
+    spike = monitor.spikes[0]
+    assert spike["handler"] == "submit"
+    assert spike["lag_ms"] >= 300
+    assert spike["stack"][-1].startswith("block_the_loop (test_loop_monitor.py:")
+    assert monitor.active == {}
+
+def test_spike_outside_a_handler_has_no_handler():
+    monitor = make_monitor()
+
+    async def main():
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+            block_the_loop(0.3)
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+
+    asyncio.run(main())
+
+    assert len(monitor.spikes) == 1
+    assert monitor.spikes[0]["handler"] is None
+    assert any(frame.startswith("block_the_loop ") for frame in monitor.spikes[0]["stack"])
+
+def test_no_spike_below_threshold():
+    monitor = make_monitor()
+
+    async def main():
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)
+            block_the_loop(0.03)
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+
+    asyncio.run(main())
+
+    assert list(monitor.spikes) == []
+    assert monitor.stats()["max_lag_ms"] < 100
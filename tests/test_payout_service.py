@@ -0,0 +1,69 @@
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+import pytest
+from services.payout_service import compute_payouts
+
+def cents(value: Decimal) -> int:
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def reference_payouts(user_ids, views, referrer_ids, rate, tax_rate, commission_rate):
+    """Per-user Decimal arithmetic the vectorized run has to match to the cent"""
+    gross = {u: cents(Decimal(int(v)) * rate / 1000 * 100) for u, v in zip(user_ids, views)}
+    tax = {u: cents(gross[u] * tax_rate) for u in gross}
+    referral = dict.fromkeys(gross, 0)
+    for u, referrer in zip(user_ids, referrer_ids):
+        if referrer in referral:
+            referral[referrer] += cents(gross[u] * commission_rate)
+    return {
+        "gross": [gross[u] for u in user_ids],
+        "tax": [tax[u] for u in user_ids],
+        "referral": [referral[u] for u in user_ids],
+        "net": [gross[u] - tax[u] + referral[u] for u in user_ids],
+    }
+
+def run(user_ids, views, referrer_ids, rate="0.025", tax_rate="0.12", commission_rate="0.10"):
+    result = compute_payouts(
+        np.array(user_ids, dtype=np.int64), np.array(views, dtype=np.int64), np.array(referrer_ids, dtype=np.int64),
+        Decimal(rate), Decimal(tax_rate), Decimal(commission_rate),
+    )
+    return {key: values.tolist() for key, values in result.items()}
+
+def test_half_cents_round_up():
+    # $0.025 per 1000 views is 0.0025 cents per view: 200 views are exactly half a cent
+    result = run([1, 2, 3], [199, 200, 600], [0, 0, 0], tax_rate="0.5")
+
+    assert result["gross"] == [0, 1, 2]
+    # 0.5 and 1.0 cents of tax
+    assert result["tax"] == [0, 1, 1]
+    assert result["net"] == [0, 0, 1]
+
+def test_commission_is_credited_to_referrers_in_the_run():
+    # 2 and 3 were referred by 1; 4 was referred by someone who is not in the run
+    result = run([1, 2, 3, 4], [0, 1_000_000, 2_000_000, 400_000], [0, 1, 1, 99])
+
+    assert result["gross"] == [0, 2500, 5000, 1000]
+    assert result["referral"] == [750, 0, 0, 0]
+    assert result["net"] == [750, 2200, 4400, 880]
+
+def test_no_commission_rate_pays_no_referrals():
+    result = run([1, 2], [0, 1_000_000], [0, 1], commission_rate="0")
+
+    assert result["referral"] == [0, 0]
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+@pytest.mark.parametrize("rate, tax_rate, commission_rate", [
+    ("0.025", "0.12", "0.10"),
+    ("0.037", "0.175", "0.05"),
+    ("1.5", "0.3333", "0.0125"),
+])
+def test_matches_decimal_reference(seed, rate, tax_rate, commission_rate):
+    rng = np.random.default_rng(seed)
+    user_ids = np.arange(1, 2001)
+    views = rng.integers(0, 5_000_000, size=len(user_ids))
+    referrer_ids = np.where(rng.random(len(user_ids)) < 0.3, rng.integers(1, 2500, size=len(user_ids)), 0)
+
+    expected = reference_payouts(
+        user_ids.tolist(), views.tolist(), referrer_ids.tolist(),
+        Decimal(rate), Decimal(tax_rate), Decimal(commission_rate),
+    )
+    assert run(user_ids, views, referrer_ids, rate, tax_rate, commission_rate) == expected
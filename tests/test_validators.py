@@ -0,0 +1,34 @@
+import pytest
+from benchmarks.bench_validators import build_message, legacy_parse
+from utils.validators import parse_submission_text
+
+@pytest.mark.parametrize("seed", [1, 7, 42])
+def test_parse_submission_text_matches_per_token_parsing(seed):
+    message = build_message(count=200, seed=seed)
+    legacy_codes, _ = legacy_parse(message)
+    parsed = parse_submission_text(message)
+
+    assert parsed["shortcodes"] == list(dict.fromkeys(legacy_codes))
+    assert parsed["duplicates"] == len(legacy_codes) - len(set(legacy_codes))
+
+def test_parse_submission_text_normalizes_and_deduplicates():
+    parsed = parse_submission_text(
+        "/submit https://www.instagram.com/reel/ABC123def45/?igsh=x "
+        "https://instagram.com/someone/p/XYZ987abc65/ ABC123def45 QWE456rty78 https://example.com/ABC"
+    )
+
+    assert parsed["shortcodes"] == ["ABC123def45", "XYZ987abc65", "QWE456rty78"]
+    assert parsed["urls"] == [
+        "https://www.instagram.com/reel/ABC123def45/",
+        "https://www.instagram.com/p/XYZ987abc65/",
+        "https://www.instagram.com/reel/QWE456rty78/",
+    ]
+    assert parsed["shortcode_only"] == ["QWE456rty78"]
+    assert parsed["invalid"] == ["https://example.com/ABC"]
+    assert parsed["duplicates"] == 1
+
+@pytest.mark.parametrize("text", ["", "/submit", "   ", None])
+def test_parse_submission_text_empty(text):
+    assert parse_submission_text(text) == {
+        "shortcodes": [], "urls": [], "shortcode_only": [], "invalid": [], "duplicates": 0,
+    }
@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def format_stack(frame, limit: int = 64) -> List[str]:
+    """Frames from outermost to innermost as 'function (file:line)'"""
+    stack = []
+    while frame is not None and len(stack) < limit:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+class LoopMonitor:
+    """Event-loop lag monitor that records which handler was blocking the loop during a spike
+
+    A heartbeat task measures how late it wakes up. A watchdog thread notices
+    when the heartbeat is overdue and captures the running task's handler and
+    stack while the loop is still blocked.
+    """
+
+    def __init__(self):
+        self.interval = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", 100)) / 1000
+        self.spike_threshold = float(os.getenv("LOOP_LAG_SPIKE_MS", 250)) / 1000
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.spikes = deque(maxlen=int(os.getenv("LOOP_LAG_SPIKES_KEPT", 50)))
+        # Handler name per running update task, maintained by the handler wrapper
+        self.active: Dict[asyncio.Task, str] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._stall: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @contextmanager
+    def track(self, handler: str):
+        """Mark the current task as running handler"""
+        task = asyncio.current_task()
+        self.active[task] = handler
+        try:
+            yield
+        finally:
+            self.active.pop(task, None)
+
+    def running_handler(self) -> Optional[str]:
+        """Handler of the task currently executing on the loop (safe to call from other threads)"""
+        if self.loop is None:
+            return None
+        task = asyncio.current_task(self.loop)
+        return self.active.get(task) if task is not None else None
+
+    def start(self):
+        """Start the heartbeat and the watchdog thread"""
+        if self._task is not None and not self._task.done():
+            return
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop_monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._last_beat = now
+            self.lag_ms = lag * 1000
+            self.max_lag_ms = max(self.max_lag_ms, self.lag_ms)
+
+            stall, self._stall = self._stall, None
+            if lag >= self.spike_threshold:
+                spike = {
+                    "at": datetime.now().isoformat(timespec="seconds"),
+                    "lag_ms": round(self.lag_ms, 1),
+                    "handler": stall["handler"] if stall else None,
+                    "stack": stall["stack"][-8:] if stall else [],
+                }
+                self.spikes.append(spike)
+                logger.warning(
+                    f"🐢 Event loop blocked for {spike['lag_ms']} ms"
+                    + (f" in handler {spike['handler']}" if spike["handler"] else "")
+                    + (f" at {spike['stack'][-1]}" if spike["stack"] else "")
+                )
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval / 2):
+            overdue = time.monotonic() - self._last_beat - self.interval
+            if overdue < self.spike_threshold / 2 or self._stall is not None:
+                continue
+            # The loop is stuck right now: capture who is holding it
+            frame = sys._current_frames().get(self.loop_thread_id)
+            self._stall = {
+                "handler": self.running_handler(),
+                "stack": format_stack(frame) if frame is not None else [],
+            }
+
+    async def stop(self):
+        """Stop monitoring"""
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Current and worst lag plus recent spikes with the blocking handler"""
+        return {
+            "lag_ms": round(self.lag_ms, 2),
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            "active_handlers": sorted(self.active.values()),
+            "spikes": list(self.spikes),
+        }
+
+# Global loop monitor instance
+loop_monitor = LoopMonitor()
+
+def get_loop_monitor() -> LoopMonitor:
+    """Get loop monitor instance"""
+    return loop_monitor
@@ -0,0 +1,126 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Optional
+from utils.loop_monitor import format_stack, get_loop_monitor
+
+logger = logging.getLogger(__name__)
+
+class SamplingProfiler:
+    """Samples the event-loop thread's stack from a background thread for a fixed window
+
+    Output is in collapsed-stack format (one 'frame;frame;... count' line per
+    stack), which flamegraph.pl and speedscope read directly. Each stack is
+    rooted at the handler that was running, so time splits per command.
+    """
+
+    def __init__(self):
+        self.output_dir = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+        self.default_seconds = float(os.getenv("PROFILE_DEFAULT_SECONDS", 30))
+        self.max_seconds = float(os.getenv("PROFILE_MAX_SECONDS", 300))
+        self.interval = float(os.getenv("PROFILE_INTERVAL_MS", 10)) / 1000
+        self.last_result: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = None, interval_ms: float = None) -> bool:
+        """Start sampling the running loop; returns False if a profile is already running"""
+        if self.running:
+            return False
+
+        seconds = min(seconds or self.default_seconds, self.max_seconds)
+        interval = interval_ms / 1000 if interval_ms else self.interval
+        loop = asyncio.get_running_loop()
+        self._stop.clear()
+
+        self._thread = threading.Thread(
+            target=self._sample,
+            args=(loop, threading.get_ident(), seconds, interval),
+            name="sampling-profiler",
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(f"🔬 Profiling the event loop for {seconds:.0f}s every {interval * 1000:.0f} ms")
+        return True
+
+    def stop(self):
+        """End the current window early (the profile is still written)"""
+        self._stop.set()
+
+    async def wait(self) -> Optional[Dict[str, Any]]:
+        """Wait for the current window to finish and return its result"""
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        return self.last_result
+
+    def _sample(self, loop, thread_id: int, seconds: float, interval: float):
+        monitor = get_loop_monitor()
+        stacks = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + seconds
+
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                task = asyncio.current_task(loop)
+                root = monitor.active.get(task) if task is not None else None
+                if root:
+                    root = f"handler:{root}"
+                elif task is not None:
+                    root = f"task:{task.get_name()}"
+                else:
+                    root = "loop"
+                stacks[";".join([root] + format_stack(frame, limit=128))] += 1
+                samples += 1
+            self._stop.wait(interval)
+
+        try:
+            result = self._write(stacks, samples, time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"❌ Failed to write profile: {e}")
+            result = {"error": str(e), "samples": samples}
+
+        self.last_result = result
+
+    def _write(self, stacks: Counter, samples: int, seconds: float) -> Dict[str, Any]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded")
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        # Handler share of samples, for a quick summary without a flamegraph viewer
+        roots = Counter()
+        for stack, count in stacks.items():
+            roots[stack.split(";", 1)[0]] += count
+
+        result = {
+            "path": path,
+            "samples": samples,
+            "seconds": round(seconds, 1),
+            "top": [(root, round(count * 100 / samples, 1)) for root, count in roots.most_common(8)] if samples else [],
+        }
+        logger.info(f"🔬 Profile written: {result}")
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """Whether a profile is running and the last result"""
+        return {"running": self.running, "last_result": self.last_result}
+
+# Global profiler instance
+profiler = SamplingProfiler()
+
+def get_profiler() -> SamplingProfiler:
+    """Get profiler instance"""
+    return profiler
@@ -0,0 +1,80 @@
+import os
+import time
+import signal
+import asyncio
+import logging
+from typing import Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+class GracefulShutdown:
+    """SIGTERM/SIGINT handling and one shared deadline for draining work before exit
+
+    The deadline starts when the signal arrives, so SHUTDOWN_GRACE_SECONDS
+    should stay below the orchestrator's kill timeout (30s by default on
+    Kubernetes).
+    """
+
+    def __init__(self):
+        self.grace_seconds = float(os.getenv("SHUTDOWN_GRACE_SECONDS", 25))
+        self.reason: Optional[str] = None
+        self._deadline: Optional[float] = None
+        self._requested = asyncio.Event()
+
+    def install(self):
+        """Route SIGTERM and SIGINT on the running loop to request()"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request, sig.name)
+            except NotImplementedError:
+                # Windows: fall back to KeyboardInterrupt for Ctrl+C
+                pass
+
+    @property
+    def requested(self) -> bool:
+        return self._requested.is_set()
+
+    def request(self, reason: str = "requested"):
+        """Start the shutdown; later calls are ignored"""
+        if self.requested:
+            return
+        self.reason = reason
+        self._deadline = time.monotonic() + self.grace_seconds
+        logger.info(f"🛑 Shutdown requested ({reason}), draining for up to {self.grace_seconds:.0f}s")
+        self._requested.set()
+
+    async def wait(self):
+        """Block until a shutdown is requested"""
+        await self._requested.wait()
+
+    @property
+    def expired(self) -> bool:
+        """Whether a shutdown was requested and its deadline has passed"""
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline"""
+        if self._deadline is None:
+            return self.grace_seconds
+        return max(0.0, self._deadline - time.monotonic())
+
+    async def step(self, name: str, awaitable: Awaitable, minimum: float = 0.0) -> bool:
+        """Run one shutdown step within the remaining budget (but at least minimum seconds)"""
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(awaitable, max(self.remaining(), minimum))
+            logger.info(f"✅ Shutdown: {name} done in {(time.monotonic() - started) * 1000:.0f} ms")
+            return True
+        except asyncio.TimeoutError:
+            logger.error(f"⏱️ Shutdown: {name} did not finish before the deadline")
+        except Exception as e:
+            logger.error(f"❌ Shutdown: {name} failed: {e}")
+        return False
+
+# Global shutdown coordinator instance
+shutdown = GracefulShutdown()
+
+def get_shutdown() -> GracefulShutdown:
+    """Get shutdown coordinator instance"""
+    return shutdown
@@ -0,0 +1,56 @@
+import time
+import logging
+from contextlib import contextmanager
+from typing import Any, Awaitable, Dict
+
+logger = logging.getLogger(__name__)
+
+class StartupTimer:
+    """Wall-clock duration of each startup phase, reported once the bot is polling
+
+    Phases may overlap (the database warmup runs alongside the Telegram
+    initialization), so their durations can add up to more than the total.
+    """
+
+    def __init__(self):
+        # Importing this module is among the first things bot_fixed does
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready_after: float = None
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as a phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    async def timed(self, name: str, awaitable: Awaitable) -> Any:
+        """Await awaitable and record it as a phase (for phases run concurrently)"""
+        with self.phase(name):
+            return await awaitable
+
+    def ready(self):
+        """Mark the bot as serving updates and log the breakdown"""
+        self.ready_after = time.perf_counter() - self.started
+        breakdown = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases.items())
+        logger.info(f"⏱️ Ready in {self.ready_after * 1000:.0f} ms ({breakdown})")
+
+    def report(self) -> Dict[str, Any]:
+        """Phase durations in milliseconds, including phases still finishing after ready"""
+        return {
+            "ready_ms": round(self.ready_after * 1000, 1) if self.ready_after is not None else None,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+        }
+
+# Global startup timer instance
+startup_timer = StartupTimer()
+
+def get_startup_timer() -> StartupTimer:
+    """Get startup timer instance"""
+    return startup_timer
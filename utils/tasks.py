@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import contextvars
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class BackgroundTasks:
+    """Registry of periodic and one-off background jobs with scheduling lag tracking"""
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Last observed delay between when a job was due and when it actually ran (seconds)
+        self.lag: Dict[str, float] = {}
+        # Jobs currently inside fn (as opposed to sleeping until their next run)
+        self.running: Set[str] = set()
+        self._draining = False
+
+    def start_periodic(self, name: str, interval: float, fn: Callable[[], Awaitable]) -> asyncio.Task:
+        """Run fn every interval seconds until cancelled"""
+        existing = self._tasks.get(name)
+        if existing and not existing.done():
+            return existing
+
+        task = asyncio.create_task(self._run_periodic(name, interval, fn), name=name)
+        self._tasks[name] = task
+        return task
+
+    async def _run_periodic(self, name: str, interval: float, fn: Callable[[], Awaitable]):
+        loop = asyncio.get_running_loop()
+        due = loop.time() + interval
+
+        while True:
+            await asyncio.sleep(max(0.0, due - loop.time()))
+            self.lag[name] = max(0.0, loop.time() - due)
+
+            self.running.add(name)
+            try:
+                await fn()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Background job {name} failed: {e}")
+            finally:
+                self.running.discard(name)
+
+            if self._draining:
+                return
+            due = loop.time() + interval
+
+    def start_once(self, name: str, fn: Callable[[], Awaitable]) -> Optional[asyncio.Task]:
+        """Run fn once in the background (None if a job of that name is still running or we are draining)"""
+        existing = self._tasks.get(name)
+        if self._draining or (existing and not existing.done()):
+            return None
+
+        # Fresh context: the job's statements don't belong to the update that started it
+        task = asyncio.create_task(self._run_once(name, fn), name=name, context=contextvars.Context())
+        self._tasks[name] = task
+        return task
+
+    async def _run_once(self, name: str, fn: Callable[[], Awaitable]):
+        self.running.add(name)
+        try:
+            await fn()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Background job {name} failed: {e}")
+        finally:
+            self.running.discard(name)
+
+    def max_lag(self) -> float:
+        """Get the worst current scheduling lag across jobs"""
+        return max(self.lag.values(), default=0.0)
+
+    async def drain(self, timeout: float):
+        """Let jobs that are mid-run finish (up to timeout seconds), then cancel the rest"""
+        self._draining = True
+        busy = [task for name, task in self._tasks.items() if name in self.running]
+        for name, task in self._tasks.items():
+            if name not in self.running:
+                task.cancel()
+
+        if busy:
+            _, pending = await asyncio.wait(busy, timeout=timeout)
+            if pending:
+                logger.warning(f"⏱️ Cancelling background jobs still running: {', '.join(t.get_name() for t in pending)}")
+        await self.cancel_all()
+
+    async def cancel_all(self):
+        """Cancel all running background jobs"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+# Global background task registry
+background_tasks = BackgroundTasks()
+
+def get_background_tasks() -> BackgroundTasks:
+    """Get background task registry"""
+    return background_tasks
@@ -1,5 +1,13 @@
 import re
-from typing import Optional
+from typing import Any, Dict, Optional
+
+# One pass over a whole /submit message: every whitespace-separated token is
+# either an Instagram post URL, a bare shortcode, or something else
+_SUBMISSION_TOKEN = re.compile(r"""
+    (?P<url>@?(?:https?://)?(?:[\w-]+\.)?instagram\.com/(?:[^/\s]+/)?(?P<kind>p|reel|tv)/(?P<code>[A-Za-z0-9_-]+)\S*)
+    | (?P<bare>(?<!\S)[A-Za-z0-9_-]{6,}(?!\S))
+    | (?P<other>\S+)
+""", re.VERBOSE)
 
 def validate_instagram_link(url: str) -> bool:
     """Validate if URL is a valid Instagram reel/post URL"""
@@ -43,6 +51,47 @@ def extract_shortcode_from_url(url: str) -> Optional[str]:
             return match.group(1)
     return None
 
+def parse_submission_text(text: str) -> Dict[str, Any]:
+    """Parse a /submit message into deduplicated shortcodes and rejected tokens
+
+    Returns shortcodes (first-seen order) with matching normalized urls, the
+    shortcodes given without a URL, invalid tokens and the duplicate count.
+    A leading bot command such as /submit is ignored.
+    """
+    result = {"shortcodes": [], "urls": [], "shortcode_only": [], "invalid": [], "duplicates": 0}
+    if not text or not isinstance(text, str):
+        return result
+    
+    text = text.strip()
+    if text.startswith('/'):
+        parts = text.split(None, 1)
+        text = parts[1] if len(parts) > 1 else ''
+    
+    seen = set()
+    for match in _SUBMISSION_TOKEN.finditer(text):
+        # lastgroup names the alternative that matched: url, bare or other
+        token_type = match.lastgroup
+        if token_type == 'other':
+            result["invalid"].append(match.group())
+            continue
+        
+        if token_type == 'url':
+            kind, code = match.group('kind', 'code')
+        else:
+            kind, code = 'reel', match.group()
+            
+        if code in seen:
+            result["duplicates"] += 1
+            continue
+        seen.add(code)
+        
+        result["shortcodes"].append(code)
+        result["urls"].append(f"https://www.instagram.com/{kind}/{code}/")
+        if token_type == 'bare':
+            result["shortcode_only"].append(code)
+    
+    return result
+
 def validate_email(email: str) -> bool:
     """Validate email format"""
     if not email or not isinstance(email, str):